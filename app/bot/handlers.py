@@ -6,9 +6,9 @@ from app.utils.supabase import supabase
 from app.services.chart.analyzer import ChartAnalyzer
 from app.services.signal_processor.instance import signal_processor
 from app.utils.redis import redis_client
-import os
 import aiohttp
 from app.services.calendar.analyzer import EconomicCalendar
+from app.utils.executors import run_io
 
 # Error handler toevoegen
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -135,14 +135,14 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 }
                 
                 # Check for duplicates
-                response = supabase.table("signal_preferences").select("*").eq(
+                response = await run_io(supabase.table("signal_preferences").select("*").eq(
                     "user_id", user_id
                 ).eq("market", market_id).eq("instrument", instrument).eq(
                     "timeframe", timeframe
-                ).execute()
+                ).execute)
                 
                 if not response.data:  # No duplicate found
-                    result = supabase.table("signal_preferences").insert(data).execute()
+                    result = await run_io(supabase.table("signal_preferences").insert(data).execute)
                     logger.info(f"Saved preference to Supabase: {data}")
                     
                     keyboard = [
@@ -191,9 +191,9 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         elif query.data == "view_preferences":
             user_id = query.from_user.id
             try:
-                response = supabase.table("signal_preferences").select("*").eq(
+                response = await run_io(supabase.table("signal_preferences").select("*").eq(
                     "user_id", user_id
-                ).execute()
+                ).execute)
                 preferences = response.data
 
                 if preferences:
@@ -240,16 +240,16 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             
             try:
                 # Haal eerst de voorkeur op die verwijderd gaat worden
-                pref_response = supabase.table("signal_preferences").select("*").eq(
+                pref_response = await run_io(supabase.table("signal_preferences").select("*").eq(
                     "id", preference_id
-                ).execute()
+                ).execute)
                 
                 if pref_response.data:
                     pref = pref_response.data[0]
                     # Verwijder de specifieke voorkeur
-                    response = supabase.table("signal_preferences").delete().eq(
+                    response = await run_io(supabase.table("signal_preferences").delete().eq(
                         "id", preference_id
-                    ).execute()
+                    ).execute)
                     
                     # Toon bevestiging en opties
                     text = f"✅ Deleted preference:\n{pref['market'].upper()} - {pref['instrument']} ({pref['timeframe']})"
@@ -281,7 +281,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             instrument = query.data.replace("analysis_", "")
             try:
                 # Get cached chart
-                chart_bytes = redis_client.get(f"chart:{instrument}")
+                chart_bytes = await run_io(redis_client.get, f"chart:{instrument}")
                 if not chart_bytes:
                     raise Exception("Chart not found in cache")
                 
@@ -308,7 +308,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             instrument = query.data.replace("back_to_signal_", "")
             
             # Get original message from Redis
-            message = redis_client.get(f"signal:{instrument}")
+            message = await run_io(redis_client.get, f"signal:{instrument}")
             if message:
                 message = message.decode('utf-8')
                 
@@ -343,7 +343,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             instrument = query.data.replace("sentiment_", "")
             try:
                 # Get cached sentiment
-                sentiment = redis_client.get(f"sentiment:{instrument}")
+                sentiment = await run_io(redis_client.get, f"sentiment:{instrument}")
                 
                 if sentiment:
                     sentiment_text = sentiment.decode('utf-8')
@@ -383,7 +383,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             instrument = query.data.replace("calendar_", "")
             try:
                 # Get cached calendar
-                calendar = redis_client.get(f"calendar:{instrument}")
+                calendar = await run_io(redis_client.get, f"calendar:{instrument}")
                 
                 if calendar:
                     calendar_text = calendar.decode('utf-8')
@@ -417,9 +417,9 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def view_preferences(user_id: int):
     """Fetch user preferences from Supabase"""
     try:
-        response = supabase.table("signal_preferences").select("*").eq(
+        response = await run_io(supabase.table("signal_preferences").select("*").eq(
             "user_id", user_id
-        ).execute()
+        ).execute)
         
         return response.data
     except Exception as e:
@@ -450,4 +450,4 @@ def register_handlers(app):
 
 # Na de andere initialisaties
 chart_analyzer = ChartAnalyzer()
-economic_calendar = EconomicCalendar() 
\ No newline at end of file
+economic_calendar = EconomicCalendar()
@@ -1,11 +1,24 @@
 import os
+import math
 import logging
-from fastapi import FastAPI, Request, BackgroundTasks, HTTPException
+from typing import Any, Dict, Optional
+from fastapi import FastAPI, Request, BackgroundTasks, HTTPException, Response, Body
 from telegram import Bot, Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters
 from app.bot.constants import MARKETS
 from app.utils.supabase import supabase
-from app.services.trading_bot import trading_bot
+from app.services.trading_bot import trading_bot, TELEGRAM_BASE_URL
+from app.services.subscriber.index import subscription_index, preference_key
+from app.utils.executors import run_io, shutdown_executors
+from app.utils.loop_monitor import loop_monitor
+from app.utils.http import http_clients
+from app.utils import metrics
+from app.services.market_data.bar_store import bar_store
+from app.services.market_data.intervals import INTERVAL_SECONDS
+from app.services.telegram.ingest import UpdateQueue, INVALID, REJECTED
+from app.services.telegram.outbox import outbox
+from app.services.calendar.store import calendar_store
+from app.services.sentiment.aggregator import news_aggregator
 
 # Set up logging
 logging.basicConfig(
@@ -24,6 +37,10 @@ async def startup_event():
     try:
         logger.info("Starting application...")
         
+        # Warn when something blocks the event loop
+        await loop_monitor.start()
+        await http_clients.start()
+        
         # Initialize bot
         global application, telegram_bot
         TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
@@ -31,15 +48,36 @@ async def startup_event():
             raise ValueError("No TELEGRAM_BOT_TOKEN found in environment")
             
         logger.info("Initializing bot...")
-        telegram_bot = Bot(TOKEN)
+        # Connection pool sized to the fan-out concurrency, otherwise sends queue on one connection
+        telegram_bot = Bot(
+            TOKEN,
+            base_url=TELEGRAM_BASE_URL,
+            request=metrics.MetricsRequest(connection_pool_size=trading_bot.fanout.concurrency)
+        )
         await telegram_bot.initialize()
         
         # Initialize TradingBot with the same bot instance
         trading_bot.initialize(telegram_bot)
         
+        # Warm up the chart backend (browser pool when CHART_RENDERER=browser)
+        await trading_bot.chart_service.start()
+        
+        # Keep OHLC bars of all instruments in memory for charts, indicators and AI prompts
+        await bar_store.start()
+        
+        # Economic calendar: loaded once a day, per-instrument views are local queries
+        await calendar_store.start()
+        
+        # Re-warm the sentiment and calendar views behind the signal buttons
+        trading_bot.start_cache_warmers()
+        
+        # Load subscriptions in memory for signal matching
+        logger.info("Loading subscription index...")
+        await subscription_index.start()
+        
         # Initialize application
         logger.info("Initializing application...")
-        application = Application.builder().token(TOKEN).build()
+        application = Application.builder().token(TOKEN).base_url(TELEGRAM_BASE_URL).request(metrics.MetricsRequest()).build()
         await application.initialize()
         
         # Add handlers
@@ -47,11 +85,14 @@ async def startup_event():
         application.add_handler(CommandHandler("help", help_command))
         application.add_handler(CommandHandler("status", status_command))
         application.add_handler(CallbackQueryHandler(button_callback))
+        application.add_error_handler(record_handler_error)
         logger.info("Added command handlers")
         
         # Start application
         logger.info("Starting application...")
         await application.start()
+        await update_queue.start()
+        await outbox.start(telegram_bot.base_url)
         logger.info("Application startup complete!")
         
     except Exception as e:
@@ -63,7 +104,17 @@ async def shutdown_event():
     """Run on application shutdown"""
     try:
         logger.info("Stopping application...")
+        await update_queue.stop()
+        await outbox.stop()
+        await subscription_index.stop()
+        await bar_store.stop()
+        await calendar_store.stop()
+        await trading_bot.stop_cache_warmers()
+        await trading_bot.chart_service.close()
         await application.stop()
+        await http_clients.close()
+        await loop_monitor.stop()
+        shutdown_executors()
         logger.info("Application stopped")
     except Exception as e:
         logger.error(f"Shutdown error: {e}", exc_info=True)
@@ -168,17 +219,18 @@ async def button_callback(update: Update, context):
             
             try:
                 # Check for duplicates
-                response = supabase.table("signal_preferences").select("*").eq(
+                response = await run_io(supabase.table("signal_preferences").select("*").eq(
                     "user_id", user_id
                 ).eq("market", market_id).eq("instrument", instrument).eq(
                     "timeframe", timeframe
-                ).execute()
+                ).execute)
                 
                 logger.debug(f"Supabase duplicate check response: {response}")
                 
                 if not response.data:  # No duplicate found
-                    result = supabase.table("signal_preferences").insert(data).execute()
+                    result = await run_io(supabase.table("signal_preferences").insert(data).execute)
                     logger.info(f"Saved preference to Supabase: {result}")
+                    subscription_index.add(preference_key(market_id, instrument, timeframe), user_id)
                     
                     keyboard = [
                         [
@@ -207,6 +259,35 @@ async def button_callback(update: Update, context):
                 logger.error(f"Supabase error: {str(e)}", exc_info=True)
                 raise
         
+        elif query.data.startswith("delete_preference_"):
+            preference_id = int(query.data.replace("delete_preference_", ""))
+            user_id = str(query.from_user.id)
+            
+            # Only the owner's own preference, and the row tells us which index key to drop
+            response = await run_io(supabase.table("signal_preferences").select("*").eq(
+                "id", preference_id
+            ).eq("user_id", user_id).execute)
+            
+            if response.data:
+                pref = response.data[0]
+                await run_io(supabase.table("signal_preferences").delete().eq("id", preference_id).execute)
+                subscription_index.remove(preference_key(pref["market"], pref["instrument"], pref["timeframe"]), user_id)
+                
+                await query.message.edit_text(
+                    f"✅ Deleted preference:\n{pref['market'].upper()} - {pref['instrument']} ({pref['timeframe']})",
+                    reply_markup=InlineKeyboardMarkup([[
+                        InlineKeyboardButton("📋 View Remaining", callback_data="view_preferences"),
+                        InlineKeyboardButton("➕ Add New", callback_data="back_to_markets")
+                    ]])
+                )
+            else:
+                await query.message.edit_text(
+                    "❌ Preference not found. It might have been already deleted.",
+                    reply_markup=InlineKeyboardMarkup([[
+                        InlineKeyboardButton("📋 View Preferences", callback_data="view_preferences")
+                    ]])
+                )
+        
         elif query.data == "back_to_markets":
             keyboard = [
                 [InlineKeyboardButton(market_data["name"], callback_data=f"market_{market_id}")]
@@ -221,9 +302,9 @@ async def button_callback(update: Update, context):
             
         elif query.data == "view_preferences":
             # Show user preferences
-            response = supabase.table("signal_preferences").select("*").eq(
+            response = await run_io(supabase.table("signal_preferences").select("*").eq(
                 "user_id", query.from_user.id
-            ).execute()
+            ).execute)
             
             if response.data:
                 text = "📋 Your signal preferences:\n\n"
@@ -261,6 +342,8 @@ async def button_callback(update: Update, context):
                 InlineKeyboardButton("🔙 Back to Markets", callback_data="back_to_markets")
             ]])
         )
+        # The user has been told; re-raise so the update counts as failed
+        raise
 
 @app.get("/")
 async def root():
@@ -274,33 +357,129 @@ async def health():
     logger.info("Health check called")
     return {"status": "ok"}
 
+@app.get("/stats")
+async def stats():
+    """Cache and event loop statistics"""
+    return {
+        "sentiment": trading_bot.sentiment_flight.stats(),
+        "sentiment_batching": trading_bot.sentiment_analyzer.stats(),
+        "chart": trading_bot.chart_cache.stats(),
+        "webhook": update_queue.stats(),
+        "outbox": outbox.stats(),
+        "calendar": calendar_store.stats(),
+        "news": news_aggregator.stats(),
+        "http": http_clients.stats(),
+        "event_loop": loop_monitor.stats()
+    }
+
+@app.get("/outbox/dead")
+async def dead_letters(limit: int = 50):
+    """Messages the outbox gave up on"""
+    return await outbox.dead_letters(limit)
+
+# update_id -> exception of updates whose handler raised; PTB hands these to error handlers only
+handler_errors: Dict[int, BaseException] = {}
+
+async def record_handler_error(update: object, context):
+    """Error handler: remember the failure so process_telegram_update can raise it"""
+    if isinstance(update, Update):
+        handler_errors[update.update_id] = context.error
+    else:
+        logger.error(f"Error outside an update: {context.error}")
+
 async def process_telegram_update(data: dict):
-    """Process Telegram update in background"""
-    try:
-        if update := Update.de_json(data, telegram_bot):
-            await application.process_update(update)
-            logger.info("Update processed successfully")
-    except Exception as e:
-        logger.error(f"Background task error: {e}", exc_info=True)
+    """Process Telegram update in background; raises so the update queue counts the failure"""
+    if update := Update.de_json(data, telegram_bot):
+        await application.process_update(update)
+        error = handler_errors.pop(update.update_id, None)
+        if error is not None:
+            raise error
+        logger.info("Update processed successfully")
+
+# Webhook updates are acknowledged right away and handled by these workers
+update_queue = UpdateQueue(process_telegram_update)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
 
 @app.post("/webhook")
 async def webhook(request: Request):
     """Handle incoming webhook updates"""
-    data = await request.json()
-    update = Update.de_json(data, telegram_bot)
-    await application.process_update(update)
-    return {"status": "ok"}
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    
+    status = update_queue.submit(data)
+    if status == REJECTED:
+        # Queue is full: a non-2xx makes Telegram retry later instead of dropping the update
+        raise HTTPException(status_code=503, detail="Update queue full")
+    if status == INVALID:
+        logger.warning("Ignoring invalid webhook payload")
+    return {"status": status}
 
 async def echo_message(update: Update, context):
     """Echo the user message."""
     await update.message.reply_text(update.message.text)
 
+SIGNAL_ACTIONS = ("BUY", "SELL")
+
+def parse_signal(payload: Any) -> Dict[str, Any]:
+    """Validate a posted signal and map it onto the fields the pipeline keys on; raises ValueError"""
+    if not isinstance(payload, dict):
+        raise ValueError("Signal must be a JSON object")
+    
+    missing = [field for field in ("instrument", "action", "price", "timeframe") if payload.get(field) in (None, "")]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+    
+    action = str(payload["action"]).upper()
+    if action not in SIGNAL_ACTIONS:
+        raise ValueError(f"Unknown action: {payload['action']}")
+    timeframe = str(payload["timeframe"]).lower()
+    if timeframe not in INTERVAL_SECONDS:
+        raise ValueError(f"Unsupported timeframe: {payload['timeframe']}")
+    
+    levels = {}
+    for field in ("price", "stop_loss", "take_profit"):
+        if payload.get(field) is None:
+            continue
+        try:
+            levels[field] = float(payload[field])
+        except (TypeError, ValueError):
+            raise ValueError(f"{field} must be a number")
+        if not math.isfinite(levels[field]) or levels[field] <= 0:
+            raise ValueError(f"{field} must be a positive number")
+    
+    # TradingView sends instrument/action, the pipeline also uses symbol/direction
+    instrument = str(payload["instrument"]).upper().replace("/", "")
+    return {
+        **payload,
+        **levels,
+        "market": str(payload.get("market") or "forex").lower(),
+        "instrument": instrument,
+        "symbol": instrument,
+        "timeframe": timeframe,
+        "action": action,
+        "direction": action
+    }
+
+async def ingest_signal(payload: Any) -> Dict[str, Any]:
+    """Validate a received signal (timed as the ingest stage) and run it through the pipeline"""
+    with metrics.stage("ingest"):
+        signal = parse_signal(payload)
+    logger.info(f"Received signal: {signal['action']} {signal['instrument']} {signal['timeframe']} @ {signal['price']}")
+    return await trading_bot.process_signal(signal)
+
 @app.post("/send_test_signal")
-async def send_test_signal():
-    """Trigger a test signal"""
+async def send_test_signal(signal: Optional[Dict[str, Any]] = Body(None)):
+    """Trigger a test signal, or process the signal posted in the body"""
     try:
         # Test signal data
-        signal = {
+        signal = signal or {
             "market": "forex",
             "instrument": "EURUSD",
             "symbol": "EURUSD",  # Nodig voor de knoppen
@@ -312,47 +491,24 @@ async def send_test_signal():
         }
         
         # Process via TradingBot
-        result = await trading_bot.process_signal(signal)
+        result = await ingest_signal(signal)
         
         return {
             "status": "success",
             "details": result
         }
         
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         logger.error(f"Error sending test signal: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/signal")
-async def receive_tradingview_signal():
-    """Receive signal from TradingView and process through all services"""
+async def receive_tradingview_signal(signal: Dict[str, Any] = Body(...)):
+    """Receive a TradingView alert and distribute it to the matching subscribers"""
     try:
-        # Simuleer TradingView signaal
-        tradingview_signal = {
-            "market": "forex",
-            "instrument": "EURUSD",
-            "timeframe": "15m",
-            "action": "BUY",
-            "price": 1.0750,
-            "strategy": {
-                "name": "SigmaPips Strategy",
-                "version": "1.0",
-                "timeframe": "15m"
-            },
-            "indicators": {
-                "rsi": 65,
-                "macd": "bullish",
-                "ema": "above"
-            }
-        }
-        
-        logger.info(f"Received TradingView signal: {tradingview_signal}")
-        
-        # Process via services
-        complete_signal = await processor.process_signal(tradingview_signal)
-        
-        # Distribute to subscribers
-        response = await processor.distribute_signal(complete_signal)
+        response = await ingest_signal(signal)
         
         return {
             "status": "success",
@@ -360,9 +516,13 @@ async def receive_tradingview_signal():
             "details": response
         }
         
+    except ValueError as e:
+        # Nothing is sent for a payload that doesn't validate
+        logger.warning(f"Rejected TradingView signal: {str(e)}")
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing TradingView signal: {str(e)}", exc_info=True)
-        return {"error": str(e)}
+        raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
     import uvicorn
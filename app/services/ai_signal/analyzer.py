@@ -1,7 +1,10 @@
 from app.services.signal_processor.models import TradingSignal
 from app.utils.logger import logger
 import os
+import time
 from openai import AsyncOpenAI
+from app.services.market_data.bar_store import bar_store
+from app.utils.metrics import observe_llm
 
 class AISignalAnalyzer:
     def __init__(self):
@@ -15,6 +18,7 @@ class AISignalAnalyzer:
             prompt = self._create_analysis_prompt(signal)
             
             # Get AI analysis
+            started = time.perf_counter()
             response = await self.client.chat.completions.create(
                 model="gpt-4-turbo-preview",
                 messages=[
@@ -24,6 +28,7 @@ class AISignalAnalyzer:
                 temperature=0.7,
                 max_tokens=500
             )
+            observe_llm("gpt-4-turbo-preview", time.perf_counter() - started, response.usage)
             
             analysis = response.choices[0].message.content
             self.logger.info(f"AI analysis generated for {signal.instrument}")
@@ -35,17 +40,31 @@ class AISignalAnalyzer:
 
     def _create_analysis_prompt(self, signal: TradingSignal) -> str:
         """Create prompt for AI analysis"""
+        timeframe = getattr(signal, "timeframe", None) or "1h"
+        bars, indicators = bar_store.latest(signal.instrument, timeframe)
+        
+        # Prefer live indicator values from the bar store, fall back to what the signal carried
+        def value(name, fallback_key):
+            if name in indicators:
+                return round(indicators[name], 5)
+            return signal.additional_info.get(fallback_key)
+        
+        closes = ", ".join(f"{c:g}" for c in bars["close"][-10:])
         return f"""
 You are SigmaPips AI. Analyze the following technical data and provide ONLY a verdict in 2-3 sentences. Do not include any headers, sections, or formatting:
 
-Technical Data:
-- RSI: {signal.additional_info.get('rsi')}
-- MA Fast: {signal.additional_info.get('ma_fast')}
-- MA Slow: {signal.additional_info.get('ma_slow')}
+Technical Data ({signal.instrument}, {timeframe}):
+- RSI: {value('rsi', 'rsi')}
+- MA Fast: {value('ema_20', 'ma_fast')}
+- MA Slow: {value('ema_50', 'ma_slow')}
+- MACD / Signal: {value('macd', 'macd')} / {value('macd_signal', 'macd_signal')}
+- ATR: {value('atr', 'atr')}
+- Bollinger: {value('bb_lower', 'bb_lower')} - {value('bb_upper', 'bb_upper')}
+- Last closes: {closes or 'n/a'}
 
 Focus on:
 1. Momentum analysis
 2. Key technical levels
 3. Risk/reward assessment
 4. Potential risks or concerns
-""" 
\ No newline at end of file
+"""
@@ -0,0 +1,343 @@
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.utils.html_rows import RowSpec, extract_rows
+from app.utils.http import http_clients
+
+logger = logging.getLogger(__name__)
+
+# ForexFactory's weekly export: one JSON list with title, country (currency), date, impact, forecast, previous
+CALENDAR_FEED_URL = os.getenv("CALENDAR_FEED_URL", "https://nfs.faireconomy.media/ff_calendar_thisweek.json")
+CALENDAR_HTML_URL = os.getenv("CALENDAR_HTML_URL", "https://www.forexfactory.com/calendar")
+
+IMPACTS = ("high", "medium", "low", "holiday")
+
+FOREXFACTORY_ROWS = RowSpec(".calendar__row", {
+    "date": ".calendar__date",
+    "time": ".calendar__time",
+    "currency": ".calendar__currency",
+    "impact": ".calendar__impact@title",
+    "impact_title": ".calendar__impact span@title",
+    "impact_icon": ".calendar__impact span@class",
+    "event": ".calendar__event",
+    "forecast": ".calendar__forecast",
+    "previous": ".calendar__previous"
+})
+
+# Currencies a non-forex instrument reacts to; six-letter forex pairs are split in two
+INSTRUMENT_CURRENCIES = {
+    "BTCUSDT": ["USD"],
+    "ETHUSDT": ["USD"],
+    "BNBUSDT": ["USD"],
+    "XAUUSD": ["USD"],
+    "XAGUSD": ["USD"],
+    "WTIUSD": ["USD"],
+    "US30": ["USD"],
+    "SPX500": ["USD"],
+    "NASDAQ": ["USD"]
+}
+CURRENCIES = {"USD", "EUR", "GBP", "JPY", "AUD", "NZD", "CAD", "CHF", "CNY"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calendar_events (
+    id INTEGER PRIMARY KEY,
+    day TEXT NOT NULL,
+    starts_at INTEGER NOT NULL,
+    currency TEXT NOT NULL,
+    impact TEXT NOT NULL,
+    title TEXT NOT NULL,
+    forecast TEXT,
+    previous TEXT,
+    UNIQUE (currency, starts_at, title)
+);
+CREATE INDEX IF NOT EXISTS calendar_events_currency_time ON calendar_events (currency, starts_at);
+CREATE INDEX IF NOT EXISTS calendar_events_day ON calendar_events (day);
+CREATE TABLE IF NOT EXISTS calendar_refreshes (
+    id INTEGER PRIMARY KEY,
+    finished_at REAL NOT NULL,
+    source TEXT NOT NULL,
+    first_day TEXT,
+    last_day TEXT,
+    events INTEGER NOT NULL
+);
+"""
+
+
+def instrument_currencies(instrument: str) -> List[str]:
+    """EURUSD -> ['EUR', 'USD']; instruments we don't know react to USD"""
+    instrument = instrument.upper()
+    if instrument in INSTRUMENT_CURRENCIES:
+        return INSTRUMENT_CURRENCIES[instrument]
+    base, quote = instrument[:3], instrument[3:6]
+    if len(instrument) == 6 and base in CURRENCIES and quote in CURRENCIES:
+        return [base, quote]
+    return ["USD"]
+
+
+def _impact(value: str) -> str:
+    """'High', 'High Impact Expected', 'icon--ff-impact-red' -> 'high'"""
+    value = (value or "").lower()
+    for impact, marker in (("high", "red"), ("medium", "ora"), ("low", "yel"), ("holiday", "gra")):
+        if impact in value or f"impact-{marker}" in value:
+            return impact
+    if "non-economic" in value:
+        return "holiday"
+    return "low"
+
+
+def _event(starts_at: datetime, currency: str, impact: str, title: str, forecast: str, previous: str) -> Dict[str, Any]:
+    starts_at = starts_at.astimezone(timezone.utc)
+    return {
+        "day": starts_at.strftime("%Y-%m-%d"),
+        "starts_at": int(starts_at.timestamp()),
+        "currency": currency.strip().upper(),
+        "impact": _impact(impact),
+        "title": title.strip(),
+        "forecast": (forecast or "").strip() or None,
+        "previous": (previous or "").strip() or None
+    }
+
+
+def parse_feed(entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Events from the weekly JSON export"""
+    events = []
+    for entry in entries:
+        try:
+            events.append(_event(
+                datetime.fromisoformat(entry["date"]), entry["country"], entry.get("impact"),
+                entry["title"], entry.get("forecast"), entry.get("previous")
+            ))
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Skipping calendar entry {entry}: {str(e)}")
+    return events
+
+
+def parse_forexfactory_html(html: str, year: int = None, backend: str = None) -> List[Dict[str, Any]]:
+    """Events from the ForexFactory calendar page (times shown in UTC).
+
+    The page only prints the date on the first row of a day and the time on the first
+    event at that time, so both carry over to the rows below.
+    """
+    year = year or datetime.utcnow().year
+    events = []
+    day = None
+    clock = "00:00"
+
+    for row in extract_rows(html, FOREXFACTORY_ROWS, backend):
+        try:
+            date_text = " ".join((row["date"] or "").split())
+            if date_text:
+                # "Mon Jan 8" / "MonJan 8"
+                match = re.search(r"([A-Z][a-z]{2})\s*(\d{1,2})$", date_text)
+                if match:
+                    day = datetime.strptime(f"{match.group(1)} {match.group(2)} {year}", "%b %d %Y")
+
+            time_text = (row["time"] or "").lower()
+            if re.match(r"^\d{1,2}:\d{2}(am|pm)$", time_text):
+                clock = datetime.strptime(time_text, "%I:%M%p").strftime("%H:%M")
+            elif time_text:
+                # All Day, Tentative, Day 1...
+                clock = "00:00"
+
+            if day is None or not row["currency"] or not row["event"]:
+                continue
+
+            impact = " ".join(filter(None, (row["impact"], row["impact_title"], row["impact_icon"])))
+            hour, minute = map(int, clock.split(":"))
+            events.append(_event(
+                day.replace(hour=hour, minute=minute, tzinfo=timezone.utc), row["currency"], impact,
+                row["event"], row["forecast"], row["previous"]
+            ))
+        except Exception as e:
+            logger.error(f"Error parsing event row: {str(e)}")
+            continue
+
+    return events
+
+
+class CalendarStore:
+    """The week's economic events in a local SQLite table, indexed by currency and time.
+
+    Filled from ForexFactory once a day ahead of the trading day; every view after that
+    is a local query.
+    """
+
+    def __init__(self, path: str = None, refresh_at: str = None, max_age: float = None):
+        self.path = path or os.getenv("CALENDAR_PATH", "data/calendar.db")
+        # UTC; the forex trading day rolls over at 22:00 UTC
+        self.refresh_at = refresh_at or os.getenv("CALENDAR_REFRESH_AT", "21:30")
+        self.max_age = max_age or float(os.getenv("CALENDAR_MAX_AGE", 12 * 3600))
+        self.retry_interval = float(os.getenv("CALENDAR_RETRY_INTERVAL", 300))
+        self.last_refresh: Optional[Dict[str, Any]] = None
+
+        self._db: Optional[sqlite3.Connection] = None
+        # sqlite3 connections are not shareable between threads: all queries go through one
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="calendar")
+        self._task: Optional[asyncio.Task] = None
+        self._refreshing: Optional[asyncio.Future] = None
+
+    # --- SQLite (runs on the calendar thread) ---
+
+    def _open(self):
+        if self._db is not None:
+            return
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(SCHEMA)
+        self._db = db
+        row = db.execute("SELECT * FROM calendar_refreshes ORDER BY id DESC LIMIT 1").fetchone()
+        self.last_refresh = dict(row) if row else None
+
+    def _replace(self, events: List[Dict[str, Any]], source: str) -> Dict[str, Any]:
+        """Swap in the events of the days the source covered, in one transaction"""
+        days = sorted({event["day"] for event in events})
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            # Events that were moved or cancelled disappear with the old rows
+            db.execute("DELETE FROM calendar_events WHERE day BETWEEN ? AND ?", (days[0], days[-1]))
+            db.executemany(
+                "INSERT OR REPLACE INTO calendar_events (day, starts_at, currency, impact, title, forecast, previous) "
+                "VALUES (:day, :starts_at, :currency, :impact, :title, :forecast, :previous)",
+                events
+            )
+            cursor = db.execute(
+                "INSERT INTO calendar_refreshes (finished_at, source, first_day, last_day, events) VALUES (?, ?, ?, ?, ?)",
+                (time.time(), source, days[0], days[-1], len(events))
+            )
+            row = db.execute("SELECT * FROM calendar_refreshes WHERE id = ?", (cursor.lastrowid,)).fetchone()
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return dict(row)
+
+    def _query(self, currencies: List[str], start: int, end: int, impacts: List[str]) -> List[Dict[str, Any]]:
+        currency_marks = ",".join("?" * len(currencies))
+        impact_marks = ",".join("?" * len(impacts))
+        rows = self._db.execute(
+            f"SELECT day, starts_at, currency, impact, title, forecast, previous FROM calendar_events "
+            f"WHERE currency IN ({currency_marks}) AND starts_at >= ? AND starts_at < ? AND impact IN ({impact_marks}) "
+            f"ORDER BY starts_at, currency",
+            (*currencies, start, end, *impacts)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _currencies(self, day: str) -> List[str]:
+        return [row[0] for row in self._db.execute(
+            "SELECT DISTINCT currency FROM calendar_events WHERE day = ?", (day,)
+        )]
+
+    async def _call(self, func, *args):
+        if self._db is None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._open)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # --- Ingest ---
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Fetch the week's events and replace what we have for those days"""
+        # Callers that come in during a refresh wait for that one
+        if self._refreshing is not None:
+            return await asyncio.shield(self._refreshing)
+
+        self._refreshing = asyncio.get_running_loop().create_future()
+        try:
+            source, events = await self._fetch()
+            if not events:
+                raise Exception("No calendar events found")
+            self.last_refresh = await self._call(self._replace, events, source)
+            logger.info(f"Calendar refreshed from {source}: {len(events)} events "
+                        f"({self.last_refresh['first_day']} - {self.last_refresh['last_day']})")
+            self._refreshing.set_result(self.last_refresh)
+            return self.last_refresh
+        except Exception as e:
+            self._refreshing.set_exception(e)
+            # Nobody else may be waiting; don't leave an unretrieved exception behind
+            self._refreshing.exception()
+            raise
+        finally:
+            self._refreshing = None
+
+    async def _fetch(self):
+        try:
+            async with http_clients.session(CALENDAR_FEED_URL).get(CALENDAR_FEED_URL) as response:
+                if response.status != 200:
+                    raise Exception(f"Calendar feed error: {response.status}")
+                return "feed", parse_feed(await response.json(content_type=None))
+        except Exception as e:
+            logger.warning(f"Calendar feed unavailable, scraping the calendar page: {str(e)}")
+
+        async with http_clients.session(CALENDAR_HTML_URL).get(CALENDAR_HTML_URL) as response:
+            if response.status != 200:
+                raise Exception(f"Error fetching calendar: {response.status}")
+            return "html", parse_forexfactory_html(await response.text())
+
+    async def start(self):
+        """Open the store, refresh it when it's stale and keep refreshing it daily"""
+        await self._call(lambda: None)
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_daily())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def _seconds_until_refresh(self, now: datetime = None) -> float:
+        now = now or datetime.now(timezone.utc)
+        hour, minute = map(int, self.refresh_at.split(":"))
+        next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    async def _refresh_daily(self):
+        stale = not self.last_refresh or time.time() - self.last_refresh["finished_at"] > self.max_age
+        while True:
+            if not stale:
+                await asyncio.sleep(self._seconds_until_refresh())
+            try:
+                await self.refresh()
+                stale = False
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error refreshing calendar: {str(e)}")
+                stale = True
+                await asyncio.sleep(self.retry_interval)
+
+    # --- Views ---
+
+    async def events(self, currencies: List[str], start: datetime, end: datetime,
+                     impacts: Iterable[str] = IMPACTS) -> List[Dict[str, Any]]:
+        """Events for these currencies in [start, end), ordered by time"""
+        return await self._call(
+            self._query, list(currencies), int(start.timestamp()), int(end.timestamp()), list(impacts)
+        )
+
+    async def events_for(self, instrument: str = None, day: str = None,
+                         impacts: Iterable[str] = IMPACTS) -> List[Dict[str, Any]]:
+        """One day's events (default: today, UTC) for the currencies an instrument trades on, or all of them"""
+        day = day or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        start = datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        currencies = instrument_currencies(instrument) if instrument else await self._call(self._currencies, day)
+        if not currencies:
+            return []
+        return await self.events(currencies, start, start + timedelta(days=1), impacts)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "last_refresh": self.last_refresh}
+
+
+calendar_store = CalendarStore()
@@ -1,32 +1,72 @@
 from app.services.signal_processor.models import TradingSignal
 from app.utils.logger import logger
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-import os
-import time
+from app.services.chart.browser_pool import BrowserPool
+from app.services.chart.renderer import NativeChartService
+from app.services.market_data.bar_store import bar_store
+from app.services.indicators.engine import compute_all, latest_row, summarize
+from app.services.technical_analysis import HISTORY_BARS
 from datetime import datetime
-import io
+import os
+import numpy as np
+
+# Hide UI elements and maximize chart
+CLEAN_CHART_SCRIPT = """
+    // Hide all UI elements
+    document.querySelector('body').style.overflow = 'hidden';
+    
+    // Remove all toolbars and panels
+    [
+        '.tv-header',
+        '.tv-side-toolbar',
+        '.tv-bottom-toolbar',
+        '.chart-controls-bar',
+        '.layout__area--top',
+        '.layout__area--left',
+        '.layout__area--right',
+        '.layout__area--bottom'
+    ].forEach(selector => {
+        const elements = document.querySelectorAll(selector);
+        elements.forEach(el => el && el.remove());
+    });
+    
+    // Maximize chart container
+    const chart = document.querySelector('.chart-container');
+    if (chart) {
+        chart.style.position = 'fixed';
+        chart.style.top = '0';
+        chart.style.left = '0';
+        chart.style.width = '100vw';
+        chart.style.height = '100vh';
+        chart.style.margin = '0';
+        chart.style.padding = '0';
+        chart.style.zIndex = '9999';
+    }
+    
+    // Force resize
+    window.dispatchEvent(new Event('resize'));
+"""
 
 class ChartAnalyzer:
     def __init__(self):
         self.logger = logger
-        self._setup_chrome()
-
-    def _setup_chrome(self):
-        """Setup Chrome with correct options"""
-        chrome_options = Options()
-        chrome_options.add_argument("--start-maximized")  # Start in fullscreen
-        chrome_options.add_argument("--disable-infobars")  # Remove info bars
-        chrome_options.add_argument("--hide-scrollbars")  # Hide scrollbars
-        chrome_options.add_argument("--headless")         # Run in background
-        chrome_options.add_argument("--window-size=1920,1080")
-        self.driver = webdriver.Chrome(options=chrome_options)
+        # Same CHART_RENDERER switch as ChartService
+        self.native = None
+        if os.getenv("CHART_RENDERER", "native").lower() != "browser":
+            self.native = NativeChartService()
+        # Warm browsers instead of one driver shared by every request
+        self.pool = BrowserPool()
 
     async def generate_chart(self, instrument: str) -> bytes:
         """Generate chart screenshot"""
         try:
             self.logger.info(f"📸 Taking screenshot for {instrument}")
             
+            if self.native:
+                screenshot = await self.native.generate_chart(instrument, "1h")
+                if not screenshot:
+                    raise Exception(f"Could not render chart for {instrument}")
+                return screenshot
+            
             # Create TradingView URL with clean chart parameters
             url = (
                 f"https://www.tradingview.com/chart?"
@@ -36,52 +76,13 @@ class ChartAnalyzer:
                 "hidesidetoolbar=1"
             )
             
-            # Load page
-            self.driver.get(url)
-            time.sleep(8)  # Wait for chart to load
-            
-            # Hide UI elements and maximize chart
-            self.driver.execute_script("""
-                // Hide all UI elements
-                document.querySelector('body').style.overflow = 'hidden';
-                
-                // Remove all toolbars and panels
-                [
-                    '.tv-header',
-                    '.tv-side-toolbar',
-                    '.tv-bottom-toolbar',
-                    '.chart-controls-bar',
-                    '.layout__area--top',
-                    '.layout__area--left',
-                    '.layout__area--right',
-                    '.layout__area--bottom'
-                ].forEach(selector => {
-                    const elements = document.querySelectorAll(selector);
-                    elements.forEach(el => el && el.remove());
-                });
-                
-                // Maximize chart container
-                const chart = document.querySelector('.chart-container');
-                if (chart) {
-                    chart.style.position = 'fixed';
-                    chart.style.top = '0';
-                    chart.style.left = '0';
-                    chart.style.width = '100vw';
-                    chart.style.height = '100vh';
-                    chart.style.margin = '0';
-                    chart.style.padding = '0';
-                    chart.style.zIndex = '9999';
-                }
-                
-                // Force resize
-                window.dispatchEvent(new Event('resize'));
-            """)
-            
-            time.sleep(2)  # Wait for UI changes
-            
-            # Find and screenshot only the chart element
-            chart_element = self.driver.find_element("css selector", ".chart-container")
-            screenshot = chart_element.screenshot_as_png
+            # Wait for the chart canvas, clean up the page and screenshot only the chart element
+            screenshot = await self.pool.screenshot(
+                url,
+                ready_selector=".chart-container canvas",
+                prepare_script=CLEAN_CHART_SCRIPT,
+                element_selector=".chart-container"
+            )
             
             self.logger.info(f"✅ Screenshot taken for {instrument}")
             return screenshot
@@ -90,22 +91,31 @@ class ChartAnalyzer:
             self.logger.error(f"❌ Screenshot error: {str(e)}")
             raise
 
-    async def get_technical_analysis(self, instrument: str) -> dict:
+    async def get_technical_analysis(self, instrument: str, timeframe: str = "1h") -> dict:
         """Get technical analysis data"""
         try:
-            # Simplified version - return basic data
+            ohlc = await bar_store.get_ohlc(instrument, timeframe, HISTORY_BARS)
+            indicators = compute_all(ohlc["high"], ohlc["low"], ohlc["close"])
+            values = latest_row(indicators)
+            summary = summarize(values, float(ohlc["close"][-1]))
+            
+            def previous(name):
+                value = indicators[name][-2] if len(indicators[name]) > 1 else np.nan
+                return None if np.isnan(value) else float(value)
+            
+            # Same layout as the TradingView scanner response this used to mimic
             return {
                 "d": [
-                    0.7,  # Overall rating
-                    65,   # RSI
-                    64,   # RSI[1]
-                    75,   # Stoch.K
-                    70,   # Stoch.D
-                    0.002,# MACD
-                    0.001 # MACD Signal
+                    summary["rating"],       # Overall rating
+                    values["rsi"],           # RSI
+                    previous("rsi"),         # RSI[1]
+                    values["stoch_k"],       # Stoch.K
+                    values["stoch_d"],       # Stoch.D
+                    values["macd"],          # MACD
+                    values["macd_signal"]    # MACD Signal
                 ]
             }
                     
         except Exception as e:
             self.logger.error(f"Error getting technical analysis: {str(e)}", exc_info=True)
-            raise 
\ No newline at end of file
+            raise
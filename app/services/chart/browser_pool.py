@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from app.utils.executors import run_browser
+
+logger = logging.getLogger(__name__)
+
+# Resolves after the browser has painted twice, i.e. once DOM/style changes are on screen
+WAIT_FOR_PAINT_SCRIPT = """
+    const done = arguments[arguments.length - 1];
+    requestAnimationFrame(() => requestAnimationFrame(() => done(true)));
+"""
+
+
+def launch_chrome(driver_path: Optional[str] = None) -> webdriver.Chrome:
+    """Start a headless Chromium for screenshots"""
+    chrome_options = Options()
+    chrome_options.binary_location = os.getenv('CHROME_BIN', '/usr/bin/chromium')
+    chrome_options.add_argument('--headless=new')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--disable-infobars')
+    chrome_options.add_argument('--hide-scrollbars')
+    chrome_options.add_argument('--window-size=1920,1080')
+
+    driver_path = driver_path or os.getenv('CHROMEDRIVER_PATH')
+    if driver_path:
+        return webdriver.Chrome(service=Service(executable_path=driver_path), options=chrome_options)
+    return webdriver.Chrome(options=chrome_options)
+
+
+class PooledBrowser:
+    """A warm browser plus the bookkeeping needed to decide when to recycle it"""
+
+    def __init__(self):
+        self.driver = None
+        self.uses = 0
+        self.baseline_heap = None
+        self.broken = False
+
+
+class BrowserPool:
+    """Keeps N warm browsers and leases them out through an asyncio queue"""
+
+    def __init__(self, size: int = None, max_uses: int = None, max_heap_growth_mb: int = None,
+                 driver_path: Optional[str] = None, page_timeout: int = None):
+        self.size = size or int(os.getenv("CHART_BROWSER_POOL_SIZE", 2))
+        self.max_uses = max_uses or int(os.getenv("CHART_BROWSER_MAX_USES", 50))
+        self.max_heap_growth = (max_heap_growth_mb or int(os.getenv("CHART_BROWSER_MAX_HEAP_GROWTH_MB", 256))) * 1024 * 1024
+        self.page_timeout = page_timeout or int(os.getenv("CHART_PAGE_TIMEOUT", 15))
+        self.driver_path = driver_path
+        self._queue: Optional[asyncio.Queue] = None
+        self._start_lock = asyncio.Lock()
+        self._leased = set()
+        self._releasing = set()
+
+    async def start(self):
+        """Launch all browsers up front so the first requests don't pay for it"""
+        async with self._start_lock:
+            if self._queue is not None:
+                return
+
+            queue = asyncio.Queue()
+            browsers = [PooledBrowser() for _ in range(self.size)]
+            results = await asyncio.gather(
+                *(run_browser(self._launch, b) for b in browsers),
+                return_exceptions=True
+            )
+            for browser, result in zip(browsers, results):
+                if isinstance(result, Exception):
+                    # Slot stays empty and is launched again on its first lease
+                    logger.error(f"Error launching pooled browser: {str(result)}")
+                queue.put_nowait(browser)
+
+            self._queue = queue
+            logger.info(f"Browser pool started with {self.size} browsers")
+
+    @asynccontextmanager
+    async def lease(self):
+        """Borrow a warm driver; it is returned (or recycled) afterwards"""
+        if self._queue is None:
+            await self.start()
+
+        queue = self._queue
+        browser = await queue.get()
+        self._leased.add(browser)
+        try:
+            if browser.driver is None:
+                await run_browser(self._launch, browser)
+            yield browser.driver
+        except BaseException:
+            # Also on cancellation: an executor thread may still be driving this browser,
+            # so it is recycled instead of handed to the next lease
+            browser.broken = True
+            raise
+        finally:
+            # Shielded so a cancelled caller can't leave the slot half released
+            release = asyncio.ensure_future(self._release(queue, browser))
+            self._releasing.add(release)
+            release.add_done_callback(self._releasing.discard)
+            await asyncio.shield(release)
+
+    async def _release(self, queue: asyncio.Queue, browser: PooledBrowser):
+        browser.uses += 1
+        try:
+            if await run_browser(self._needs_recycle, browser):
+                await run_browser(self._recycle, browser)
+        finally:
+            self._leased.discard(browser)
+            if self._queue is queue:
+                queue.put_nowait(browser)
+            else:
+                # The pool was closed while this browser was out
+                await run_browser(self._quit, browser)
+
+    async def screenshot(self, url: str, ready_selector: str, prepare_script: str = None,
+                         element_selector: str = None) -> bytes:
+        """Load url in a pooled browser and screenshot it once it has rendered"""
+        async with self.lease() as driver:
+            return await run_browser(
+                self._capture, driver, url, ready_selector, prepare_script, element_selector
+            )
+
+    def _capture(self, driver, url: str, ready_selector: str, prepare_script: str = None,
+                 element_selector: str = None) -> bytes:
+        driver.get(url)
+
+        # Wait on readiness signals instead of fixed sleeps
+        wait = WebDriverWait(driver, self.page_timeout)
+        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ready_selector)))
+        wait.until(lambda d: d.execute_script("return document.readyState") == "complete")
+
+        if prepare_script:
+            driver.execute_script(prepare_script)
+        driver.execute_async_script(WAIT_FOR_PAINT_SCRIPT)
+
+        if element_selector:
+            return driver.find_element(By.CSS_SELECTOR, element_selector).screenshot_as_png
+        return driver.get_screenshot_as_png()
+
+    def _launch(self, browser: PooledBrowser):
+        browser.driver = launch_chrome(self.driver_path)
+        browser.driver.set_script_timeout(self.page_timeout)
+        browser.uses = 0
+        browser.broken = False
+        browser.baseline_heap = self._heap_size(browser.driver)
+        logger.info("Launched pooled browser")
+
+    def _needs_recycle(self, browser: PooledBrowser) -> bool:
+        if browser.driver is None:
+            return False
+        if browser.broken or browser.uses >= self.max_uses:
+            return True
+
+        heap = self._heap_size(browser.driver)
+        if heap is not None and browser.baseline_heap is not None:
+            if heap - browser.baseline_heap > self.max_heap_growth:
+                logger.info(f"Recycling browser, JS heap grew to {heap / 1024 / 1024:.0f} MB")
+                return True
+        return False
+
+    def _recycle(self, browser: PooledBrowser):
+        self._quit(browser)
+        try:
+            self._launch(browser)
+        except Exception as e:
+            # Leave the slot empty, the next lease retries the launch
+            logger.error(f"Error relaunching pooled browser: {str(e)}")
+
+    @staticmethod
+    def _heap_size(driver) -> Optional[int]:
+        """Used JS heap in bytes via the DevTools protocol"""
+        try:
+            driver.execute_cdp_cmd("Performance.enable", {})
+            metrics = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+            return next(int(m["value"]) for m in metrics if m["name"] == "JSHeapUsedSize")
+        except Exception:
+            return None
+
+    @staticmethod
+    def _quit(browser: PooledBrowser):
+        try:
+            if browser.driver:
+                browser.driver.quit()
+        except Exception as e:
+            logger.error(f"Error closing pooled browser: {str(e)}")
+        browser.driver = None
+
+    async def close(self):
+        """Quit all browsers, including the ones that are leased out"""
+        if self._queue is None:
+            return
+        queue, self._queue = self._queue, None
+        await asyncio.gather(*self._releasing, return_exceptions=True)
+
+        browsers = list(self._leased)
+        while not queue.empty():
+            browsers.append(queue.get_nowait())
+        await asyncio.gather(*(run_browser(self._quit, browser) for browser in browsers))
@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from app.services.market_data.intervals import INTERVAL_SECONDS
+from app.utils.executors import run_io
+from app.utils.metrics import CACHE_REQUESTS
+from app.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# How long a signal's levels stay available for re-rendering its chart
+LEVELS_TTL = int(os.getenv("CHART_LEVELS_TTL", 7 * 86400))
+
+
+def levels_id(levels: Optional[Dict]) -> Optional[str]:
+    """Short stable id of a signal's entry/SL/TP levels; None when there is nothing to draw"""
+    levels = {name: value for name, value in (levels or {}).items() if value is not None}
+    if not levels:
+        return None
+    return hashlib.sha1(json.dumps(levels, sort_keys=True).encode()).hexdigest()[:10]
+
+
+def candle_bucket(interval: str, now: float = None) -> int:
+    """Index of the candle that is open right now; the chart only changes when it closes"""
+    seconds = INTERVAL_SECONDS.get(interval.lower(), 3600)
+    return int((now if now is not None else time.time()) // seconds)
+
+
+class ChartCache:
+    """Chart images and their Telegram file_id per (symbol, interval, candle bucket, levels) in Redis.
+
+    Signal charts carry the signal's entry/SL/TP lines, so each set of levels gets its own entry;
+    the bare chart is cached separately.
+    """
+
+    def __init__(self, redis, render: Callable[..., Awaitable[Optional[bytes]]], grace: int = 60):
+        self.redis = redis
+        self.render = render
+        self.grace = grace
+        self.flight = SingleFlight("chart")
+        self._background = set()
+        self.file_id_hits = 0
+        self.image_hits = 0
+        self.renders = 0
+
+    def key(self, symbol: str, interval: str, now: float = None, levels_key: str = None) -> str:
+        key = f"chart:{symbol}:{interval.lower()}:{candle_bucket(interval, now)}"
+        return f"{key}:{levels_key}" if levels_key else key
+
+    def _ttl(self, interval: str) -> int:
+        # Keep the entry until shortly after the candle closes
+        return INTERVAL_SECONDS.get(interval.lower(), 3600) + self.grace
+
+    async def get_media(self, symbol: str, interval: str, levels: Optional[Dict] = None,
+                        levels_key: str = None) -> Tuple[str, Optional[Union[str, bytes]]]:
+        """Return (cache key, file_id or image bytes); renders at most once per bucket and set of levels.
+
+        A button click only carries `levels_key`; the levels themselves are looked up when
+        the chart has to be rendered again.
+        """
+        levels_key = levels_key or levels_id(levels)
+        key = self.key(symbol, interval, levels_key=levels_key)
+
+        file_id, image = await run_io(self.redis.hmget, key, "file_id", "image")
+        if file_id:
+            self.file_id_hits += 1
+            CACHE_REQUESTS.labels("chart", "hit_file_id").inc()
+            return key, file_id.decode() if isinstance(file_id, bytes) else file_id
+        if image:
+            self.image_hits += 1
+            CACHE_REQUESTS.labels("chart", "hit_image").inc()
+            return key, image
+
+        # Many subscribers click the same signal at once; only one of them renders
+        image = await self.flight.get(key, lambda: self._render(key, symbol, interval, levels, levels_key))
+        return key, image
+
+    async def _render(self, key: str, symbol: str, interval: str, levels: Optional[Dict] = None,
+                      levels_key: str = None) -> Optional[bytes]:
+        if levels is None and levels_key:
+            levels = await self._load_levels(levels_key)
+            if levels is None:
+                # Levels expired: the bare chart rather than a chart with somebody else's lines
+                logger.warning(f"Chart levels {levels_key} expired, rendering without them")
+        self.renders += 1
+        image = await self.render(symbol, interval, levels)
+        if image:
+            pipe = self.redis.pipeline()
+            pipe.hset(key, "image", image)
+            pipe.expire(key, self._ttl(interval))
+            await run_io(pipe.execute)
+        return image
+
+    async def remember_levels(self, levels: Optional[Dict]) -> Optional[str]:
+        """Keep a signal's levels under their id, so a later click can render its chart again"""
+        levels_key = levels_id(levels)
+        if levels_key:
+            try:
+                await run_io(self.redis.setex, f"chart:levels:{levels_key}", LEVELS_TTL, json.dumps(levels))
+            except Exception as e:
+                logger.error(f"Error caching chart levels: {str(e)}")
+        return levels_key
+
+    async def _load_levels(self, levels_key: str) -> Optional[Dict]:
+        try:
+            levels = await run_io(self.redis.get, f"chart:levels:{levels_key}")
+            return json.loads(levels) if levels else None
+        except Exception as e:
+            logger.error(f"Error loading chart levels: {str(e)}")
+            return None
+
+    async def remember_file_id(self, key: str, interval: str, file_id: str):
+        """Store the file_id Telegram assigned to the first upload"""
+        try:
+            pipe = self.redis.pipeline()
+            pipe.hset(key, "file_id", file_id)
+            pipe.expire(key, self._ttl(interval))
+            await run_io(pipe.execute)
+        except Exception as e:
+            logger.error(f"Error caching chart file_id: {str(e)}")
+
+    async def forget_file_id(self, key: str):
+        """Drop a file_id Telegram no longer accepts"""
+        await run_io(self.redis.hdel, key, "file_id")
+
+    def prerender(self, symbol: str, interval: str, levels: Optional[Dict] = None):
+        """Render the chart (with the signal's levels) in the background so the first click is a cache hit"""
+        task = asyncio.create_task(self._prerender(symbol, interval, levels))
+        self._background.add(task)
+        task.add_done_callback(self._prerender_done)
+
+    async def _prerender(self, symbol: str, interval: str, levels: Optional[Dict]):
+        await self.remember_levels(levels)
+        await self.get_media(symbol, interval, levels)
+
+    def _prerender_done(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Error pre-rendering chart: {str(task.exception())}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "file_id_hits": self.file_id_hits,
+            "image_hits": self.image_hits,
+            "renders": self.renders,
+            "coalesced": self.flight.coalesced
+        }
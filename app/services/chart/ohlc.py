@@ -0,0 +1,92 @@
+import logging
+import os
+from typing import Dict
+
+import numpy as np
+
+from app.services.market_data.intervals import INTERVAL_SECONDS
+from app.utils.http import http_clients
+
+logger = logging.getLogger(__name__)
+
+YAHOO_CHART_URL = os.getenv("YAHOO_CHART_URL", "https://query1.finance.yahoo.com/v8/finance/chart")
+
+# Instruments from app.bot.constants.MARKETS that don't follow the FX "=X" pattern
+YAHOO_SYMBOLS = {
+    "BTCUSDT": "BTC-USD",
+    "ETHUSDT": "ETH-USD",
+    "BNBUSDT": "BNB-USD",
+    "XAUUSD": "GC=F",
+    "XAGUSD": "SI=F",
+    "WTIUSD": "CL=F",
+    "US30": "^DJI",
+    "SPX500": "^GSPC",
+    "NASDAQ": "^IXIC"
+}
+
+# interval -> (yahoo interval, range, candles merged into one)
+YAHOO_INTERVALS = {
+    "1m": ("1m", "1d", 1),
+    "5m": ("5m", "5d", 1),
+    "15m": ("15m", "5d", 1),
+    "30m": ("30m", "1mo", 1),
+    "1h": ("60m", "1mo", 1),
+    "4h": ("60m", "3mo", 4),
+    "1d": ("1d", "1y", 1)
+}
+
+
+def yahoo_symbol(symbol: str) -> str:
+    return YAHOO_SYMBOLS.get(symbol.upper(), f"{symbol.upper()}=X")
+
+
+def resample(ohlc: Dict[str, np.ndarray], factor: int, seconds: int) -> Dict[str, np.ndarray]:
+    """Merge candles into `seconds`-long bars on clock boundaries (e.g. 1h -> 4h at 00/04/08 UTC).
+
+    Grouping by time // seconds keeps every bar on the same boundary from one fetch to the next;
+    the newest group is the candle still forming, the oldest is dropped when it's incomplete.
+    """
+    if factor <= 1 or not len(ohlc["time"]):
+        return ohlc
+    buckets = ohlc["time"] // seconds
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    if len(starts) > 1 and starts[1] < factor:
+        # The fetch began halfway through this bar
+        starts = starts[1:]
+    ends = np.r_[starts[1:], len(buckets)]
+    return {
+        "time": buckets[starts] * seconds,
+        "open": ohlc["open"][starts],
+        "high": np.maximum.reduceat(ohlc["high"], starts),
+        "low": np.minimum.reduceat(ohlc["low"], starts),
+        "close": ohlc["close"][ends - 1]
+    }
+
+
+async def fetch_ohlc(symbol: str, interval: str, bars: int = 150) -> Dict[str, np.ndarray]:
+    """Latest candles for symbol as numpy arrays (time in epoch seconds)"""
+    interval = interval.lower() if interval.lower() in YAHOO_INTERVALS else "1h"
+    yahoo_interval, yahoo_range, factor = YAHOO_INTERVALS[interval]
+
+    url = f"{YAHOO_CHART_URL}/{yahoo_symbol(symbol)}"
+    async with http_clients.session(url).get(
+        url,
+        params={"interval": yahoo_interval, "range": yahoo_range},
+        headers={"User-Agent": "Mozilla/5.0"}
+    ) as response:
+        response.raise_for_status()
+        data = await response.json()
+
+    result = data["chart"]["result"][0]
+    quote = result["indicators"]["quote"][0]
+    ohlc = {
+        "time": np.asarray(result["timestamp"], dtype=np.int64),
+        **{field: np.asarray(quote[field], dtype=np.float64) for field in ("open", "high", "low", "close")}
+    }
+
+    # Yahoo returns null for candles without trades
+    valid = ~np.isnan(ohlc["open"]) & ~np.isnan(ohlc["close"])
+    ohlc = {field: values[valid] for field, values in ohlc.items()}
+
+    ohlc = resample(ohlc, factor, INTERVAL_SECONDS[interval])
+    return {field: values[-bars:] for field, values in ohlc.items()}
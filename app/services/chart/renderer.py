@@ -0,0 +1,185 @@
+import io
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.ticker import FormatStrFormatter, MaxNLocator
+from PIL import Image
+
+from app.services.market_data.bar_store import bar_store
+from app.utils.executors import run_cpu
+
+logger = logging.getLogger(__name__)
+
+UP_COLOR = "#26a69a"
+DOWN_COLOR = "#ef5350"
+ENTRY_COLOR = "#2962ff"
+BACKGROUND = "#ffffff"
+GRID_COLOR = "#eceff1"
+
+
+def _levels_list(value) -> list:
+    if value is None:
+        return []
+    values = value if isinstance(value, (list, tuple)) else [value]
+    return [float(v) for v in values if v is not None]
+
+
+def _decimals(price_range: float) -> int:
+    """Enough decimals to tell the y ticks apart"""
+    if price_range <= 0:
+        return 2
+    return int(min(6, max(0, 2 - np.floor(np.log10(price_range)))))
+
+
+class _ChartFigure:
+    """Figure, canvas and styled axes reused across renders; only the data artists change"""
+
+    def __init__(self, width: int, height: int, dpi: int):
+        self.dpi = dpi
+        # Figure + Agg canvas directly: no pyplot global state, safe in worker processes
+        self.fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi, facecolor=BACKGROUND)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_axes([0.02, 0.07, 0.88, 0.86])
+        self.ax.set_facecolor(BACKGROUND)
+        self.ax.yaxis.tick_right()
+        # Grid lines are enough, skip the tick marks
+        self.ax.tick_params(labelsize=8, length=0)
+        self.ax.grid(True, color=GRID_COLOR, linewidth=0.6)
+        for spine in self.ax.spines.values():
+            spine.set_visible(False)
+        # fig.text instead of ax.set_title, which re-measures the axes on every draw
+        self.title = self.fig.text(0.02, 0.95, "", fontsize=12, fontweight="bold")
+        self.artists = []
+
+    def reset(self):
+        for artist in self.artists:
+            artist.remove()
+        self.artists = []
+
+    def add(self, artist):
+        self.artists.append(artist)
+        return artist
+
+
+# One figure per worker process; creating figure and axes costs more than drawing the candles
+_figures: Dict[tuple, _ChartFigure] = {}
+
+
+def render_candles(ohlc: Dict[str, np.ndarray], title: str, levels: Optional[Dict] = None,
+                   width: int = 1280, height: int = 720, dpi: int = 100) -> bytes:
+    """Draw a candlestick chart with optional entry/SL/TP overlays and return JPEG bytes"""
+    chart = _figures.get((width, height, dpi))
+    if chart is None:
+        chart = _figures[(width, height, dpi)] = _ChartFigure(width, height, dpi)
+    chart.reset()
+    ax = chart.ax
+
+    opens, highs, lows, closes = ohlc["open"], ohlc["high"], ohlc["low"], ohlc["close"]
+    n = len(closes)
+    x = np.arange(n)
+    up = closes >= opens
+    colors = np.where(up, UP_COLOR, DOWN_COLOR)
+
+    # One collection for all wicks and one for all bodies instead of a patch per candle
+    wicks = np.stack([np.column_stack([x, lows]), np.column_stack([x, highs])], axis=1)
+    chart.add(ax.add_collection(LineCollection(wicks, colors=colors, linewidths=1)))
+
+    half = 0.35
+    bottom = np.minimum(opens, closes)
+    top = np.maximum(opens, closes)
+    # Doji candles still get a visible body
+    top = np.maximum(top, bottom + (highs.max() - lows.min()) * 0.0005)
+    bodies = np.stack([
+        np.column_stack([x - half, bottom]),
+        np.column_stack([x - half, top]),
+        np.column_stack([x + half, top]),
+        np.column_stack([x + half, bottom])
+    ], axis=1)
+    chart.add(ax.add_collection(PolyCollection(bodies, facecolors=colors, edgecolors=colors, linewidths=0.5)))
+
+    price_min, price_max = lows.min(), highs.max()
+
+    levels = levels or {}
+    entry = _levels_list(levels.get("entry"))
+    stop_losses = _levels_list(levels.get("stop_loss"))
+    take_profits = _levels_list(levels.get("take_profit"))
+
+    overlay = [(price, ENTRY_COLOR, "Entry") for price in entry]
+    overlay += [(price, DOWN_COLOR, "SL") for price in stop_losses]
+    overlay += [(price, UP_COLOR, f"TP{i + 1}" if len(take_profits) > 1 else "TP") for i, price in enumerate(take_profits)]
+
+    if entry:
+        # Shade risk and reward zones from the entry
+        for price in stop_losses:
+            chart.add(ax.axhspan(min(entry[0], price), max(entry[0], price), color=DOWN_COLOR, alpha=0.08, lw=0))
+        if take_profits:
+            chart.add(ax.axhspan(min(entry[0], max(take_profits)), max(entry[0], max(take_profits)),
+                                 color=UP_COLOR, alpha=0.08, lw=0))
+
+    for price, color, label in overlay:
+        chart.add(ax.axhline(price, color=color, linewidth=1.2, linestyle="--"))
+        chart.add(ax.annotate(
+            f"{label} {price:g}", xy=(1, price), xycoords=("axes fraction", "data"),
+            xytext=(4, 0), textcoords="offset points", va="center", fontsize=9, color="white",
+            bbox=dict(boxstyle="square,pad=0.25", fc=color, ec=color)
+        ))
+        price_min, price_max = min(price_min, price), max(price_max, price)
+
+    # Last price marker on the right, like TradingView
+    chart.add(ax.axhline(closes[-1], color=UP_COLOR if up[-1] else DOWN_COLOR, linewidth=0.8, linestyle=":"))
+
+    padding = (price_max - price_min) * 0.05 or price_max * 0.001
+    ax.set_xlim(-1, n)
+    ax.set_ylim(price_min - padding, price_max + padding)
+
+    # Explicit ticks: the auto locators create and lay out far more tick objects
+    yticks = MaxNLocator(nbins=6).tick_values(price_min, price_max)
+    ax.set_yticks(yticks[(yticks >= price_min - padding) & (yticks <= price_max + padding)])
+    ax.yaxis.set_major_formatter(FormatStrFormatter(f"%.{_decimals(price_max - price_min)}f"))
+    # Inner ticks only, labels at the very edges get clipped
+    ticks = np.unique(np.linspace(0, n - 1, num=7, dtype=int)[1:-1])
+    ax.set_xticks(ticks)
+    ax.set_xticklabels([
+        datetime.fromtimestamp(int(t), tz=timezone.utc).strftime("%d %b %H:%M") for t in ohlc["time"][ticks]
+    ])
+    chart.title.set_text(title)
+
+    chart.canvas.draw()
+    image = Image.frombuffer("RGBA", chart.canvas.get_width_height(), chart.canvas.buffer_rgba()).convert("RGB")
+    buffer = io.BytesIO()
+    # Telegram re-encodes photos as JPEG anyway; PNG filtering alone took ~25ms
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+class NativeChartService:
+    """Renders charts from OHLC data with matplotlib; no browser involved"""
+
+    def __init__(self, bars: int = 150):
+        self.bars = bars
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def generate_chart(self, symbol: str, interval: str, levels: Optional[Dict] = None) -> Optional[bytes]:
+        """Generate chart image for symbol"""
+        try:
+            ohlc = await bar_store.get_ohlc(symbol, interval, self.bars)
+            if len(ohlc["close"]) == 0:
+                logger.error(f"No candles for {symbol} ({interval})")
+                return None
+
+            # Drawing and PNG encoding are CPU work, keep them off the event loop
+            return await run_cpu(render_candles, ohlc, f"{symbol} · {interval}", levels)
+
+        except Exception as e:
+            logger.error(f"Error generating chart: {str(e)}", exc_info=True)
+            return None
@@ -0,0 +1,376 @@
+import logging
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMA_PERIODS = (20, 50)
+SMA_PERIODS = (20, 50)
+RSI_PERIOD = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+STOCH_K, STOCH_D = 14, 3
+ATR_PERIOD = 14
+BOLLINGER_PERIOD, BOLLINGER_STD = 20, 2.0
+
+# Bars a series needs before every indicator has a value
+WARMUP = max(max(EMA_PERIODS), max(SMA_PERIODS), MACD_SLOW + MACD_SIGNAL, STOCH_K + STOCH_D, BOLLINGER_PERIOD) + 1
+
+# Bars each indicator needs for its first value
+READY_BARS = {
+    **{f"ema_{p}": p for p in EMA_PERIODS},
+    **{f"sma_{p}": p for p in SMA_PERIODS},
+    "macd": MACD_SLOW,
+    "macd_signal": MACD_SLOW + MACD_SIGNAL - 1,
+    "macd_hist": MACD_SLOW + MACD_SIGNAL - 1,
+    "rsi": RSI_PERIOD + 1,
+    "atr": ATR_PERIOD,
+    "stoch_k": STOCH_K,
+    "stoch_d": STOCH_K + STOCH_D - 1,
+    "bb_middle": BOLLINGER_PERIOD,
+    "bb_upper": BOLLINGER_PERIOD,
+    "bb_lower": BOLLINGER_PERIOD
+}
+
+
+def _ewm(x: np.ndarray, alpha) -> np.ndarray:
+    """Exponential smoothing along the last axis, y[0] = x[0] (like pandas ewm(adjust=False)).
+
+    alpha may be one value per row, so EMAs with different periods share one pass over time.
+    """
+    x = np.atleast_2d(x)
+    alpha = np.broadcast_to(np.asarray(alpha, dtype=np.float64), x.shape[:1])
+    # Time-major and contiguous: each step is one vector op across all series
+    columns = np.ascontiguousarray(x.T)
+    out = np.empty_like(columns)
+    prev = columns[0].copy()
+    out[0] = prev
+    for t in range(1, len(columns)):
+        prev += alpha * (columns[t] - prev)
+        out[t] = prev
+    return out.T
+
+
+def _mask_warmup(values: np.ndarray, bars: int) -> np.ndarray:
+    values[..., :bars - 1] = np.nan
+    return values
+
+
+def ema(x: np.ndarray, period: int) -> np.ndarray:
+    return _mask_warmup(_ewm(x, 2.0 / (period + 1)), period).reshape(np.shape(x))
+
+
+def sma(x: np.ndarray, period: int) -> np.ndarray:
+    x2 = np.atleast_2d(x)
+    out = np.full(x2.shape, np.nan)
+    if x2.shape[1] >= period:
+        csum = np.cumsum(x2, axis=-1)
+        out[:, period - 1] = csum[:, period - 1]
+        out[:, period:] = csum[:, period:] - csum[:, :-period]
+    return (out / period).reshape(np.shape(x))
+
+
+def _rolling_max(x: np.ndarray, window: int) -> np.ndarray:
+    """Max over the last `window` values for every full window (van Herk/Gil-Werman, O(n)).
+
+    Returns shape (rows, n - window + 1), like a sliding_window_view(...).max() but without
+    the strided reduction, which is an order of magnitude slower for small windows.
+    """
+    rows, n = x.shape
+    blocks = -(-n // window)
+    padded = np.full((rows, blocks * window), -np.inf)
+    padded[:, :n] = x
+    shaped = padded.reshape(rows, blocks, window)
+    prefix = np.maximum.accumulate(shaped, axis=2).reshape(rows, -1)
+    suffix = np.maximum.accumulate(shaped[:, :, ::-1], axis=2)[:, :, ::-1].reshape(rows, -1)
+    # A window ending at i spans the tail of one block (suffix) and the head of the next (prefix)
+    return np.maximum(suffix[:, :n - window + 1], prefix[:, window - 1:n])
+
+
+def _rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """Population std over every full window, from running sums (O(n))"""
+    # Centre each row first so the sum of squares doesn't lose precision
+    centred = x - x[:, :1]
+    csum = np.cumsum(np.pad(centred, ((0, 0), (1, 0))), axis=1)
+    csum_sq = np.cumsum(np.pad(centred ** 2, ((0, 0), (1, 0))), axis=1)
+    mean = (csum[:, window:] - csum[:, :-window]) / window
+    mean_sq = (csum_sq[:, window:] - csum_sq[:, :-window]) / window
+    return np.sqrt(np.maximum(mean_sq - mean ** 2, 0))
+
+
+def _true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    prev_close = np.concatenate([close[..., :1], close[..., :-1]], axis=-1)
+    return np.maximum(high, prev_close) - np.minimum(low, prev_close)
+
+
+def _rsi_from_averages(avg_gain: np.ndarray, avg_loss: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        return np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), 100.0 - 100.0 / (1.0 + rs))
+
+
+def _stochastic_k(highest: np.ndarray, lowest: np.ndarray, close: np.ndarray) -> np.ndarray:
+    span = highest - lowest
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(span == 0, 50.0, 100.0 * (close - lowest) / span)
+
+
+def _stochastic_k_series(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """%K for every bar, NaN until STOCH_K bars are in"""
+    stoch_k = np.full(close.shape, np.nan)
+    if close.shape[1] >= STOCH_K:
+        highest = _rolling_max(high, STOCH_K)
+        lowest = -_rolling_max(-low, STOCH_K)
+        stoch_k[:, STOCH_K - 1:] = _stochastic_k(highest, lowest, close[:, STOCH_K - 1:])
+    return stoch_k
+
+
+def compute_all(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                lengths: Optional[Sequence[int]] = None) -> Dict[str, np.ndarray]:
+    """All indicators for a batch of series.
+
+    Inputs are (bars,) or (series, bars) arrays, e.g. 100 instruments x 3 timeframes stacked
+    as 300 rows. Every output has the same shape; values are NaN until an indicator has
+    enough bars. RSI and ATR use Wilder smoothing (alpha = 1/period).
+
+    For rows right-aligned by stack(), pass the real bars per row as `lengths` so the
+    warmup counts from each row's first real bar instead of from the padding.
+    """
+    single = np.ndim(close) == 1
+    high, low, close = (np.atleast_2d(np.asarray(a, dtype=np.float64)) for a in (high, low, close))
+    rows = close.shape[0]
+    result: Dict[str, np.ndarray] = {}
+
+    # One pass for every close-based EMA: rows stacked, one alpha per row
+    periods = list(EMA_PERIODS) + [MACD_FAST, MACD_SLOW]
+    smoothed = _ewm(np.tile(close, (len(periods), 1)), np.repeat([2.0 / (p + 1) for p in periods], rows))
+    emas = dict(zip(periods, np.split(smoothed, len(periods))))
+    for period in EMA_PERIODS:
+        result[f"ema_{period}"] = _mask_warmup(emas[period].copy(), period)
+
+    for period in SMA_PERIODS:
+        result[f"sma_{period}"] = sma(close, period)
+
+    # MACD
+    macd_line = emas[MACD_FAST] - emas[MACD_SLOW]
+    signal = _ewm(macd_line, 2.0 / (MACD_SIGNAL + 1))
+    result["macd"] = _mask_warmup(macd_line.copy(), MACD_SLOW)
+    result["macd_signal"] = _mask_warmup(signal.copy(), MACD_SLOW + MACD_SIGNAL - 1)
+    result["macd_hist"] = result["macd"] - result["macd_signal"]
+
+    # RSI and ATR: Wilder smoothing of gains, losses and true range in one pass
+    change = np.diff(close, axis=-1, prepend=close[:, :1])
+    wilder = _ewm(np.concatenate([
+        np.maximum(change, 0), np.maximum(-change, 0), _true_range(high, low, close)
+    ]), np.repeat([1.0 / RSI_PERIOD] * 2 + [1.0 / ATR_PERIOD], rows))
+    avg_gain, avg_loss, atr = np.split(wilder, 3)
+    result["rsi"] = _mask_warmup(_rsi_from_averages(avg_gain, avg_loss), RSI_PERIOD + 1)
+    result["atr"] = _mask_warmup(atr.copy(), ATR_PERIOD)
+
+    # Stochastic %K / %D
+    stoch_k = _stochastic_k_series(high, low, close)
+    result["stoch_k"] = stoch_k
+    result["stoch_d"] = sma(np.nan_to_num(stoch_k), STOCH_D)
+    result["stoch_d"][:, :STOCH_K + STOCH_D - 2] = np.nan
+
+    # Bollinger bands (population std, like TradingView)
+    middle = sma(close, BOLLINGER_PERIOD)
+    std = np.full(close.shape, np.nan)
+    if close.shape[1] >= BOLLINGER_PERIOD:
+        std[:, BOLLINGER_PERIOD - 1:] = _rolling_std(close, BOLLINGER_PERIOD)
+    result["bb_middle"] = middle
+    result["bb_upper"] = middle + BOLLINGER_STD * std
+    result["bb_lower"] = middle - BOLLINGER_STD * std
+
+    if lengths is not None:
+        padding = np.maximum(close.shape[1] - np.asarray(lengths), 0)[:, None]
+        columns = np.arange(close.shape[1])
+        for name, values in result.items():
+            values[columns < padding + READY_BARS[name] - 1] = np.nan
+
+    if single:
+        return {name: values[0] for name, values in result.items()}
+    return result
+
+
+class IndicatorState:
+    """Running indicator state for many series; each new bar is O(1) work per indicator.
+
+    Use from_history() to seed it from past bars, then update() with one bar per series.
+    """
+
+    def __init__(self, rows: int):
+        self.rows = rows
+        self.bars = 0
+        self.emas = {p: np.zeros(rows) for p in set(EMA_PERIODS) | {MACD_FAST, MACD_SLOW}}
+        self.macd_signal = np.zeros(rows)
+        self.avg_gain = np.zeros(rows)
+        self.avg_loss = np.zeros(rows)
+        self.atr = np.zeros(rows)
+        self.prev_close = np.zeros(rows)
+        # Ring buffers for the windowed indicators; bar i lives in slot i % size
+        self.window = max(max(SMA_PERIODS), BOLLINGER_PERIOD, STOCH_K)
+        self.closes = np.zeros((rows, self.window))
+        self.highs = np.zeros((rows, STOCH_K))
+        self.lows = np.zeros((rows, STOCH_K))
+        self.stoch_ks = np.zeros((rows, STOCH_D))
+        self.sums = {p: np.zeros(rows) for p in set(SMA_PERIODS) | {BOLLINGER_PERIOD}}
+        self.bb_sum_sq = np.zeros(rows)
+
+    @classmethod
+    def from_history(cls, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> "IndicatorState":
+        """Seed the running state from past bars (same shapes as compute_all)"""
+        high, low, close = (np.atleast_2d(np.asarray(a, dtype=np.float64)) for a in (high, low, close))
+        state = cls(close.shape[0])
+        if close.shape[1] == 0:
+            return state
+
+        # Same recurrences as compute_all, keeping only the last column
+        periods = list(state.emas)
+        smoothed = _ewm(np.tile(close, (len(periods), 1)), np.repeat([2.0 / (p + 1) for p in periods], state.rows))
+        emas = dict(zip(periods, np.split(smoothed, len(periods))))
+        state.emas = {p: values[:, -1].copy() for p, values in emas.items()}
+        state.macd_signal = _ewm(emas[MACD_FAST] - emas[MACD_SLOW], 2.0 / (MACD_SIGNAL + 1))[:, -1].copy()
+
+        change = np.diff(close, axis=-1, prepend=close[:, :1])
+        wilder = _ewm(np.concatenate([
+            np.maximum(change, 0), np.maximum(-change, 0), _true_range(high, low, close)
+        ]), np.repeat([1.0 / RSI_PERIOD] * 2 + [1.0 / ATR_PERIOD], state.rows))
+        state.avg_gain, state.avg_loss, state.atr = (values[:, -1].copy() for values in np.split(wilder, 3))
+        state.prev_close = close[:, -1].copy()
+        state.bars = close.shape[1]
+
+        state._fill_windows(high, low, close, _stochastic_k_series(high, low, close))
+        return state
+
+    def _fill_windows(self, high, low, close, stoch_k):
+        n = close.shape[1]
+        for buffer, source in ((self.closes, close), (self.highs, high), (self.lows, low), (self.stoch_ks, stoch_k)):
+            size = buffer.shape[1]
+            tail = source[:, -size:]
+            # Put bar i at slot i % size, matching how update() writes
+            slots = np.arange(n - tail.shape[1], n) % size
+            buffer[:] = 0
+            buffer[:, slots] = np.nan_to_num(tail)
+        for period in self.sums:
+            self.sums[period] = close[:, -period:].sum(axis=1)
+        self.bb_sum_sq = (close[:, -BOLLINGER_PERIOD:] ** 2).sum(axis=1)
+
+    def update(self, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> Dict[str, np.ndarray]:
+        """Add one bar per series and return the latest value of every indicator"""
+        high, low, close = (np.asarray(a, dtype=np.float64).reshape(self.rows) for a in (high, low, close))
+        first = self.bars == 0
+        n = self.bars + 1
+
+        if first:
+            for period in self.emas:
+                self.emas[period] = close.copy()
+            self.prev_close = close.copy()
+
+        # EMAs and Wilder averages: one multiply-add each
+        for period, value in self.emas.items():
+            value += 2.0 / (period + 1) * (close - value)
+        macd_line = self.emas[MACD_FAST] - self.emas[MACD_SLOW]
+        if first:
+            self.macd_signal = macd_line.copy()
+        self.macd_signal += 2.0 / (MACD_SIGNAL + 1) * (macd_line - self.macd_signal)
+
+        change = close - self.prev_close
+        true_range = np.maximum(high, self.prev_close) - np.minimum(low, self.prev_close)
+        if first:
+            self.avg_gain = np.maximum(change, 0)
+            self.avg_loss = np.maximum(-change, 0)
+            self.atr = true_range
+        else:
+            self.avg_gain += (np.maximum(change, 0) - self.avg_gain) / RSI_PERIOD
+            self.avg_loss += (np.maximum(-change, 0) - self.avg_loss) / RSI_PERIOD
+            self.atr += (true_range - self.atr) / ATR_PERIOD
+        self.prev_close = close
+
+        # Windowed sums: add the new bar, drop the one leaving each window
+        slot = self.bars % self.window
+        for period, total in self.sums.items():
+            if self.bars >= period:
+                total -= self.closes[:, (self.bars - period) % self.window]
+            total += close
+        if self.bars >= BOLLINGER_PERIOD:
+            self.bb_sum_sq -= self.closes[:, (self.bars - BOLLINGER_PERIOD) % self.window] ** 2
+        self.bb_sum_sq += close ** 2
+        self.closes[:, slot] = close
+
+        self.highs[:, self.bars % STOCH_K] = high
+        self.lows[:, self.bars % STOCH_K] = low
+        filled = min(n, STOCH_K)
+        # Window size is a constant, so max/min over it is O(1) in the history length
+        highest = self.highs[:, :filled].max(axis=1)
+        lowest = self.lows[:, :filled].min(axis=1)
+        stoch_k = _stochastic_k(highest, lowest, close)
+        self.stoch_ks[:, self.bars % STOCH_D] = stoch_k if n >= STOCH_K else 0.0
+        self.bars = n
+
+        return self._latest(macd_line, stoch_k)
+
+    def _latest(self, macd_line: np.ndarray, stoch_k: np.ndarray) -> Dict[str, np.ndarray]:
+        n = self.bars
+        nan = np.full(self.rows, np.nan)
+
+        def ready(values: np.ndarray, bars: int) -> np.ndarray:
+            return values.copy() if n >= bars else nan.copy()
+
+        latest = {f"ema_{p}": ready(self.emas[p], p) for p in EMA_PERIODS}
+        latest.update({f"sma_{p}": ready(self.sums[p] / p, p) for p in SMA_PERIODS})
+        latest["macd"] = ready(macd_line, MACD_SLOW)
+        latest["macd_signal"] = ready(self.macd_signal, MACD_SLOW + MACD_SIGNAL - 1)
+        latest["macd_hist"] = latest["macd"] - latest["macd_signal"]
+        latest["rsi"] = ready(_rsi_from_averages(self.avg_gain, self.avg_loss), RSI_PERIOD + 1)
+        latest["atr"] = ready(self.atr, ATR_PERIOD)
+        latest["stoch_k"] = ready(stoch_k, STOCH_K)
+        latest["stoch_d"] = ready(self.stoch_ks.sum(axis=1) / STOCH_D, STOCH_K + STOCH_D - 1)
+
+        middle = self.sums[BOLLINGER_PERIOD] / BOLLINGER_PERIOD
+        variance = np.maximum(self.bb_sum_sq / BOLLINGER_PERIOD - middle ** 2, 0)
+        std = np.sqrt(variance)
+        latest["bb_middle"] = ready(middle, BOLLINGER_PERIOD)
+        latest["bb_upper"] = ready(middle + BOLLINGER_STD * std, BOLLINGER_PERIOD)
+        latest["bb_lower"] = ready(middle - BOLLINGER_STD * std, BOLLINGER_PERIOD)
+        return latest
+
+
+def latest_row(indicators: Dict[str, np.ndarray], row: int = 0) -> Dict[str, Optional[float]]:
+    """Last value of every indicator for one series of a compute_all result, NaN as None"""
+    values = {}
+    for name, series in indicators.items():
+        value = series[-1] if series.ndim == 1 else series[row, -1]
+        values[name] = None if np.isnan(value) else float(value)
+    return values
+
+
+def summarize(values: Dict[str, Optional[float]], close: float) -> Dict:
+    """Turn raw indicator values into the trend/strength summary the bot shows"""
+    votes = []
+    if values.get("rsi") is not None:
+        votes.append(1 if values["rsi"] < 30 else -1 if values["rsi"] > 70 else 0)
+    if values.get("macd_hist") is not None:
+        votes.append(1 if values["macd_hist"] > 0 else -1)
+    for period in EMA_PERIODS:
+        if values.get(f"ema_{period}") is not None:
+            votes.append(1 if close > values[f"ema_{period}"] else -1)
+    if values.get("stoch_k") is not None and values.get("stoch_d") is not None:
+        votes.append(1 if values["stoch_k"] > values["stoch_d"] else -1)
+
+    rating = sum(votes) / len(votes) if votes else 0.0
+    return {
+        "rating": rating,
+        "trend": "bullish" if rating > 0.1 else "bearish" if rating < -0.1 else "neutral",
+        "strength": "strong" if abs(rating) >= 0.5 else "moderate" if abs(rating) >= 0.2 else "weak"
+    }
+
+
+def stack(series: Sequence[np.ndarray], length: int) -> np.ndarray:
+    """Right-align series of different lengths into one (rows, length) array, NaN-free by edge padding"""
+    out = np.empty((len(series), length))
+    for i, values in enumerate(series):
+        values = np.asarray(values, dtype=np.float64)[-length:]
+        out[i, length - len(values):] = values
+        out[i, :length - len(values)] = values[0] if len(values) else 0.0
+    return out
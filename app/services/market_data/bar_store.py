@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.bot.constants import MARKETS, TIMEFRAMES
+from app.services.chart.ohlc import fetch_ohlc
+from app.services.market_data.intervals import INTERVAL_SECONDS
+from app.services.indicators.engine import IndicatorState
+from app.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Fixed-width record, identical in memory and on disk
+BAR_DTYPE = np.dtype([
+    ("time", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8")
+])
+
+FIELDS = ("open", "high", "low", "close")
+
+
+def _to_ohlc(bars: np.ndarray) -> Dict[str, np.ndarray]:
+    """Structured bars -> the dict of arrays the chart and indicator code use"""
+    return {"time": bars["time"], **{field: bars[field] for field in FIELDS}}
+
+
+class BarSeries:
+    """Closed bars of one instrument/timeframe plus the candle that is still forming.
+
+    Recent closed bars live in a fixed-size ring buffer; every closed bar is also appended
+    to a file that other processes can map read-only. Bars are identified by their bucket
+    (time // period), so a bucket is closed and written at most once.
+    """
+
+    def __init__(self, path: str, capacity: int, period: int = 1):
+        self.path = path
+        self.period = period
+        self.ring = np.zeros(capacity, dtype=BAR_DTYPE)
+        self.count = 0          # closed bars ever written to the ring
+        self.live: Optional[np.void] = None
+        self.indicators: Optional[IndicatorState] = None
+        self.latest_indicators: Dict[str, float] = {}
+        self.refreshed_at = float("-inf")
+        self._load()
+
+    @property
+    def last_time(self) -> int:
+        if self.live is not None:
+            return int(self.live["time"])
+        return int(self.ring[(self.count - 1) % len(self.ring)]["time"]) if self.count else -1
+
+    def _bucket(self, times):
+        return times // self.period
+
+    def _load(self):
+        """Rebuild the ring and indicator state from the history file"""
+        history = self.history()
+        if not len(history):
+            return
+        buckets = self._bucket(history["time"])
+        if len(history) > 1 and np.any(buckets[1:] <= buckets[:-1]):
+            # Written before bars were aligned: keep the first bar of every bucket, in order
+            keep = np.r_[True, buckets[1:] > np.maximum.accumulate(buckets)[:-1]]
+            logger.warning(f"{self.path}: dropping {int((~keep).sum())} overlapping bars from the history")
+            history = np.array(history[keep])
+            with open(self.path, "wb") as f:
+                f.write(history.tobytes())
+        self._push(history[-len(self.ring):])
+        self._seed_indicators(history)
+
+    def _seed_indicators(self, bars: np.ndarray):
+        # Seed from all but the last bar so update() hands us the latest values
+        self.indicators = IndicatorState.from_history(bars["high"][:-1], bars["low"][:-1], bars["close"][:-1])
+        self._update_indicators(bars[-1:])
+
+    def _update_indicators(self, bars: np.ndarray):
+        for bar in bars:
+            latest = self.indicators.update(bar["high"], bar["low"], bar["close"])
+        self.latest_indicators = {
+            name: float(values[0]) for name, values in latest.items() if not np.isnan(values[0])
+        }
+
+    def history(self) -> np.ndarray:
+        """All closed bars on disk, memory-mapped (zero-copy, read-only)"""
+        try:
+            records = os.path.getsize(self.path) // BAR_DTYPE.itemsize
+        except OSError:
+            return np.empty(0, dtype=BAR_DTYPE)
+        if records == 0:
+            return np.empty(0, dtype=BAR_DTYPE)
+        # Only whole records: a writer may be halfway through an append
+        return np.memmap(self.path, dtype=BAR_DTYPE, mode="r", shape=(records,))
+
+    def _push(self, bars: np.ndarray):
+        capacity = len(self.ring)
+        if len(bars) >= capacity:
+            bars = bars[-capacity:]
+            self.count += len(bars) - capacity
+        slots = (self.count + np.arange(len(bars))) % capacity
+        self.ring[slots] = bars
+        self.count += len(bars)
+
+    def recent(self, bars: int) -> np.ndarray:
+        """Up to `bars` closed bars from the ring, oldest first (a copy)"""
+        size = min(bars, self.count, len(self.ring))
+        slots = (self.count - size + np.arange(size)) % len(self.ring)
+        return self.ring[slots]
+
+    def ingest(self, bars: np.ndarray):
+        """Merge bars (oldest first, last one possibly still forming) into the series"""
+        buckets = self._bucket(bars["time"])
+        if self.live is not None:
+            # Same bucket as the live candle means it is still forming
+            keep = buckets >= self._bucket(self.live["time"])
+        else:
+            # Buckets that are already stored are never written again
+            keep = buckets > self._bucket(self.last_time)
+        # One bar per bucket, and only going forward
+        keep &= np.r_[True, buckets[1:] > np.maximum.accumulate(buckets)[:-1]]
+        bars = bars[keep]
+        if not len(bars):
+            return
+
+        if self.live is not None and self._bucket(bars[0]["time"]) > self._bucket(self.live["time"]):
+            # The candle we had open has closed
+            bars = np.concatenate([np.array([self.live], dtype=BAR_DTYPE), bars])
+        closed, self.live = bars[:-1], bars[-1].copy()
+        if not len(closed):
+            return
+
+        with open(self.path, "ab") as f:
+            f.write(closed.tobytes())
+        self._push(closed)
+
+        # New closed bars cost O(1) each for the indicators
+        if self.indicators is None:
+            self._seed_indicators(closed)
+        else:
+            self._update_indicators(closed)
+
+    def ohlc(self, bars: int, include_live: bool = True) -> Dict[str, np.ndarray]:
+        """The last `bars` bars as arrays; the ring first, the mapped history for longer spans"""
+        want = bars - 1 if include_live and self.live is not None else bars
+        if want <= min(self.count, len(self.ring)):
+            closed = self.recent(want)
+        else:
+            closed = np.asarray(self.history()[-want:])
+        if include_live and self.live is not None:
+            closed = np.concatenate([closed, np.array([self.live], dtype=BAR_DTYPE)])
+        return _to_ohlc(closed)
+
+
+class BarStore:
+    """OHLC bars for every instrument and timeframe, shared by charts, indicators and AI prompts"""
+
+    def __init__(self, directory: str = None, capacity: int = None, refresh_interval: int = None):
+        self.directory = directory or os.getenv("BAR_STORE_DIR", "data/bars")
+        self.capacity = capacity or int(os.getenv("BAR_RING_SIZE", 1000))
+        self.refresh_interval = refresh_interval or int(os.getenv("BAR_REFRESH_INTERVAL", 60))
+        self.series: Dict[Tuple[str, str], BarSeries] = {}
+        self.flight = SingleFlight("bars")
+        self._task: Optional[asyncio.Task] = None
+
+    def get_series(self, symbol: str, timeframe: str) -> BarSeries:
+        key = (symbol.upper(), timeframe.lower())
+        if key not in self.series:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"{key[0]}_{key[1]}.bars")
+            self.series[key] = BarSeries(path, self.capacity, INTERVAL_SECONDS.get(key[1], 1))
+        return self.series[key]
+
+    async def get_ohlc(self, symbol: str, timeframe: str, bars: int = 150) -> Dict[str, np.ndarray]:
+        """Latest bars from memory; only fetches when the series is cold or nothing refreshed it lately"""
+        series = self.get_series(symbol, timeframe)
+        if time.monotonic() - series.refreshed_at > self.refresh_interval:
+            await self.refresh(symbol, timeframe, backfill=bars)
+        return series.ohlc(bars)
+
+    def latest(self, symbol: str, timeframe: str) -> Tuple[Dict[str, np.ndarray], Dict[str, float]]:
+        """Recent bars and indicator values already in memory; never fetches"""
+        series = self.get_series(symbol, timeframe)
+        return series.ohlc(50), series.latest_indicators
+
+    async def refresh(self, symbol: str, timeframe: str, backfill: int = 0):
+        """Pull new bars from the data source; concurrent callers share one fetch"""
+        key = f"{symbol.upper()}:{timeframe.lower()}"
+        await self.flight.get(key, lambda: self._refresh(symbol, timeframe, backfill))
+
+    async def _refresh(self, symbol: str, timeframe: str, backfill: int):
+        series = self.get_series(symbol, timeframe)
+        ohlc = await fetch_ohlc(symbol, timeframe, max(backfill, 10))
+        bars = np.zeros(len(ohlc["close"]), dtype=BAR_DTYPE)
+        for field in ("time",) + FIELDS:
+            bars[field] = ohlc[field]
+        series.ingest(bars)
+        series.refreshed_at = time.monotonic()
+
+    async def start(self):
+        """Backfill every instrument/timeframe and keep them up to date"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _refresh_forever(self):
+        pairs = [(i, tf) for market in MARKETS.values() for i in market["instruments"] for tf in TIMEFRAMES]
+        semaphore = asyncio.Semaphore(int(os.getenv("BAR_REFRESH_CONCURRENCY", 5)))
+
+        async def refresh(symbol, timeframe):
+            async with semaphore:
+                try:
+                    await self.refresh(symbol, timeframe, backfill=self.capacity)
+                except Exception as e:
+                    logger.error(f"Error refreshing bars for {symbol} {timeframe}: {str(e)}")
+
+        while True:
+            await asyncio.gather(*(refresh(symbol, timeframe) for symbol, timeframe in pairs))
+            await asyncio.sleep(self.refresh_interval)
+
+
+bar_store = BarStore()
@@ -0,0 +1,318 @@
+import asyncio
+import logging
+import os
+import random
+import re
+import time
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.sentiment.scraper import NewsScraper
+from app.utils.metrics import STAGE_SECONDS
+from app.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Seconds a source may take before the aggregate goes out without it (NEWS_TIMEOUT_<SOURCE>)
+DEFAULT_TIMEOUT = float(os.getenv("NEWS_SOURCE_TIMEOUT", 4.0))
+
+# Estimated Jaccard similarity of two headlines' shingles above which they're the same story
+DEDUPE_THRESHOLD = float(os.getenv("NEWS_DEDUPE_THRESHOLD", 0.4))
+
+# How long an aggregate is reused for the same symbol
+CACHE_TTL = float(os.getenv("NEWS_CACHE_TTL", 120))
+
+# Ranking: impact, how many sources carried the story, and how fresh it is
+IMPACT_WEIGHTS = {"high": 3.0, "medium": 2.0, "low": 1.0}
+UNKNOWN_IMPACT_WEIGHT = 1.5
+SOURCE_WEIGHT = 1.5
+RECENCY_WEIGHT = 3.0
+HALF_LIFE_HOURS = float(os.getenv("NEWS_HALF_LIFE_HOURS", 6))
+
+RELATIVE_TIME = re.compile(r"(\d+)\s*(sec|second|min|minute|hr|hour|day|week)s?\s+ago", re.IGNORECASE)
+RELATIVE_UNITS = {"sec": 1, "second": 1, "min": 60, "minute": 60, "hr": 3600, "hour": 3600, "day": 86400, "week": 604800}
+
+# Impact labels as the sites write them (ForexFactory also colours its impact icons)
+IMPACT_LABELS = {"high": "high", "red": "high", "medium": "medium", "moderate": "medium", "ora": "medium", "low": "low", "yel": "low"}
+IMPACT_LABEL = re.compile(r"\b(" + "|".join(IMPACT_LABELS) + r")\b", re.IGNORECASE)
+
+CURRENCY_CODES = {"USD", "EUR", "GBP", "JPY", "AUD", "NZD", "CAD", "CHF", "CNY", "XAU", "XAG", "BTC", "ETH"}
+PAIR_SLASH = re.compile(r"\b([A-Z]{3})/([A-Z]{3})\b")
+INSTRUMENT = re.compile(r"\b[A-Z]{3}(?:[A-Z]{3})?\b")
+FIGURE = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*([kKmM]\b)?")
+
+NewsItem = Dict[str, Any]
+
+
+def parse_published(value: Optional[str], now: datetime = None) -> Optional[float]:
+    """Epoch seconds for an ISO timestamp or a relative time ("- 5 minutes ago"), None if unknown"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        published = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if published.tzinfo is None:
+            published = published.replace(tzinfo=timezone.utc)
+        return published.timestamp()
+    except ValueError:
+        pass
+
+    match = RELATIVE_TIME.search(value)
+    if match:
+        seconds = int(match.group(1)) * RELATIVE_UNITS[match.group(2).lower()]
+        return ((now or datetime.now(timezone.utc)) - timedelta(seconds=seconds)).timestamp()
+    return None
+
+
+def normalize_impact(value: Optional[str]) -> Optional[str]:
+    """'High Impact Expected', 'HIGH', 'red' and the like to high/medium/low"""
+    if not value:
+        return None
+    match = IMPACT_LABEL.search(value)
+    return IMPACT_LABELS[match.group(1).lower()] if match else None
+
+
+def normalize(item: Dict[str, Any], source: str, now: datetime = None) -> NewsItem:
+    """One scraped or generated item in the schema the sentiment stage reads"""
+    published = parse_published(item.get("time") or item.get("date"), now)
+    return {
+        "title": " ".join((item.get("title") or "").split()),
+        "summary": " ".join((item.get("summary") or "").split()),
+        "source": item.get("source") or source,
+        "date": datetime.fromtimestamp(published, timezone.utc).strftime("%Y-%m-%d %H:%M UTC") if published else item.get("date") or "",
+        "published": published,
+        "impact": normalize_impact(item.get("impact")) or item.get("impact") or "",
+        "url": item.get("url") or "",
+        "sources": [source]
+    }
+
+
+def shingles(text: str, size: int = 3) -> set:
+    """Overlapping character n-grams of the lowercased words; short headlines need characters, not words"""
+    text = " ".join(re.sub(r"[^0-9a-z]+", " ", text.lower()).split())
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def story_keys(title: str) -> Tuple[FrozenSet[str], FrozenSet[float]]:
+    """Instruments and figures a headline names; "275K" and "275,000" are the same figure"""
+    title = PAIR_SLASH.sub(r"\1\2", title)
+    instruments = frozenset(
+        word for word in INSTRUMENT.findall(title)
+        if word[:3] in CURRENCY_CODES and (len(word) == 3 or word[3:] in CURRENCY_CODES)
+    )
+    figures = set()
+    for number, suffix in FIGURE.findall(title):
+        value = float(number.replace(",", ""))
+        figures.add(value * {"k": 1e3, "m": 1e6}.get(suffix.lower(), 1))
+    return instruments, frozenset(figures)
+
+
+def conflicting(a: Tuple[FrozenSet[str], FrozenSet[float]], b: Tuple[FrozenSet[str], FrozenSet[float]]) -> bool:
+    """Headlines that both name pairs or figures but not the same ones are different stories,
+    however alike the rest of the wording ("EUR/USD edges higher" vs "GBP/USD edges higher")"""
+    return bool(a[0] and b[0] and a[0] != b[0]) or bool(a[1] and b[1] and not a[1] & b[1])
+
+
+class MinHashIndex:
+    """Near-duplicate lookup: MinHash signatures over headline shingles, banded into an LSH table.
+
+    With `bands` bands of `rows` rows, two headlines share a bucket with probability
+    1 - (1 - s^rows)^bands for Jaccard similarity s (~0.99 at s=0.4 with the defaults);
+    candidates are then checked against the threshold on the full signature.
+    """
+
+    def __init__(self, threshold: float = None, num_perm: int = 64, bands: int = 32, shingle_size: int = 3, seed: int = 1):
+        self.threshold = DEDUPE_THRESHOLD if threshold is None else threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        # Multiply-shift hashing: odd 64-bit multipliers, products wrap mod 2^64, keep the high 32 bits
+        rng = random.Random(seed)
+        self._a = np.array([rng.getrandbits(64) | 1 for _ in range(num_perm)], dtype=np.uint64)[:, None]
+        self._b = np.array([rng.getrandbits(64) for _ in range(num_perm)], dtype=np.uint64)[:, None]
+        self._buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(bands)]
+        # One row per stored headline, so candidates are scored in a single comparison
+        self._signatures = np.empty((64, num_perm), dtype=np.uint32)
+        self.labels: List[Any] = []
+
+    def signature(self, text: str) -> np.ndarray:
+        hashed = np.fromiter((zlib.crc32(s.encode()) for s in shingles(text, self.shingle_size)), dtype=np.uint64)
+        return ((self._a * hashed + self._b) >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+    def _keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def query(self, signature: np.ndarray) -> List[Tuple[Any, float]]:
+        """Labels of stored headlines at or above the threshold, most similar first"""
+        candidates = set()
+        for band, key in enumerate(self._keys(signature)):
+            candidates.update(self._buckets[band].get(key, ()))
+        if not candidates:
+            return []
+        candidates = np.fromiter(candidates, dtype=np.intp, count=len(candidates))
+        similarities = (self._signatures[candidates] == signature).mean(axis=1)
+
+        best: Dict[Any, float] = {}
+        for candidate, similarity in zip(candidates[similarities >= self.threshold].tolist(),
+                                         similarities[similarities >= self.threshold].tolist()):
+            label = self.labels[candidate]
+            if similarity > best.get(label, 0.0):
+                best[label] = similarity
+        return sorted(best.items(), key=lambda match: match[1], reverse=True)
+
+    def add(self, signature: np.ndarray, label: Any):
+        index = len(self.labels)
+        if index == len(self._signatures):
+            self._signatures = np.concatenate([self._signatures, np.empty_like(self._signatures)])
+        self._signatures[index] = signature
+        self.labels.append(label)
+        for band, key in enumerate(self._keys(signature)):
+            self._buckets[band][key].append(index)
+
+
+def _merge_into(kept: NewsItem, duplicate: NewsItem):
+    """Fold a near-duplicate into the item that's kept"""
+    kept["variants"].append(duplicate["title"])
+    for source in duplicate["sources"]:
+        if source not in kept["sources"]:
+            kept["sources"].append(source)
+    for field in ("summary", "url", "date"):
+        if not kept[field] and duplicate[field]:
+            kept[field] = duplicate[field]
+    if IMPACT_WEIGHTS.get(duplicate["impact"], 0) > IMPACT_WEIGHTS.get(kept["impact"], 0):
+        kept["impact"] = duplicate["impact"]
+    # A story still being picked up is as fresh as its latest report
+    if duplicate["published"] and (not kept["published"] or duplicate["published"] > kept["published"]):
+        kept["published"] = duplicate["published"]
+
+
+def score(item: NewsItem, now: float = None) -> float:
+    impact = IMPACT_WEIGHTS.get(item["impact"], UNKNOWN_IMPACT_WEIGHT)
+    coverage = SOURCE_WEIGHT * (len(item["sources"]) - 1)
+    if item["published"]:
+        age_hours = max(0.0, ((now or time.time()) - item["published"]) / 3600)
+        recency = RECENCY_WEIGHT * 0.5 ** (age_hours / HALF_LIFE_HOURS)
+    else:
+        recency = RECENCY_WEIGHT * 0.25
+    return round(impact + coverage + recency, 3)
+
+
+def merge(batches: List[List[NewsItem]], threshold: float = None, now: float = None) -> List[NewsItem]:
+    """Dedupe normalized items across sources and rank them, best first"""
+    index = MinHashIndex(threshold)
+    merged: List[NewsItem] = []
+    keys: List[List[Tuple[FrozenSet[str], FrozenSet[float]]]] = []
+    for batch in batches:
+        for item in batch:
+            if not item["title"]:
+                continue
+            signature = index.signature(item["title"])
+            item_keys = story_keys(item["title"])
+            # Every headline of a story stays in the index, so a rewording can match any of them
+            match = next((
+                story for story, _ in index.query(signature)
+                if not any(conflicting(item_keys, other) for other in keys[story])
+            ), None)
+            if match is None:
+                match = len(merged)
+                merged.append({**item, "sources": list(item["sources"]), "variants": []})
+                keys.append([])
+            else:
+                _merge_into(merged[match], item)
+            index.add(signature, match)
+            keys[match].append(item_keys)
+
+    for item in merged:
+        item["score"] = score(item, now)
+    return sorted(merged, key=lambda item: item["score"], reverse=True)
+
+
+class NewsAggregator:
+    """Fetches every news source concurrently and merges them into one deduped, ranked list"""
+
+    def __init__(self, sources: Dict[str, Callable[[str], Awaitable[List[dict]]]] = None,
+                 timeouts: Dict[str, float] = None):
+        if sources is None:
+            scraper = NewsScraper()
+            sources = {
+                "forexfactory": scraper.scrape_forex_factory,
+                "investing": scraper.scrape_investing_com,
+                "tradingview": scraper.scrape_tradingview
+            }
+        self.sources = sources
+        self.timeouts = {
+            name: float(os.getenv(f"NEWS_TIMEOUT_{name.upper()}", (timeouts or {}).get(name, DEFAULT_TIMEOUT)))
+            for name in sources
+        }
+        self._cache: Dict[str, Tuple[float, List[NewsItem]]] = {}
+        self.flight = SingleFlight("news", get_cached=self._get_cached, set_cached=self._set_cached)
+        # Per source: status, items and seconds of the last fetch
+        self.last_run: Dict[str, Dict[str, Any]] = {}
+
+    def _get_cached(self, key: str) -> Optional[List[NewsItem]]:
+        cached = self._cache.get(key)
+        if cached and time.monotonic() - cached[0] < CACHE_TTL:
+            return cached[1]
+        return None
+
+    def _set_cached(self, key: str, items: List[NewsItem]):
+        self._cache[key] = (time.monotonic(), items)
+
+    async def collect(self, symbol: str) -> List[NewsItem]:
+        """Merged news for a symbol; concurrent callers share one fetch and the result is reused for a while"""
+        try:
+            return await self.flight.get(f"news:{symbol}", lambda: self.fetch(symbol))
+        except Exception as e:
+            logger.error(f"Error collecting news for {symbol}: {str(e)}")
+            return []
+
+    async def fetch(self, symbol: str) -> List[NewsItem]:
+        """Scrape all sources at once; a source that errors or runs past its timeout is left out"""
+        started = time.perf_counter()
+        names = list(self.sources)
+        results = await asyncio.gather(*(self._fetch_source(name, symbol) for name in names))
+        batches = [batch for batch in results if batch]
+
+        # Dedupe is pure CPU but only a few hundred headlines; not worth a hop to the pool
+        items = merge(batches)
+        STAGE_SECONDS.labels("news").observe(time.perf_counter() - started)
+        logger.info(f"News for {symbol}: {sum(map(len, batches))} items from {len(batches)}/{len(names)} sources, {len(items)} after dedupe")
+        return items
+
+    async def _fetch_source(self, name: str, symbol: str) -> List[NewsItem]:
+        started = time.perf_counter()
+        status, items = "ok", []
+        try:
+            raw = await asyncio.wait_for(self.sources[name](symbol), timeout=self.timeouts[name])
+            now = datetime.now(timezone.utc)
+            items = [normalize(item, name, now) for item in raw]
+        except asyncio.TimeoutError:
+            status = "timeout"
+            logger.warning(f"News source {name} timed out after {self.timeouts[name]}s")
+        except Exception as e:
+            status = "failed"
+            logger.error(f"Error fetching news from {name}: {str(e)}")
+
+        seconds = time.perf_counter() - started
+        STAGE_SECONDS.labels(f"news_{name}").observe(seconds)
+        self.last_run[name] = {"status": status, "items": len(items), "seconds": round(seconds, 3)}
+        return items
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sources": self.last_run,
+            "cached_symbols": len(self._cache),
+            "hits": self.flight.hits,
+            "misses": self.flight.misses,
+            "coalesced": self.flight.coalesced
+        }
+
+
+news_aggregator = NewsAggregator()
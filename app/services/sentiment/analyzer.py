@@ -1,23 +1,90 @@
 from openai import AsyncOpenAI
-import aiohttp
+import asyncio
 import os
+import re
 import json
+import time
 import logging
+from typing import Dict, List
+
+from app.services.sentiment.aggregator import merge, news_aggregator, normalize
+from app.utils.http import http_clients
+from app.utils.metrics import observe_llm
 
 logger = logging.getLogger(__name__)
 
+PERPLEXITY_API_URL = os.getenv("PERPLEXITY_API_URL", "https://api.perplexity.ai/chat/completions")
+
+# Scraped headlines a symbol needs before Perplexity is skipped, and how many go into the prompt
+NEWS_MIN_ITEMS = int(os.getenv("NEWS_MIN_ITEMS", 3))
+NEWS_MAX_ITEMS = int(os.getenv("NEWS_MAX_ITEMS", 8))
+
+# Batched prompts put every symbol in its own section: "=== EURUSD ==="
+SECTION_MARKER = re.compile(r"^[\s#*]*=+\s*([A-Z0-9/]+)\s*=+[\s*]*$", re.MULTILINE)
+
+SENTIMENT_FORMAT = """📈 Market Sentiment:
+• Direction: [Bullish/Bearish/Neutral]
+• Strength: [Strong/Moderate/Weak]
+• Key drivers: [Summary of main news drivers]
+
+💡 Trading Implications:
+• Short-term outlook
+• Risks and opportunities
+• Key price levels to watch
+
+⚠️ Risk Factors:
+• List at least 2 key risks
+• Focus on economic factors
+
+🎯 Conclusion:
+Brief summary and trading strategy"""
+
+
+def _split_sections(content: str, symbols: List[str]) -> Dict[str, str]:
+    """Cut a batched response back into one text per requested symbol"""
+    wanted = {symbol.replace("/", "").upper(): symbol for symbol in symbols}
+    markers = list(SECTION_MARKER.finditer(content))
+    sections = {}
+    for i, marker in enumerate(markers):
+        symbol = wanted.get(marker.group(1).replace("/", ""))
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(content)
+        text = content[marker.end():end].strip()
+        if symbol and text and symbol not in sections:
+            sections[symbol] = text
+    return sections
+
+
 class SentimentAnalyzer:
     def __init__(self):
         self.openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self.perplexity_key = os.getenv("PERPLEXITY_API_KEY")
+        self.news = news_aggregator
+        
+        # Symbols requested within this window share one Perplexity and one OpenAI call
+        self.batch_window = float(os.getenv("SENTIMENT_BATCH_WINDOW", 0.25))
+        self.batch_size = int(os.getenv("SENTIMENT_BATCH_SIZE", 8))
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._timer = None
+        self._batches = set()
+        
+        self.requests = 0
+        self.batches = 0
+        self.batched_symbols = 0
+        self.fallbacks = 0
+        self.llm_calls = 0
+        self.perplexity_skipped = 0
         
     async def analyze(self, symbol: str) -> str:
-        """Analyze market sentiment using Perplexity and OpenAI"""
+        """Analyze market sentiment using scraped news (topped up by Perplexity) and OpenAI"""
+        self.requests += 1
+        return await self._analyze(symbol)
+    
+    async def _analyze(self, symbol: str) -> str:
         try:
-            # Step 1: Get news from Perplexity
-            news_data = await self._get_perplexity_news(symbol)
+            # Step 1: Get news from the scrapers, Perplexity when they come up short
+            news_data = await self._get_news(symbol)
             
-            if not news_data:
+            if not news_data.get('news'):
                 raise Exception("No news data available")
                 
             # Step 2: Format news for OpenAI
@@ -32,24 +99,134 @@ class SentimentAnalyzer:
             logger.error(f"Error in analyze: {str(e)}")
             return "Error analyzing market sentiment"
             
+    async def analyze_batched(self, symbol: str) -> str:
+        """Like analyze, but shares the LLM calls with other symbols requested in the same window"""
+        future = self._pending.get(symbol)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[symbol] = future
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+        return await asyncio.shield(future)
+    
+    def _flush(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, {}
+        if pending:
+            task = asyncio.create_task(self._run_batch(pending))
+            # Keep a reference so the task isn't garbage collected mid-flight
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+    
+    async def _run_batch(self, pending: Dict[str, asyncio.Future]):
+        symbols = list(pending)
+        self.requests += len(symbols)
+        try:
+            results = await self.analyze_batch(symbols) if len(symbols) > 1 else {}
+        except Exception as e:
+            logger.error(f"Error in batched sentiment for {symbols}: {str(e)}")
+            results = {}
+        
+        # Symbols the batch didn't cover go through the normal path
+        missing = [symbol for symbol in symbols if symbol not in results]
+        if missing:
+            if len(symbols) > 1:
+                self.fallbacks += len(missing)
+            for symbol, text in zip(missing, await asyncio.gather(*(self._analyze(s) for s in missing))):
+                results[symbol] = text
+        
+        for symbol, future in pending.items():
+            if not future.done():
+                future.set_result(results[symbol])
+    
+    async def analyze_batch(self, symbols: List[str]) -> Dict[str, str]:
+        """Sentiment for several symbols with one Perplexity and one OpenAI call"""
+        self.batches += 1
+        self.batched_symbols += len(symbols)
+        
+        scraped = dict(zip(symbols, await asyncio.gather(*(self.news.collect(symbol) for symbol in symbols))))
+        short = [symbol for symbol in symbols if len(scraped[symbol]) < NEWS_MIN_ITEMS]
+        self.perplexity_skipped += len(symbols) - len(short)
+        extra = await self._get_perplexity_news_batch(short) if short else {}
+        news = {
+            symbol: self._merge_news(scraped[symbol], extra.get(symbol, {}))
+            for symbol in symbols
+        }
+        news = {symbol: data for symbol, data in news.items() if data.get('news')}
+        if not news:
+            return {}
+        
+        sections = "\n\n".join(
+            f"=== {symbol} ===\n{self._format_news_for_openai(data)}" for symbol, data in news.items()
+        )
+        prompt = f"""Analyze the following news, grouped per forex pair:
+
+{sections}
+
+For EVERY pair, start with a line "=== PAIR ===" and then give your analysis in exactly this format:
+
+{SENTIMENT_FORMAT}"""
+        
+        self.llm_calls += 1
+        started = time.perf_counter()
+        response = await self.openai_client.chat.completions.create(
+            model="gpt-4",
+            messages=[
+                {"role": "system", "content": "You are an expert forex analyst specializing in market sentiment analysis."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7
+        )
+        observe_llm("gpt-4", time.perf_counter() - started, response.usage)
+        return _split_sections(response.choices[0].message.content, list(news))
+    
+    async def _get_news(self, symbol: str) -> dict:
+        """Merged, ranked scraper news; Perplexity is only asked when the scrapers found too little"""
+        scraped = await self.news.collect(symbol)
+        if len(scraped) >= NEWS_MIN_ITEMS:
+            self.perplexity_skipped += 1
+            return self._merge_news(scraped, {})
+        return self._merge_news(scraped, await self._get_perplexity_news(symbol))
+    
+    def _merge_news(self, scraped: List[dict], perplexity: dict) -> dict:
+        """Scraped items and Perplexity's in one deduped list, best first"""
+        generated = [normalize(item, "perplexity") for item in perplexity.get('news', []) if item.get('title')]
+        items = merge([scraped, generated]) if generated else scraped
+        return {'news': items[:NEWS_MAX_ITEMS]}
+    
+    async def _get_perplexity_news_batch(self, symbols: List[str]) -> Dict[str, dict]:
+        """News for several symbols in one Perplexity call"""
+        try:
+            content = await self._perplexity_request(
+                f"""Analyze the latest market news for each of these forex pairs: {', '.join(symbols)}.
+
+                    For EVERY pair, start with a line "=== PAIR ===" followed by its news items, formatted as:
+                    Title: [article title]
+                    Date: [publication date]
+                    Source: [news source]
+                    Summary: [brief summary, max 3 sentences]
+                    Impact: [specific impact on that pair's price]
+
+                    Provide at least 3 recent, high-impact news items per pair.""",
+                max_tokens=min(1000 * len(symbols), 4000)
+            )
+            return {
+                symbol: self._parse_perplexity_response(text)
+                for symbol, text in _split_sections(content, symbols).items()
+            }
+        except Exception as e:
+            logger.error(f"Error getting batched news from Perplexity: {str(e)}")
+            return {}
+    
     async def _get_perplexity_news(self, symbol: str) -> dict:
         """Get news from Perplexity AI"""
         try:
-            url = "https://api.perplexity.ai/chat/completions"
-            
-            headers = {  # Define headers here
-                "Authorization": f"Bearer {self.perplexity_key}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "model": "sonar-pro",
-                "messages": [{
-                    "role": "system",
-                    "content": "You are a financial market analyst providing news summaries."
-                }, {
-                    "role": "user", 
-                    "content": f"""Analyze the latest market news for {symbol} forex pair.
+            content = await self._perplexity_request(
+                f"""Analyze the latest market news for {symbol} forex pair.
 
                     Format your response as:
                     Title: [article title]
@@ -59,29 +236,47 @@ class SentimentAnalyzer:
                     Impact: [specific impact on {symbol} price]
 
                     Provide at least 3 recent, high-impact news items."""
-                }],
-                "temperature": 0.7,
-                "top_p": 1,
-                "max_tokens": 1000
-            }
-            
-            logger.debug(f"Making Perplexity API call for {symbol}")
-            logger.debug(f"Using token: {self.perplexity_key[:8]}...{self.perplexity_key[-4:]}")
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        logger.info("✅ Perplexity API call successful")
-                        return self._parse_perplexity_response(data['choices'][0]['message']['content'])
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Perplexity API error response: {error_text}")
-                        raise Exception(f"Perplexity API error: {response.status}")
+            )
+            return self._parse_perplexity_response(content)
                         
         except Exception as e:
             logger.error(f"Error getting news from Perplexity: {str(e)}")
             return {}
+    
+    async def _perplexity_request(self, content: str, max_tokens: int = 1000) -> str:
+        """One Perplexity chat completion, returns the message text"""
+        headers = {
+            "Authorization": f"Bearer {self.perplexity_key}",
+            "Content-Type": "application/json"
+        }
+        
+        payload = {
+            "model": "sonar-pro",
+            "messages": [{
+                "role": "system",
+                "content": "You are a financial market analyst providing news summaries."
+            }, {
+                "role": "user",
+                "content": content
+            }],
+            "temperature": 0.7,
+            "top_p": 1,
+            "max_tokens": max_tokens
+        }
+        
+        self.llm_calls += 1
+        started = time.perf_counter()
+        session = http_clients.session(PERPLEXITY_API_URL)
+        async with session.post(PERPLEXITY_API_URL, json=payload, headers=headers) as response:
+            if response.status == 200:
+                data = await response.json()
+                observe_llm(payload["model"], time.perf_counter() - started, data.get("usage"))
+                logger.info("✅ Perplexity API call successful")
+                return data['choices'][0]['message']['content']
+            else:
+                error_text = await response.text()
+                logger.error(f"Perplexity API error response: {error_text}")
+                raise Exception(f"Perplexity API error: {response.status}")
             
     def _parse_perplexity_response(self, content: str) -> dict:
         """Parse Perplexity response into structured format"""
@@ -122,23 +317,10 @@ class SentimentAnalyzer:
 
 Provide your analysis in exactly this format:
 
-📈 Market Sentiment:
-• Direction: [Bullish/Bearish/Neutral]
-• Strength: [Strong/Moderate/Weak]
-• Key drivers: [Summary of main news drivers]
-
-💡 Trading Implications:
-• Short-term outlook
-• Risks and opportunities
-• Key price levels to watch
-
-⚠️ Risk Factors:
-• List at least 2 key risks
-• Focus on economic factors
-
-🎯 Conclusion:
-Brief summary and trading strategy"""
+{SENTIMENT_FORMAT}"""
 
+            self.llm_calls += 1
+            started = time.perf_counter()
             response = await self.openai_client.chat.completions.create(
                 model="gpt-4",
                 messages=[
@@ -147,6 +329,7 @@ Brief summary and trading strategy"""
                 ],
                 temperature=0.7
             )
+            observe_llm("gpt-4", time.perf_counter() - started, response.usage)
             
             return response.choices[0].message.content
             
@@ -159,12 +342,30 @@ Brief summary and trading strategy"""
         formatted_news = []
         
         for item in news_data.get('news', []):
-            formatted_news.append(
-                f"📰 {item['title']}\n"
-                f"📅 {item['date']}\n"
-                f"📱 {item['source']}\n"
-                f"📝 {item['summary']}\n"
-                f"📊 Impact: {item['impact']}\n"
-            )
+            # Scraped items don't all carry every field
+            lines = [f"📰 {item['title']}"]
+            if item.get('date'):
+                lines.append(f"📅 {item['date']}")
+            # Name every site that ran a story, the outlet when only one did
+            sources = item.get('sources', [])
+            lines.append(f"📱 {', '.join(sources) if len(sources) > 1 else item.get('source', '')}")
+            if item.get('summary'):
+                lines.append(f"📝 {item['summary']}")
+            if item.get('impact'):
+                lines.append(f"📊 Impact: {item['impact']}")
+            formatted_news.append("\n".join(lines) + "\n")
             
-        return "\n\n".join(formatted_news) 
\ No newline at end of file
+        return "\n\n".join(formatted_news) 
+    
+    def stats(self) -> Dict[str, int]:
+        """Batching counters; calls_saved is against one Perplexity and one OpenAI call per request"""
+        return {
+            "requests": self.requests,
+            "llm_calls": self.llm_calls,
+            "batches": self.batches,
+            "batched_symbols": self.batched_symbols,
+            "fallbacks": self.fallbacks,
+            # Failed batches and their fallbacks show up in llm_calls, so they count against this
+            "calls_saved": 2 * self.requests - self.llm_calls,
+            "perplexity_skipped": self.perplexity_skipped
+        }
@@ -1,6 +1,23 @@
-from bs4 import BeautifulSoup
-import aiohttp
+from app.utils.html_rows import RowSpec, extract_rows
+from app.utils.http import http_clients
 import logging
+import os
+
+from yarl import URL
+
+FOREXFACTORY_NEWS = RowSpec(".news_item", {"title": ".title", "time": ".time", "impact": ".impact"})
+INVESTING_NEWS = RowSpec(".articleItem", {"title": ".title", "time": ".date", "summary": ".description"})
+# Same fields the signal processor's NewsScraper reads from TradingView
+TRADINGVIEW_NEWS = RowSpec(".news-article", {"title": ".title", "summary": ".summary", "time": ".time", "url": "a@href"})
+
+# {symbol} is filled in per request; overridable to scrape a mirror or local fixtures
+FOREXFACTORY_NEWS_URL = os.getenv("FOREXFACTORY_NEWS_URL", "https://www.forexfactory.com/news?symbol={symbol}")
+INVESTING_NEWS_URL = os.getenv("INVESTING_NEWS_URL", "https://www.investing.com/currencies/{symbol}-news")
+TRADINGVIEW_NEWS_URL = os.getenv("TRADINGVIEW_NEWS_URL", "https://www.tradingview.com/news/{symbol}/")
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
 
 class NewsScraper:
     def __init__(self):
@@ -9,26 +26,16 @@ class NewsScraper:
     async def scrape_forex_factory(self, symbol: str) -> list:
         """Scrape ForexFactory news for given symbol"""
         try:
-            url = f"https://www.forexfactory.com/news?symbol={symbol}"
+            url = FOREXFACTORY_NEWS_URL.format(symbol=symbol)
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        html = await response.text()
-                        soup = BeautifulSoup(html, 'html.parser')
-                        
-                        news_items = []
-                        for item in soup.select('.news_item'):
-                            news_items.append({
-                                'title': item.select_one('.title').text.strip(),
-                                'time': item.select_one('.time').text.strip(),
-                                'impact': item.select_one('.impact').text.strip()
-                            })
-                            
-                        return news_items
-                    else:
-                        self.logger.error(f"Error scraping ForexFactory: {response.status}")
-                        return []
+            async with http_clients.session(url).get(url) as response:
+                if response.status == 200:
+                    html = await response.text()
+                    # One pass over the page for all items
+                    return self._news_items(html, FOREXFACTORY_NEWS)
+                else:
+                    self.logger.error(f"Error scraping ForexFactory: {response.status}")
+                    return []
                         
         except Exception as e:
             self.logger.error(f"Error in scrape_forex_factory: {str(e)}")
@@ -37,31 +44,41 @@ class NewsScraper:
     async def scrape_investing_com(self, symbol: str) -> list:
         """Scrape Investing.com news for given symbol"""
         try:
-            url = f"https://www.investing.com/currencies/{symbol.lower()}-news"
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
+            url = INVESTING_NEWS_URL.format(symbol=symbol.lower())
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        html = await response.text()
-                        soup = BeautifulSoup(html, 'html.parser')
-                        
-                        news_items = []
-                        for item in soup.select('.articleItem'):
-                            news_items.append({
-                                'title': item.select_one('.title').text.strip(),
-                                'time': item.select_one('.date').text.strip(),
-                                'summary': item.select_one('.description').text.strip()
-                            })
-                            
-                        return news_items
-                    else:
-                        self.logger.error(f"Error scraping Investing.com: {response.status}")
-                        return []
+            async with http_clients.session(url).get(url, headers=HEADERS) as response:
+                if response.status == 200:
+                    html = await response.text()
+                    return self._news_items(html, INVESTING_NEWS)
+                else:
+                    self.logger.error(f"Error scraping Investing.com: {response.status}")
+                    return []
                         
         except Exception as e:
             self.logger.error(f"Error in scrape_investing_com: {str(e)}")
-            return [] 
\ No newline at end of file
+            return []
+
+    async def scrape_tradingview(self, symbol: str) -> list:
+        """Scrape TradingView news for given symbol"""
+        try:
+            url = TRADINGVIEW_NEWS_URL.format(symbol=symbol)
+            
+            async with http_clients.session(url).get(url, headers=HEADERS) as response:
+                if response.status == 200:
+                    html = await response.text()
+                    items = self._news_items(html, TRADINGVIEW_NEWS)
+                    # Links on the page are relative
+                    for item in items:
+                        item["url"] = str(response.url.join(URL(item["url"])))
+                    return items
+                else:
+                    self.logger.error(f"Error scraping TradingView: {response.status}")
+                    return []
+                        
+        except Exception as e:
+            self.logger.error(f"Error in scrape_tradingview: {str(e)}")
+            return []
+
+    def _news_items(self, html: str, spec: RowSpec) -> list:
+        """Items with all fields; an incomplete item is skipped instead of failing the page"""
+        return [item for item in extract_rows(html, spec) if all(item.values())]
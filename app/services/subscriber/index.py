@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import os
+import threading
+from array import array
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from app.utils.executors import run_io
+
+logger = logging.getLogger(__name__)
+
+# Supabase returns at most 1000 rows per request
+PAGE_SIZE = 1000
+
+
+class SubscriptionIndex:
+    """Process-local inverted index from a preference key to chat ids"""
+
+    def __init__(self, loader: Callable[[], Iterable[Tuple[Hashable, int]]], resync_interval: int = None):
+        self.loader = loader
+        self.resync_interval = resync_interval or int(os.getenv("SUBSCRIPTION_RESYNC_INTERVAL", 300))
+        self._index: Dict[Hashable, array] = {}
+        self._lock = threading.Lock()
+        self._pending: Optional[list] = None  # changes made while a reload is running
+        self._task: Optional[asyncio.Task] = None
+        self.loaded = False
+
+    def load(self):
+        """Rebuild the index from the database (blocking)"""
+        with self._lock:
+            self._pending = []
+
+        try:
+            rows: Dict[Hashable, set] = {}
+            for key, chat_id in self.loader():
+                rows.setdefault(key, set()).add(chat_id)
+            index = {key: array('q', sorted(chat_ids)) for key, chat_ids in rows.items()}
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            # Replay callback changes that raced with the reload
+            for op, key, chat_id in self._pending:
+                self._apply(index, op, key, chat_id)
+            self._pending = None
+            self._index = index
+
+        self.loaded = True
+        logger.info(f"Subscription index loaded: {len(index)} keys, {self.size()} subscriptions")
+
+    def add(self, key: Hashable, chat_id):
+        """Register a new subscription"""
+        with self._lock:
+            self._apply(self._index, "add", key, int(chat_id))
+            if self._pending is not None:
+                self._pending.append(("add", key, int(chat_id)))
+
+    def remove(self, key: Hashable, chat_id):
+        """Drop a subscription"""
+        with self._lock:
+            self._apply(self._index, "remove", key, int(chat_id))
+            if self._pending is not None:
+                self._pending.append(("remove", key, int(chat_id)))
+
+    def match(self, key: Hashable) -> array:
+        """Chat ids subscribed to a key; O(1) lookup, returns a copy"""
+        chat_ids = self._index.get(key)
+        return array('q', chat_ids) if chat_ids else array('q')
+
+    def size(self) -> int:
+        return sum(len(chat_ids) for chat_ids in self._index.values())
+
+    @staticmethod
+    def _apply(index: Dict[Hashable, array], op: str, key: Hashable, chat_id: int):
+        if op == "add":
+            chat_ids = index.setdefault(key, array('q'))
+            if chat_id not in chat_ids:
+                chat_ids.append(chat_id)
+            return
+
+        chat_ids = index.get(key)
+        if chat_ids is not None and chat_id in chat_ids:
+            chat_ids.remove(chat_id)
+            if not chat_ids:
+                del index[key]
+
+    async def start(self):
+        """Load once and keep resyncing in the background"""
+        try:
+            await run_io(self.load)
+        except Exception as e:
+            # Matching falls back to the database until a resync succeeds
+            logger.error(f"Error loading subscription index: {str(e)}")
+        if self._task is None:
+            self._task = asyncio.create_task(self._resync_forever())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _resync_forever(self):
+        while True:
+            await asyncio.sleep(self.resync_interval)
+            try:
+                await run_io(self.load)
+            except Exception as e:
+                # Keep serving the previous index until the next attempt
+                logger.error(f"Error resyncing subscription index: {str(e)}")
+
+
+def preference_key(market: str, instrument: str, timeframe: str) -> Tuple[str, str, str]:
+    return (market, instrument, timeframe)
+
+
+def load_signal_preferences() -> Iterable[Tuple[Tuple[str, str, str], int]]:
+    """Yield every row of signal_preferences, page by page"""
+    from app.utils.supabase import supabase
+
+    start = 0
+    while True:
+        # postgrest 0.11 treats the end of range() as exclusive
+        response = supabase.table("signal_preferences").select(
+            "user_id,market,instrument,timeframe"
+        ).range(start, start + PAGE_SIZE).execute()
+
+        for pref in response.data:
+            yield preference_key(pref["market"], pref["instrument"], pref["timeframe"]), int(pref["user_id"])
+
+        if len(response.data) < PAGE_SIZE:
+            break
+        start += PAGE_SIZE
+
+
+subscription_index = SubscriptionIndex(load_signal_preferences)
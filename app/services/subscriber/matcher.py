@@ -1,6 +1,7 @@
 from app.services.signal_processor.models import TradingSignal
 from app.utils.logger import logger
 from app.utils.supabase import supabase
+from app.utils.executors import run_io
 from typing import List
 
 class SubscriberMatcher:
@@ -16,7 +17,7 @@ class SubscriberMatcher:
         """Find subscribers matching the signal criteria from the database"""
         try:
             # Query subscribers based on market and symbol
-            response = supabase.table("signal_preferences").select(
+            response = await run_io(supabase.table("signal_preferences").select(
                 "signal_preferences.id",
                 "signal_preferences.market",
                 "signal_preferences.symbol",
@@ -30,7 +31,7 @@ class SubscriberMatcher:
                 "users",  # Join met users tabel
                 "signal_preferences.user_id",
                 "users.id"
-            ).execute()
+            ).execute)
             
             if response.data:
                 self.logger.info(f"Found {len(response.data)} matching subscribers")
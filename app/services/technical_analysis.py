@@ -1,22 +1,67 @@
+import asyncio
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from app.services.market_data.bar_store import bar_store
+from app.services.indicators.engine import compute_all, latest_row, summarize, stack
 
 logger = logging.getLogger(__name__)
 
+# Enough history for the slowest indicator to settle
+HISTORY_BARS = 500
+
+
+def _round(values: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: None if value is None else round(value, 6) for name, value in values.items()}
+
+
 async def analyze_technical(data: Dict[str, Any]) -> Dict[str, Any]:
     """Analyze technical indicators for a given instrument"""
     try:
-        # TODO: Implement actual technical analysis
-        analysis = {
-            "trend": "bullish",
-            "strength": "strong",
-            "indicators": {
-                "rsi": 65,
-                "macd": "bullish crossover",
-                "ema": "above 20"
-            }
-        }
-        return analysis
+        # Callers can pass candles directly, otherwise take them from the bar store
+        if "close" in data:
+            ohlc = {field: np.asarray(data[field], dtype=np.float64) for field in ("high", "low", "close")}
+        else:
+            symbol = data.get("instrument") or data["symbol"]
+            ohlc = await bar_store.get_ohlc(symbol, data.get("timeframe", "1h"), HISTORY_BARS)
+
+        values = latest_row(compute_all(ohlc["high"], ohlc["low"], ohlc["close"]))
+        return {**summarize(values, float(ohlc["close"][-1])), "indicators": _round(values)}
+    except Exception as e:
+        logger.error(f"Technical analysis error: {str(e)}")
+        raise
+
+
+async def analyze_technical_batch(pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """Analyze many (symbol, timeframe) pairs with one vectorized indicator pass"""
+    try:
+        candles = await asyncio.gather(
+            *(bar_store.get_ohlc(symbol, timeframe, HISTORY_BARS) for symbol, timeframe in pairs),
+            return_exceptions=True
+        )
+
+        ok = [(pair, ohlc) for pair, ohlc in zip(pairs, candles)
+              if not isinstance(ohlc, Exception) and len(ohlc["close"])]
+        for pair, ohlc in zip(pairs, candles):
+            if isinstance(ohlc, Exception):
+                logger.error(f"Error fetching candles for {pair}: {str(ohlc)}")
+        if not ok:
+            return {}
+
+        # Shorter histories are left-padded; their real length keeps the padding out of the warmup
+        length = max(len(ohlc["close"]) for _, ohlc in ok)
+        indicators = compute_all(
+            *(stack([ohlc[field] for _, ohlc in ok], length) for field in ("high", "low", "close")),
+            lengths=[len(ohlc["close"]) for _, ohlc in ok]
+        )
+
+        results = {}
+        for row, (pair, ohlc) in enumerate(ok):
+            values = latest_row(indicators, row)
+            results[pair] = {**summarize(values, float(ohlc["close"][-1])), "indicators": _round(values)}
+        return results
     except Exception as e:
         logger.error(f"Technical analysis error: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
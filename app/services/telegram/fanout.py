@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Telegram Bot API limits: ~30 messages/s in total and ~1 message/s per chat
+TELEGRAM_GLOBAL_RATE = 30.0
+TELEGRAM_PER_CHAT_RATE = 1.0
+
+
+class TokenBucket:
+    """Asyncio token bucket; a rate of 0 disables limiting"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        if self.rate <= 0:
+            return
+
+        # Waiters queue on the lock so tokens are handed out in FIFO order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Drain the bucket so no token is handed out for the given time"""
+        if self.rate <= 0:
+            return
+        self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+class ChatRateLimiter:
+    """Spaces out messages to the same chat"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        # Ordered by last use, so chats that went quiet are at the front
+        self._next_slot: "OrderedDict[Any, float]" = OrderedDict()
+
+    async def acquire(self, chat_id):
+        """Wait until the chat may receive another message"""
+        if not self.interval:
+            return
+
+        now = time.monotonic()
+        # Forget chats whose slot has passed, otherwise the dict grows with every subscriber
+        while self._next_slot:
+            oldest, next_slot = next(iter(self._next_slot.items()))
+            if next_slot > now:
+                break
+            del self._next_slot[oldest]
+
+        slot = max(now, self._next_slot.get(chat_id, now))
+        self._next_slot[chat_id] = slot + self.interval
+        self._next_slot.move_to_end(chat_id)
+
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class FanoutEngine:
+    """Concurrent, rate limited delivery of one message to many chats"""
+
+    def __init__(self, concurrency: int = None, global_rate: float = None, per_chat_rate: float = None,
+                 max_retries: int = None):
+        if concurrency is None:
+            concurrency = int(os.getenv("FANOUT_CONCURRENCY", 50))
+        if global_rate is None:
+            global_rate = float(os.getenv("TELEGRAM_GLOBAL_RATE", TELEGRAM_GLOBAL_RATE))
+        if per_chat_rate is None:
+            per_chat_rate = float(os.getenv("TELEGRAM_PER_CHAT_RATE", TELEGRAM_PER_CHAT_RATE))
+        if max_retries is None:
+            max_retries = int(os.getenv("FANOUT_MAX_RETRIES", 3))
+
+        self.concurrency = max(1, concurrency)
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_limiter = ChatRateLimiter(per_chat_rate)
+        # 429s retried per chat within one send_all, after Telegram's retry_after
+        self.max_retries = max(0, max_retries)
+
+    async def send_all(self, chat_ids: Sequence, send: Callable[[Any], Awaitable[Any]]) -> List[Dict]:
+        """Call send(chat_id) for every chat and return the outcome per chat"""
+        results: List[Dict] = [None] * len(chat_ids)
+        pending = iter(enumerate(chat_ids))
+
+        # A fixed set of workers pulls from one shared iterator instead of
+        # creating a task per subscriber
+        async def worker():
+            for index, chat_id in pending:
+                results[index] = await self._deliver(chat_id, send)
+
+        workers = min(self.concurrency, len(chat_ids))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
+
+    async def _deliver(self, chat_id, send: Callable[[Any], Awaitable[Any]]) -> Dict:
+        """Deliver to a single chat once its rate limits allow it, retrying when Telegram says 429"""
+        queued = time.perf_counter()
+        result = {
+            "chat_id": chat_id,
+            "status": "sent",
+            "queued": 0.0,
+            "latency": 0.0,
+            "attempts": 0,
+            "error": None
+        }
+
+        while True:
+            await self.chat_limiter.acquire(chat_id)
+            await self.global_bucket.acquire()
+
+            start = time.perf_counter()
+            result["queued"] += start - queued
+            result["attempts"] += 1
+            try:
+                message = await send(chat_id)
+                result["latency"] = time.perf_counter() - start
+                # Kept so the message can be edited later
+                message_id = getattr(message, "message_id", None)
+                if message_id is not None:
+                    result["message_id"] = message_id
+                result["status"], result["error"] = "sent", None
+                break
+            except Exception as e:
+                result["latency"] = time.perf_counter() - start
+                result["error"] = str(e)
+                retry_after = getattr(e, "retry_after", None)
+                if not retry_after:
+                    result["status"] = "failed"
+                    logger.warning(f"Delivery to {chat_id} failed: {str(e)}")
+                    break
+
+                # Telegram told us to back off; stop the whole bucket, not just this chat
+                result["status"] = "rate_limited"
+                result["retry_after"] = retry_after
+                self.global_bucket.pause(float(retry_after))
+                if result["attempts"] > self.max_retries:
+                    logger.warning(f"Delivery to {chat_id} still rate limited after {result['attempts']} attempts")
+                    break
+
+            # Try again once retry_after has passed; the paused bucket holds every other send too
+            queued = time.perf_counter()
+            if self.global_bucket.rate <= 0:
+                await asyncio.sleep(float(retry_after))
+
+        return result
+
+
+def summarize(results: List[Dict]) -> Dict:
+    """Aggregate per-chat delivery results"""
+    latencies = sorted(r["latency"] for r in results)
+    summary = {
+        "total": len(results),
+        "sent": sum(1 for r in results if r["status"] == "sent"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "rate_limited": sum(1 for r in results if r["status"] == "rate_limited"),
+        "retries": sum(r.get("attempts", 1) - 1 for r in results),
+    }
+
+    if latencies:
+        summary["p50"] = latencies[int(0.50 * (len(latencies) - 1))]
+        summary["p99"] = latencies[int(0.99 * (len(latencies) - 1))]
+        summary["max"] = latencies[-1]
+
+    return summary
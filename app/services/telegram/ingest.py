@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+DUPLICATE = "duplicate"
+INVALID = "invalid"
+REJECTED = "rejected"
+
+
+class UpdateQueue:
+    """Accepts webhook updates immediately and processes them with a pool of worker tasks"""
+
+    def __init__(self, process: Callable[[Dict[str, Any]], Awaitable[Any]], maxsize: int = None,
+                 workers: int = None, dedupe_size: int = None):
+        self.process = process
+        self.maxsize = maxsize or int(os.getenv("WEBHOOK_QUEUE_SIZE", 1000))
+        self.workers = workers or int(os.getenv("WEBHOOK_WORKERS", 8))
+        self.dedupe_size = dedupe_size or int(os.getenv("WEBHOOK_DEDUPE_SIZE", 10000))
+        self._queue: asyncio.Queue = asyncio.Queue(self.maxsize)
+        self._seen: "OrderedDict[int, None]" = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+
+        self.enqueued = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.high_water = 0
+        self.max_wait = 0.0
+        self._wait_total = 0.0
+
+    def submit(self, data: Any) -> str:
+        """Validate and enqueue an update without waiting for it to be handled"""
+        update_id = data.get("update_id") if isinstance(data, dict) else None
+        if not isinstance(update_id, int):
+            self.invalid += 1
+            return INVALID
+
+        # Telegram redelivers when we're slow; the same update must only run once
+        if update_id in self._seen:
+            self.duplicates += 1
+            return DUPLICATE
+
+        try:
+            self._queue.put_nowait((time.monotonic(), data))
+        except asyncio.QueueFull:
+            # Not remembered, so Telegram's retry is accepted once there is room
+            self.rejected += 1
+            return REJECTED
+
+        self._seen[update_id] = None
+        if len(self._seen) > self.dedupe_size:
+            self._seen.popitem(last=False)
+
+        self.enqueued += 1
+        self.high_water = max(self.high_water, self._queue.qsize())
+        return QUEUED
+
+    async def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+            logger.info(f"Webhook queue started with {self.workers} workers")
+
+    async def stop(self, timeout: float = 10.0):
+        """Give queued updates a chance to finish, then stop the workers"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping webhook queue with {self._queue.qsize()} updates left")
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def _work(self):
+        while True:
+            queued_at, data = await self._queue.get()
+            wait = time.monotonic() - queued_at
+            self._wait_total += wait
+            self.max_wait = max(self.max_wait, wait)
+            try:
+                await self.process(data)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error processing update {data.get('update_id')}: {str(e)}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        """Backpressure metrics: depth vs capacity, rejections and how long updates wait"""
+        handled = self.processed + self.failed
+        return {
+            "depth": self._queue.qsize(),
+            "maxsize": self.maxsize,
+            "high_water": self.high_water,
+            "workers": self.workers,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self._wait_total / handled * 1000, 1) if handled else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1)
+        }
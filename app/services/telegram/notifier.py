@@ -2,6 +2,9 @@ from app.services.signal_processor.models import TradingSignal
 from app.utils.logger import logger
 from telegram import Bot, Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, CallbackContext
+from app.services.telegram.outbox import outbox, signal_id
+from app.services.telegram.render import RenderedMessage
+from app.utils.metrics import MetricsRequest
 import os
 import logging
 
@@ -11,32 +14,24 @@ class TelegramNotifier:
     def __init__(self):
         self.token = os.getenv("TELEGRAM_BOT_TOKEN")
         logger.debug(f"Initializing TelegramNotifier with token: {self.token[:8]}...{self.token[-4:]}")
-        self.bot = Bot(token=self.token)
+        self.bot = Bot(token=self.token, request=MetricsRequest())
 
     async def send_signal(self, signal: TradingSignal, user_ids: list[int], formatted_message: str):
         """Send trading signal to specified users"""
         try:
-            keyboard = [
-                [
-                    InlineKeyboardButton("📊 Technical Analysis", callback_data=f"analysis_{signal.instrument}"),
-                    InlineKeyboardButton("📰 Market Sentiment", callback_data=f"sentiment_{signal.instrument}")
-                ]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            # Text and buttons are the same for every user: render the request body once
+            rendered = RenderedMessage(formatted_message, parse_mode='HTML',
+                                       keyboard=self._create_signal_keyboard(signal))
             
-            # Send to each user as pure text
-            for user_id in user_ids:
-                try:
-                    await self.send_message(
-                        chat_id=user_id,
-                        text=formatted_message,
-                        parse_mode='HTML',
-                        reply_markup=reply_markup
-                    )
-                    logger.info(f"Signal sent to user {user_id}")
-                except Exception as e:
-                    logger.error(f"Failed to send signal to user {user_id}: {str(e)}")
-                    continue
+            # Stored durably first; the outbox workers retry failures and keep dead letters
+            # Keyed by the signal itself, so re-sending it after a crash doesn't message anyone twice
+            key = signal_id({
+                "symbol": signal.instrument, "action": signal.signal_type.value, "price": signal.entry_price,
+                "stop_loss": signal.stop_loss, "take_profit": signal.take_profit, "timeframe": signal.timeframe
+            })
+            queued = await outbox.enqueue_message(key, user_ids, rendered)
+            logger.info(f"Signal queued for {queued} of {len(user_ids)} users")
+            return queued
                     
         except Exception as e:
             logger.error(f"Error in send_signal: {str(e)}", exc_info=True)
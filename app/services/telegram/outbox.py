@@ -0,0 +1,466 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import aiohttp
+from telegram.error import BadRequest, Forbidden, RetryAfter
+
+from app.services.telegram.fanout import TELEGRAM_GLOBAL_RATE, TELEGRAM_PER_CHAT_RATE, ChatRateLimiter, TokenBucket
+from app.services.telegram.render import JSON_HEADERS, RenderedMessage, photo_filename, telegram_result
+from app.utils.http import http_clients
+from app.utils.metrics import OUTBOX_DEAD, OUTBOX_LAG, OUTBOX_MESSAGES, OUTBOX_PENDING, observe_telegram
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    dedupe_key TEXT NOT NULL UNIQUE,
+    chat_id TEXT NOT NULL,
+    method TEXT NOT NULL,
+    body BLOB NOT NULL,
+    attachment TEXT,
+    ref INTEGER,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    sent_at REAL,
+    message_id INTEGER,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt);
+CREATE INDEX IF NOT EXISTS idx_outbox_chat ON outbox (chat_id, id);
+CREATE TABLE IF NOT EXISTS outbox_attachments (
+    key TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+# (dedupe_key, chat_id, method, body, attachment key)
+Row = Tuple[str, str, str, bytes, Optional[str]]
+
+# What identifies a signal when it doesn't carry an id; generated text (sentiment, AI verdict) never does
+SIGNAL_ID_FIELDS = ("symbol", "instrument", "action", "price", "stopLoss", "takeProfit", "stop_loss", "take_profit",
+                    "interval", "timeframe", "timestamp", "time")
+
+
+def signal_id(signal: Dict[str, Any]) -> str:
+    """Stable id of a signal for dedupe keys: the same alert gets the same id, whatever was generated for it"""
+    if signal.get("id") is not None:
+        return str(signal["id"])
+    fields = {field: signal[field] for field in SIGNAL_ID_FIELDS if signal.get(field) is not None}
+    return hashlib.sha1(json.dumps(fields, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class Outbox:
+    """Durable queue of outgoing Bot API calls, stored in a SQLite WAL file.
+
+    A fan-out is written in one transaction before anything is sent and every call has a
+    dedupe key, so a crash (or a redelivered signal) neither loses nor repeats queued sends.
+    Keys are (signal id, chat, kind of call), not the text: re-queueing a signal after a crash
+    with freshly generated sections still hits the same keys.
+    Calls that were in flight when a process died are retried once their lease runs out:
+    Telegram can't tell us whether those arrived, so at most `workers` messages can repeat.
+    Messages to the same chat go out in the order they were queued.
+    """
+
+    def __init__(self, path: str = None, workers: int = None, max_attempts: int = None, lease: float = 300.0):
+        self.path = path or os.getenv("OUTBOX_PATH", "data/outbox.db")
+        self.workers = workers or int(os.getenv("OUTBOX_WORKERS", 16))
+        self.max_attempts = max_attempts or int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+        self.retry_base = float(os.getenv("OUTBOX_RETRY_BASE", 1.0))
+        self.retry_max = float(os.getenv("OUTBOX_RETRY_MAX", 300))
+        self.retention = float(os.getenv("OUTBOX_RETENTION", 86400))
+        self.lease = lease
+        self.global_bucket = TokenBucket(float(os.getenv("TELEGRAM_GLOBAL_RATE", TELEGRAM_GLOBAL_RATE)))
+        self.chat_limiter = ChatRateLimiter(float(os.getenv("TELEGRAM_PER_CHAT_RATE", TELEGRAM_PER_CHAT_RATE)))
+        self.base_url: Optional[str] = None
+        self.counts: Dict[str, int] = {}
+        self.results: Dict[str, int] = {"sent": 0, "retry": 0, "rate_limited": 0, "dead": 0}
+
+        self._db: Optional[sqlite3.Connection] = None
+        # sqlite3 connections are not shareable between threads: all queries go through one
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox")
+        self._attachments: Dict[str, bytes] = {}
+        self._inflight: set = set()
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._paused_until = 0.0
+
+    # --- SQLite (runs on the outbox thread) ---
+
+    def _open(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        # NORMAL survives a process crash; only an OS crash can lose the last commits
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("PRAGMA busy_timeout=5000")
+        db.executescript(SCHEMA)
+        # Outbox files created before edits were supported
+        columns = {row[1] for row in db.execute("PRAGMA table_info(outbox)")}
+        for column in ("ref INTEGER", "message_id INTEGER"):
+            if column.split()[0] not in columns:
+                db.execute(f"ALTER TABLE outbox ADD COLUMN {column}")
+        self._db = db
+
+    def _insert(self, rows: List[Row], attachments: Dict[str, bytes]) -> int:
+        now = time.time()
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany(
+                "INSERT OR IGNORE INTO outbox_attachments (key, data, created_at) VALUES (?, ?, ?)",
+                [(key, data, now) for key, data in attachments.items()]
+            )
+            before = db.total_changes
+            db.executemany(
+                "INSERT OR IGNORE INTO outbox (dedupe_key, chat_id, method, body, attachment, next_attempt, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*row, now, now) for row in rows]
+            )
+            queued = db.total_changes - before
+            db.execute("COMMIT")
+            return queued
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def _insert_edits(self, key: str, bodies: Dict[str, bytes], edit_digest: str) -> int:
+        """Rewrite sendMessage calls that are still queued; queue an edit for those already out"""
+        now = time.time()
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            before = db.total_changes
+            db.executemany(
+                "UPDATE outbox SET body = ? WHERE dedupe_key = ? AND status = 'pending'",
+                [(body, f"{key}:{chat_id}:sendMessage") for chat_id, body in bodies.items()]
+            )
+            # Sent or in flight: the edit goes out after the original (same chat) and picks up its message_id
+            db.executemany(
+                "INSERT OR IGNORE INTO outbox (dedupe_key, chat_id, method, body, ref, next_attempt, created_at) "
+                "SELECT ?, chat_id, 'editMessageText', ?, id, ?, ? FROM outbox "
+                "WHERE dedupe_key = ? AND status IN ('inflight', 'sent')",
+                [(f"{key}:{chat_id}:editMessageText:{edit_digest}", body, now, now, f"{key}:{chat_id}:sendMessage")
+                 for chat_id, body in bodies.items()]
+            )
+            changed = db.total_changes - before
+            db.execute("COMMIT")
+            return changed
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def _claim(self, limit: int, now: float) -> List[tuple]:
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = db.execute(
+                """
+                UPDATE outbox SET status = 'inflight', lease_until = ?
+                WHERE id IN (
+                    SELECT o.id FROM outbox o
+                    WHERE ((o.status = 'pending' AND o.next_attempt <= ?) OR (o.status = 'inflight' AND o.lease_until < ?))
+                    AND NOT EXISTS (
+                        SELECT 1 FROM outbox p
+                        WHERE p.chat_id = o.chat_id AND p.id < o.id AND p.status IN ('pending', 'inflight')
+                    )
+                    ORDER BY o.next_attempt, o.id
+                    LIMIT ?
+                )
+                RETURNING id, chat_id, method, body, attachment, ref, attempts, created_at
+                """,
+                (now + self.lease, now, now, limit)
+            ).fetchall()
+            db.execute("COMMIT")
+            return rows
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def _attachment(self, key: str) -> bytes:
+        return self._db.execute("SELECT data FROM outbox_attachments WHERE key = ?", (key,)).fetchone()[0]
+
+    def _message_id(self, row_id: int) -> Optional[int]:
+        row = self._db.execute("SELECT message_id FROM outbox WHERE id = ?", (row_id,)).fetchone()
+        return row[0] if row else None
+
+    def _mark_sent(self, message_id: int, now: float, telegram_message_id: Optional[int]):
+        self._db.execute(
+            "UPDATE outbox SET status = 'sent', sent_at = ?, message_id = ?, lease_until = NULL WHERE id = ?",
+            (now, telegram_message_id, message_id)
+        )
+
+    def _reschedule(self, message_id: int, next_attempt: float, error: str, attempts: int):
+        self._db.execute(
+            "UPDATE outbox SET status = 'pending', next_attempt = ?, last_error = ?, attempts = ?, lease_until = NULL WHERE id = ?",
+            (next_attempt, error, attempts, message_id)
+        )
+
+    def _mark_dead(self, message_id: int, error: str, attempts: int):
+        self._db.execute(
+            "UPDATE outbox SET status = 'dead', last_error = ?, attempts = ?, lease_until = NULL WHERE id = ?",
+            (error, attempts, message_id)
+        )
+
+    def _housekeeping(self, now: float) -> Dict[str, int]:
+        """Drop delivered messages past the dedupe window and count the rest"""
+        cutoff = now - self.retention
+        self._db.execute("DELETE FROM outbox WHERE status = 'sent' AND sent_at < ?", (cutoff,))
+        self._db.execute(
+            "DELETE FROM outbox_attachments WHERE created_at < ? AND key NOT IN "
+            "(SELECT attachment FROM outbox WHERE attachment IS NOT NULL)",
+            (cutoff,)
+        )
+        return dict(self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+    def _dead_letters(self, limit: int) -> List[Dict[str, Any]]:
+        rows = self._db.execute(
+            "SELECT id, chat_id, method, attempts, last_error, created_at FROM outbox "
+            "WHERE status = 'dead' ORDER BY id DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return [dict(zip(("id", "chat_id", "method", "attempts", "error", "created_at"), row)) for row in rows]
+
+    def _requeue_dead(self) -> int:
+        cursor = self._db.execute(
+            "UPDATE outbox SET status = 'pending', attempts = 0, next_attempt = ? WHERE status = 'dead'",
+            (time.time(),)
+        )
+        return cursor.rowcount
+
+    async def _call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # --- Queueing ---
+
+    async def enqueue(self, rows: Sequence[Row], attachments: Dict[str, bytes] = None) -> int:
+        """Store calls durably; returns how many were new (the rest were already queued)"""
+        if not rows:
+            return 0
+        queued = await self._call(self._insert, list(rows), attachments or {})
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return queued
+
+    async def enqueue_message(self, key: str, chat_ids: Iterable, rendered: RenderedMessage) -> int:
+        """Queue one rendered message for every chat; key identifies the signal (see signal_id)"""
+        return await self.enqueue([
+            (f"{key}:{chat_id}:sendMessage", str(chat_id), "sendMessage", rendered.body(chat_id), None)
+            for chat_id in chat_ids
+        ])
+
+    async def enqueue_signal(self, key: str, chat_ids: Sequence, rendered: RenderedMessage, photo: bytes = None,
+                             caption: str = None) -> int:
+        """Queue a signal message and (optionally) its chart for every chat in one transaction"""
+        rows: List[Row] = [
+            (f"{key}:{chat_id}:sendMessage", str(chat_id), "sendMessage", rendered.body(chat_id), None)
+            for chat_id in chat_ids
+        ]
+        attachments = {}
+        if photo:
+            photo_rows, attachments = self._photo_rows(key, chat_ids, photo, caption)
+            rows += photo_rows
+        return await self.enqueue(rows, attachments)
+
+    async def enqueue_photo(self, key: str, chat_ids: Sequence, photo: bytes, caption: str = None) -> int:
+        """Queue the chart of an earlier queued signal (e.g. one that arrived late)"""
+        rows, attachments = self._photo_rows(key, chat_ids, photo, caption)
+        return await self.enqueue(rows, attachments)
+
+    @staticmethod
+    def _photo_rows(key: str, chat_ids: Sequence, photo: bytes, caption: str = None):
+        # One chart per signal and chat, whatever image was rendered for it
+        attachment = hashlib.sha1(photo).hexdigest()
+        rows: List[Row] = []
+        for chat_id in chat_ids:
+            fields = {"chat_id": str(chat_id)}
+            if caption:
+                fields["caption"] = caption
+            rows.append((f"{key}:{chat_id}:sendPhoto", str(chat_id), "sendPhoto", json.dumps(fields).encode(), attachment))
+        return rows, {attachment: photo}
+
+    async def enqueue_edit(self, key: str, chat_ids: Sequence, rendered: RenderedMessage) -> int:
+        """Replace the text of a queued signal's message for every chat, whether it went out yet or not.
+
+        A repeated edit only sets the same text again, so edits are keyed by their content.
+        """
+        bodies = {str(chat_id): rendered.body(chat_id) for chat_id in chat_ids}
+        changed = await self._call(self._insert_edits, key, bodies, rendered.digest)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return changed
+
+    # --- Delivery ---
+
+    async def start(self, base_url: str):
+        """Open the queue file and start delivering to base_url (https://api.telegram.org/bot<token>)"""
+        self.base_url = base_url
+        self._wakeup = asyncio.Event()
+        await self._call(self._open)
+        self._tasks = [asyncio.create_task(self._dispatch()), asyncio.create_task(self._maintain())]
+        logger.info(f"Outbox started ({self.path}, {self.workers} workers)")
+
+    async def stop(self, timeout: float = 5.0):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        # Let sends that are on the wire finish so they aren't repeated after a restart
+        if self._inflight:
+            await asyncio.wait(self._inflight, timeout=timeout)
+        if self._db is not None:
+            await self._call(self._db.close)
+            self._db = None
+
+    async def _dispatch(self):
+        """Claim due messages whenever a worker slot is free"""
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            free = self.workers - len(self._inflight)
+            batch = []
+            if free > 0 and now >= self._paused_until:
+                try:
+                    batch = await self._call(self._claim, free, now)
+                except Exception as e:
+                    logger.error(f"Error claiming outbox messages: {str(e)}")
+
+            for row in batch:
+                task = asyncio.create_task(self._deliver(*row))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+            if not batch:
+                # Woken by new messages or finished sends; otherwise poll for due retries
+                timeout = max(0.05, self._paused_until - now) if now < self._paused_until else 1.0
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _deliver(self, message_id: int, chat_id: str, method: str, body: bytes, attachment: Optional[str],
+                       ref: Optional[int], attempts: int, created_at: float):
+        try:
+            if ref is not None:
+                # An edit: its original is delivered by now (per-chat ordering)
+                original = await self._call(self._message_id, ref)
+                if original is None:
+                    raise BadRequest("Original message was not delivered")
+                body = b'{"message_id":' + str(original).encode() + b"," + body[1:]
+
+            await self.chat_limiter.acquire(chat_id)
+            await self.global_bucket.acquire()
+            result = await self._post(method, body, attachment)
+
+        except RetryAfter as e:
+            # Telegram throttles the whole bot: hold every worker, and don't count it as a failed attempt
+            delay = float(e.retry_after)
+            self._paused_until = max(self._paused_until, time.time() + delay)
+            self.global_bucket.pause(delay)
+            await self._record("rate_limited", self._reschedule, message_id, time.time() + delay, str(e), attempts)
+
+        except BadRequest as e:
+            if "message is not modified" in str(e):
+                # An edit that changed nothing: the chat already shows this text
+                await self._record("sent", self._mark_sent, message_id, time.time(), None)
+            else:
+                # Deleted chat, malformed message: retrying won't help
+                logger.warning(f"Outbox message {message_id} to {chat_id} rejected: {str(e)}")
+                await self._record("dead", self._mark_dead, message_id, str(e), attempts + 1)
+
+        except Forbidden as e:
+            # Blocked bot: retrying won't help
+            logger.warning(f"Outbox message {message_id} to {chat_id} rejected: {str(e)}")
+            await self._record("dead", self._mark_dead, message_id, str(e), attempts + 1)
+
+        except Exception as e:
+            attempts += 1
+            if attempts >= self.max_attempts:
+                logger.error(f"Outbox message {message_id} to {chat_id} failed {attempts} times: {str(e)}")
+                await self._record("dead", self._mark_dead, message_id, str(e), attempts)
+            else:
+                # Full jitter so retries of one failed fan-out don't arrive together
+                delay = random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempts))
+                await self._record("retry", self._reschedule, message_id, time.time() + delay, str(e), attempts)
+
+        else:
+            sent_id = result.get("message_id") if isinstance(result, dict) else None
+            await self._record("sent", self._mark_sent, message_id, time.time(), sent_id)
+            OUTBOX_LAG.observe(time.time() - created_at)
+
+        finally:
+            self._wakeup.set()
+
+    async def _record(self, result: str, update, *args):
+        self.results[result] += 1
+        OUTBOX_MESSAGES.labels(result).inc()
+        try:
+            await self._call(update, *args)
+        except Exception as e:
+            # The lease runs out and the message is picked up again
+            logger.error(f"Error updating outbox message {args[0]}: {str(e)}")
+
+    async def _post(self, method: str, body: bytes, attachment: Optional[str]):
+        url = f"{self.base_url}/{method}"
+        if attachment:
+            data = self._attachments.get(attachment)
+            if data is None:
+                if len(self._attachments) >= 16:
+                    self._attachments.clear()
+                data = self._attachments[attachment] = await self._call(self._attachment, attachment)
+            form = aiohttp.FormData()
+            for name, value in json.loads(body).items():
+                form.add_field(name, value if isinstance(value, str) else json.dumps(value))
+            form.add_field("photo", data, filename=photo_filename(data))
+            kwargs = {"data": form}
+        else:
+            kwargs = {"data": body, "headers": JSON_HEADERS}
+
+        async with http_clients.session(url).post(url, **kwargs) as response:
+            observe_telegram(method, response.status)
+            payload = await response.json(content_type=None)
+        return telegram_result(response.status, payload)
+
+    async def _maintain(self, interval: float = 10.0):
+        while True:
+            try:
+                self.counts = await self._call(self._housekeeping, time.time())
+                OUTBOX_PENDING.set(self.counts.get("pending", 0) + self.counts.get("inflight", 0))
+                OUTBOX_DEAD.set(self.counts.get("dead", 0))
+            except Exception as e:
+                logger.error(f"Error in outbox housekeeping: {str(e)}")
+            await asyncio.sleep(interval)
+
+    async def dead_letters(self, limit: int = 50) -> List[Dict[str, Any]]:
+        return await self._call(self._dead_letters, limit)
+
+    async def requeue_dead(self) -> int:
+        """Give every dead letter a fresh set of attempts"""
+        requeued = await self._call(self._requeue_dead)
+        self._wakeup.set()
+        return requeued
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue": self.counts,
+            "inflight": len(self._inflight),
+            "paused_for": round(max(0.0, self._paused_until - time.time()), 1),
+            **self.results
+        }
+
+
+outbox = Outbox()
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+from telegram import Bot
+
+from app.services.telegram.fanout import FanoutEngine, summarize
+from app.services.telegram.render import RenderedMessage, edit_rendered, send_rendered
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressiveDelivery:
+    """One message to many chats: sent with what we have, then edited as its sections resolve"""
+
+    def __init__(self, bot: Bot, fanout: FanoutEngine, render: Callable[[Dict[str, Any]], RenderedMessage],
+                 batch_window: float = None):
+        self.bot = bot
+        self.fanout = fanout
+        self.render = render
+        # Sections resolving within this many seconds of each other go out in one edit
+        self.batch_window = batch_window if batch_window is not None else float(
+            os.getenv("PROGRESSIVE_BATCH_WINDOW", 0.5)
+        )
+        self.sections: Dict[str, Any] = {}
+        # chat_id -> message_id of the message we sent there; only these chats get edits
+        self.messages: Dict[Any, int] = {}
+        self.rendered = render({})
+        self.rounds: List[Dict] = []
+
+    async def send(self, chat_ids: Sequence) -> List[Dict]:
+        """Send the message as rendered so far to every chat"""
+        rendered = self.rendered
+        deliveries = await self.fanout.send_all(chat_ids, lambda chat_id: send_rendered(self.bot, chat_id, rendered))
+        for delivery in deliveries:
+            if delivery.get("message_id") is not None:
+                self.messages[delivery["chat_id"]] = delivery["message_id"]
+        return deliveries
+
+    async def enrich(self, sections: Dict[str, Awaitable[Any]], timeout: float = None) -> List[Dict]:
+        """Add sections to the message as they resolve and edit it everywhere it was sent.
+
+        Failed or empty sections are left out. Returns one delivery summary per edit round.
+        """
+        if timeout is None:
+            timeout = float(os.getenv("PROGRESSIVE_TIMEOUT", 60))
+        tasks = {asyncio.ensure_future(awaitable): name for name, awaitable in sections.items()}
+        pending = set(tasks)
+        deadline = time.monotonic() + timeout
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+
+                # Give the other sections a moment to land in the same edit
+                if pending and self.messages and self.batch_window > 0:
+                    window = min(self.batch_window, max(0.0, deadline - time.monotonic()))
+                    more, pending = await asyncio.wait(pending, timeout=window)
+                    done |= more
+
+                resolved = self._collect(done, tasks)
+                if resolved:
+                    await self._edit(resolved)
+        finally:
+            for task in pending:
+                task.cancel()
+                logger.warning(f"Section {tasks[task]} not ready after {timeout}s, leaving it out")
+
+        return self.rounds
+
+    def _collect(self, done, tasks: Dict[asyncio.Future, str]) -> List[str]:
+        resolved = []
+        for task in done:
+            name = tasks[task]
+            if task.exception() is not None:
+                logger.error(f"Error resolving section {name}: {str(task.exception())}")
+                continue
+            if task.result():
+                self.sections[name] = task.result()
+                resolved.append(name)
+        return sorted(resolved)
+
+    async def _edit(self, resolved: List[str]):
+        """Re-render with the new sections and edit every sent message in one fan-out"""
+        started = time.perf_counter()
+        rendered = self.rendered = self.render(dict(self.sections))
+        if not self.messages:
+            return
+
+        results = await self.fanout.send_all(
+            list(self.messages),
+            lambda chat_id: edit_rendered(self.bot, chat_id, self.messages[chat_id], rendered)
+        )
+        summary = summarize(results)
+        summary["sections"] = resolved
+        summary["seconds"] = time.perf_counter() - started
+        self.rounds.append(summary)
+        logger.info(f"Edited {resolved} into {summary['sent']}/{summary['total']} messages")
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Union
+
+from telegram import Bot, InlineKeyboardMarkup, Message
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+from app.utils.http import http_clients
+from app.utils.metrics import observe_telegram
+
+logger = logging.getLogger(__name__)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def photo_filename(data: bytes, name: str = "chart") -> str:
+    """Upload name with the extension of the image's actual format (native charts are JPEG, screenshots PNG)"""
+    if data[:3] == b"\xff\xd8\xff":
+        return f"{name}.jpg"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return f"{name}.png"
+    return name
+
+
+class RenderedMessage:
+    """A sendMessage body rendered once per signal; sending it only splices in the chat_id"""
+
+    __slots__ = ("text", "parse_mode", "keyboard", "digest", "_tail")
+
+    def __init__(self, text: str, parse_mode: Optional[str] = None,
+                 keyboard: Union[InlineKeyboardMarkup, List[List[Dict[str, str]]], None] = None):
+        fields: Dict[str, Any] = {"text": text}
+        if parse_mode:
+            fields["parse_mode"] = parse_mode
+        if isinstance(keyboard, InlineKeyboardMarkup):
+            fields["reply_markup"] = keyboard.to_dict()
+        elif keyboard:
+            fields["reply_markup"] = {"inline_keyboard": keyboard}
+
+        # Everything after the chat_id, serialized once: b'"text":...,"reply_markup":{...}}'
+        tail = json.dumps(fields, ensure_ascii=False, separators=(",", ":"))[1:].encode()
+
+        object.__setattr__(self, "text", text)
+        object.__setattr__(self, "parse_mode", parse_mode)
+        object.__setattr__(self, "keyboard", InlineKeyboardMarkup.de_json(fields.get("reply_markup"), None))
+        object.__setattr__(self, "_tail", tail)
+        # Identifies the content, e.g. to dedupe queued sends of the same signal
+        object.__setattr__(self, "digest", hashlib.sha1(tail).hexdigest())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RenderedMessage is immutable")
+
+    def body(self, chat_id) -> bytes:
+        """JSON request body for one recipient"""
+        return b'{"chat_id":' + json.dumps(chat_id).encode() + b"," + self._tail
+
+    def edit_body(self, chat_id, message_id: int) -> bytes:
+        """JSON request body for editMessageText, replacing an earlier message with this one"""
+        return (b'{"chat_id":' + json.dumps(chat_id).encode() +
+                b',"message_id":' + str(int(message_id)).encode() + b"," + self._tail)
+
+
+class RenderCache:
+    """Small LRU of rendered messages, for senders that are called once per recipient"""
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, RenderedMessage]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, render: Callable[[], RenderedMessage]) -> RenderedMessage:
+        rendered = self._entries.get(key)
+        if rendered is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return rendered
+
+        self.misses += 1
+        rendered = self._entries[key] = render()
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return rendered
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+render_cache = RenderCache()
+
+
+async def send_rendered(bot: Bot, chat_id, rendered: RenderedMessage) -> Message:
+    """sendMessage with a pre-rendered body over the shared connection pool.
+
+    Errors are raised as the python-telegram-bot exceptions bot.send_message would raise,
+    so callers (and the fan-out engine's retry_after handling) don't see a difference.
+    """
+    url = f"{bot.base_url}/sendMessage"
+    async with http_clients.session(url).post(url, data=rendered.body(chat_id), headers=JSON_HEADERS) as response:
+        observe_telegram("sendMessage", response.status)
+        payload = await response.json(content_type=None)
+
+    return Message.de_json(telegram_result(response.status, payload), bot)
+
+
+async def edit_rendered(bot: Bot, chat_id, message_id: int, rendered: RenderedMessage) -> bool:
+    """editMessageText with a pre-rendered body; False when the message already had this content"""
+    url = f"{bot.base_url}/editMessageText"
+    async with http_clients.session(url).post(url, data=rendered.edit_body(chat_id, message_id),
+                                              headers=JSON_HEADERS) as response:
+        observe_telegram("editMessageText", response.status)
+        payload = await response.json(content_type=None)
+
+    try:
+        telegram_result(response.status, payload)
+    except BadRequest as e:
+        if "message is not modified" in str(e):
+            return False
+        raise
+    return True
+
+
+def telegram_result(status: int, payload: Dict[str, Any]) -> Any:
+    """The result of a Bot API response, or the python-telegram-bot exception for its error"""
+    if payload.get("ok"):
+        return payload["result"]
+
+    description = payload.get("description") or "Unknown HTTPError"
+    retry_after = (payload.get("parameters") or {}).get("retry_after")
+    if retry_after:
+        raise RetryAfter(retry_after)
+    if status == 403:
+        raise Forbidden(description)
+    if status == 400:
+        raise BadRequest(description)
+    raise NetworkError(f"{description} ({status})")
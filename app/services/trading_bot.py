@@ -1,11 +1,27 @@
 from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
+from telegram.error import BadRequest
 from typing import Dict, Any, List
+import asyncio
+import html
 import logging
 import os
+import time
 from openai import AsyncOpenAI
 import redis
 from supabase import create_client
-from app.services.chart_service import ChartService
+from app.services.chart_service import create_chart_service
+from app.services.chart.cache import ChartCache, levels_id
+from app.bot.constants import MARKETS
+from app.services.calendar.analyzer import EconomicCalendar
+from app.services.sentiment.analyzer import SentimentAnalyzer
+from app.services.telegram.fanout import FanoutEngine, summarize
+from app.services.telegram.progressive import ProgressiveDelivery
+from app.services.telegram.render import RenderedMessage, photo_filename, send_rendered
+from app.services.subscriber.index import subscription_index, preference_key
+from app.utils.singleflight import SingleFlight
+from app.utils.swr_cache import StaleWhileRevalidateCache
+from app.utils.executors import run_io
+from app.utils.metrics import FANOUT_SIZE, MetricsRequest, observe_llm, stage, timed
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -13,35 +29,78 @@ logger = logging.getLogger(__name__)
 
 # Initialize clients
 openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-redis_client = redis.Redis(host=os.getenv("REDIS_HOST"), port=6379)
+redis_client = redis.Redis(host=os.getenv("REDIS_HOST"), port=int(os.getenv("REDIS_PORT", 6379)))
 supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
 
+# Overridable so the bot can talk to a local Bot API server (or a stand-in during benchmarks)
+TELEGRAM_BASE_URL = os.getenv("TELEGRAM_BASE_URL", "https://api.telegram.org/bot")
+
+# progressive: send the bare signal first and edit sections in as they resolve; complete: wait for everything
+SIGNAL_DELIVERY = os.getenv("SIGNAL_DELIVERY", "progressive")
+
+# Cap on the failed deliveries listed in a process_signal result; the summary counts them all
+DELIVERY_FAILURES_SHOWN = int(os.getenv("DELIVERY_FAILURES_SHOWN", 20))
+
+
+def signal_levels(signal: Dict) -> Dict:
+    """The lines a signal's chart draws"""
+    return {
+        "entry": signal.get("price"),
+        "stop_loss": signal.get("stop_loss"),
+        "take_profit": signal.get("take_profit")
+    }
+
+
 class TradingBot:
     def __init__(self):
         self.token = os.getenv("TELEGRAM_BOT_TOKEN")
         self._bot = None  # We zullen de bot later initialiseren
-        self.chart_service = ChartService()
+        self.chart_service = create_chart_service()
+        self.chart_cache = ChartCache(redis_client, self.chart_service.generate_chart)
+        self.fanout = FanoutEngine()
+        self.calendar = EconomicCalendar()
+        self.sentiment_analyzer = SentimentAnalyzer()
+        # Button clicks: cached per instrument, stale values are refreshed in the background
+        self.sentiment_cache = StaleWhileRevalidateCache(
+            redis_client, "sentiment", self._load_sentiment,
+            fresh_ttl=int(os.getenv("SENTIMENT_FRESH_TTL", 900))
+        )
+        self.calendar_cache = StaleWhileRevalidateCache(
+            redis_client, "calendar", self._load_calendar,
+            fresh_ttl=int(os.getenv("CALENDAR_FRESH_TTL", 1800))
+        )
+        self.sentiment_flight = SingleFlight(
+            "sentiment",
+            get_cached=self._get_cached,
+            set_cached=lambda key, value: run_io(redis_client.setex, key, 300, value)  # Cache for 5 minutes
+        )
         
     @property
     def bot(self) -> Bot:
         if self._bot is None:
-            self._bot = Bot(self.token)
+            self._bot = Bot(self.token, base_url=TELEGRAM_BASE_URL, request=MetricsRequest())
         return self._bot
 
     def initialize(self, bot: Bot):
         """Initialize with existing bot instance"""
         self._bot = bot
 
-    async def match_subscribers(self, signal: Dict) -> List[str]:
+    async def match_subscribers(self, signal: Dict) -> List[int]:
         """Match signal with subscribers"""
         try:
-            response = supabase.table("signal_preferences").select("*").eq(
+            if subscription_index.loaded:
+                return subscription_index.match(preference_key(
+                    signal["market"], signal["instrument"], signal["timeframe"]
+                ))
+            
+            # Index not loaded yet (e.g. during startup), ask the database
+            response = await run_io(supabase.table("signal_preferences").select("*").eq(
                 "market", signal["market"]
             ).eq("instrument", signal["instrument"]).eq(
                 "timeframe", signal["timeframe"]
-            ).execute()
+            ).execute)
             
-            return [str(pref["user_id"]) for pref in response.data]
+            return [int(pref["user_id"]) for pref in response.data]
         except Exception as e:
             logger.error(f"Error matching subscribers: {str(e)}")
             return []
@@ -49,100 +108,237 @@ class TradingBot:
     async def analyze_sentiment(self, symbol: str) -> str:
         """Analyze market sentiment"""
         try:
-            cache_key = f"sentiment:{symbol}"
-            cached = redis_client.get(cache_key)
-            if cached:
-                return cached.decode()
-                
-            response = await openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a market analyst."},
-                    {"role": "user", "content": f"Analyze {symbol} sentiment briefly"}
-                ]
+            # Concurrent misses for the same symbol share one OpenAI call
+            return await self.sentiment_flight.get(
+                f"sentiment_brief:{symbol}",
+                lambda: self._get_openai_sentiment(symbol)
             )
             
-            sentiment = response.choices[0].message.content
-            redis_client.setex(cache_key, 300, sentiment)  # Cache for 5 minutes
-            return sentiment
-            
         except Exception as e:
             logger.error(f"Error analyzing sentiment: {str(e)}")
             return "Sentiment analysis unavailable"
             
-    async def send_signal_message(self, chat_id: str, signal: Dict, sentiment: str):
-        """Send signal message with inline buttons"""
+    async def _get_openai_sentiment(self, symbol: str) -> str:
+        """Ask OpenAI for a short sentiment summary"""
+        started = time.perf_counter()
+        response = await openai_client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "You are a market analyst."},
+                {"role": "user", "content": f"Analyze {symbol} sentiment briefly"}
+            ]
+        )
+        observe_llm("gpt-3.5-turbo", time.perf_counter() - started, response.usage)
+        return response.choices[0].message.content
+        
+    async def analyze_verdict(self, signal: Dict) -> str:
+        """Short AI verdict on the signal itself"""
         try:
-            # Format message
-            message = (
-                f"🔔 *TRADING SIGNAL*\n"
-                f"Symbol: {signal['symbol']}\n"
-                f"Action: {signal['action']}\n"
-                f"Price: {signal['price']}\n\n"
-                f"📊 *SENTIMENT*\n"
-                f"{sentiment}\n\n"
-                f"⚠️ *Risk Management*\n"
-                f"• Always use proper position sizing\n"
-                f"• Never risk more than 1-2% per trade\n"
-                f"• Multiple take profit levels recommended\n\n"
-                f"🤖 Generated by SigmaPips AI"
+            started = time.perf_counter()
+            response = await openai_client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": "You are SigmaPips AI, a trading analyst. Answer in 2-3 sentences without headers."},
+                    {"role": "user", "content": (
+                        f"Give a verdict on this signal: {signal['action']} {signal['symbol']} "
+                        f"at {signal['price']} on the {signal.get('timeframe')} chart, "
+                        f"stop loss {signal.get('stop_loss')}, take profit {signal.get('take_profit')}"
+                    )}
+                ]
             )
+            observe_llm("gpt-3.5-turbo", time.perf_counter() - started, response.usage)
+            return response.choices[0].message.content
+            
+        except Exception as e:
+            logger.error(f"Error getting AI verdict: {str(e)}")
+            return None
+        
+    async def _load_sentiment(self, instrument: str) -> str:
+        # Instruments loaded around the same time share their LLM calls
+        sentiment_text = await self.sentiment_analyzer.analyze_batched(instrument)
+        if sentiment_text.startswith("Error"):
+            # Don't cache failures, keep serving the previous value
+            raise Exception(sentiment_text)
+        return sentiment_text
 
-            # Create inline keyboard
-            keyboard = InlineKeyboardMarkup([
-                [
-                    InlineKeyboardButton(
-                        "📊 Technical Analysis", 
-                        callback_data=f"chart_{signal['symbol']}_{signal['timeframe']}"
-                    ),
-                    InlineKeyboardButton(
-                        "🤖 Market Sentiment", 
-                        callback_data=f"sentiment_{signal['symbol']}"
-                    )
-                ],
-                [
-                    InlineKeyboardButton(
-                        "📅 Economic Calendar", 
-                        callback_data=f"calendar_{signal['symbol']}"
-                    )
-                ]
-            ])
+    async def _load_calendar(self, instrument: str) -> str:
+        calendar_text = await self.calendar.get_events(instrument)
+        if calendar_text.startswith("Error"):
+            raise Exception(calendar_text)
+        return calendar_text
 
-            # Send message with buttons
-            await self._bot.send_message(
-                chat_id=chat_id,
-                text=message,
-                parse_mode='Markdown',
-                reply_markup=keyboard
-            )
+    def start_cache_warmers(self):
+        """Keep sentiment and calendar of recently requested instruments fresh"""
+        instruments = [i for market in MARKETS.values() for i in market["instruments"]]
+        self.sentiment_cache.start_rewarming(instruments)
+        self.calendar_cache.start_rewarming(instruments)
+
+    async def stop_cache_warmers(self):
+        await self.sentiment_cache.stop()
+        await self.calendar_cache.stop()
+
+    async def _get_cached(self, key: str):
+        cached = await run_io(redis_client.get, key)
+        return cached.decode() if cached else None
+            
+    def render_signal_message(self, signal: Dict, sentiment: str = None, verdict: str = None,
+                              calendar: str = None) -> RenderedMessage:
+        """Render the signal message and its inline buttons once for all recipients.
+
+        Sections that are None are left out, so the bare signal can go out before they resolve.
+        """
+        message = (
+            f"🔔 *TRADING SIGNAL*\n"
+            f"Symbol: {signal['symbol']}\n"
+            f"Action: {signal['action']}\n"
+            f"Price: {signal['price']}\n"
+        )
+        if signal.get("stop_loss") is not None:
+            message += f"Stop Loss: {signal['stop_loss']}\n"
+        if signal.get("take_profit") is not None:
+            message += f"Take Profit: {signal['take_profit']}\n"
+        message += "\n"
+
+        if sentiment:
+            message += f"📊 *SENTIMENT*\n{sentiment}\n\n"
+        if verdict:
+            message += f"🤖 *AI VERDICT*\n{verdict}\n\n"
+        if calendar:
+            message += f"📅 *ECONOMIC CALENDAR*\n{calendar}\n\n"
+
+        message += (
+            "⚠️ *Risk Management*\n"
+            "• Always use proper position sizing\n"
+            "• Never risk more than 1-2% per trade\n"
+            "• Multiple take profit levels recommended\n\n"
+            "🤖 Generated by SigmaPips AI"
+        )
+
+        keyboard = InlineKeyboardMarkup([
+            [
+                InlineKeyboardButton(
+                    "📊 Technical Analysis", 
+                    callback_data=self._chart_callback(signal)
+                ),
+                InlineKeyboardButton(
+                    "🤖 Market Sentiment", 
+                    callback_data=f"sentiment_{signal['symbol']}"
+                )
+            ],
+            [
+                InlineKeyboardButton(
+                    "📅 Economic Calendar", 
+                    callback_data=f"calendar_{signal['symbol']}"
+                )
+            ]
+        ])
+
+        return RenderedMessage(message, parse_mode="Markdown", keyboard=keyboard)
+
+    def _chart_callback(self, signal: Dict) -> str:
+        """chart_<symbol>_<timeframe>[_<levels id>]; the id finds this signal's chart in the cache"""
+        callback = f"chart_{signal['symbol']}_{signal['timeframe']}"
+        levels_key = levels_id(signal_levels(signal))
+        return f"{callback}_{levels_key}" if levels_key else callback
+
+    async def send_signal_message(self, chat_id: str, rendered: RenderedMessage):
+        """Send a rendered signal message with inline buttons"""
+        try:
+            return await send_rendered(self.bot, chat_id, rendered)
 
         except Exception as e:
             logger.error(f"Error sending signal message: {str(e)}")
+            raise
 
+    @timed("total")
     async def process_signal(self, signal: Dict[str, Any]):
         """Process trading signal"""
         try:
+            # Render the chart now so the first "Technical Analysis" click is a cache hit
+            self.chart_cache.prerender(signal["symbol"], signal["timeframe"], signal_levels(signal))
+            
             # 1. Match subscribers
-            chat_ids = await self.match_subscribers(signal)
+            with stage("match"):
+                chat_ids = await self.match_subscribers(signal)
+            FANOUT_SIZE.observe(len(chat_ids))
             
-            # 2. Get sentiment
-            sentiment = await self.analyze_sentiment(signal["symbol"])
+            # 2. Start the sections; the message doesn't wait for them in progressive mode
+            sections = {
+                "sentiment": asyncio.create_task(self.analyze_sentiment(signal["symbol"])),
+                "verdict": asyncio.create_task(self.analyze_verdict(signal)),
+                "calendar": asyncio.create_task(self.calendar.get_summary(signal["symbol"]))
+            }
+            delivery = ProgressiveDelivery(
+                self.bot, self.fanout, lambda resolved: self.render_signal_message(signal, **resolved)
+            )
             
-            # 3. Send to all matched subscribers
-            for chat_id in chat_ids:
-                await self.send_signal_message(chat_id, signal, sentiment)
+            # 3. Send to all matched subscribers concurrently, before or after the sections
+            if SIGNAL_DELIVERY == "progressive":
+                with stage("send"):
+                    deliveries = await delivery.send(chat_ids)
+                with stage("enrich"):
+                    edits = await delivery.enrich(sections)
+            else:
+                with stage("enrich"):
+                    edits = await delivery.enrich(sections)
+                with stage("send"):
+                    deliveries = await delivery.send(chat_ids)
+            summary = summarize(deliveries)
+            logger.info(f"Signal delivered: {summary}")
             
             return {
                 "status": "success",
-                "sent_to": len(chat_ids),
+                "sent_to": summary["sent"],
                 "signal": signal,
-                "sentiment": sentiment
+                "sentiment": delivery.sections.get("sentiment"),
+                "sections": sorted(delivery.sections),
+                "delivery": summary,
+                "edits": edits,
+                # Per-chat results only for the chats that didn't get the message
+                "failures": [d for d in deliveries if d["status"] != "sent"][:DELIVERY_FAILURES_SHOWN]
             }
             
         except Exception as e:
             logger.error(f"Error processing signal: {str(e)}")
             raise
 
+    async def _send_chart(self, chat_id, message_id, symbol: str, timeframe: str, cache_key: str, media,
+                          levels_key: str = None):
+        """Replace the signal message with the chart, reusing Telegram's file_id when we have one"""
+        # Send screenshot with Back button
+        keyboard = InlineKeyboardMarkup([
+            [InlineKeyboardButton("⬅️ Back to Signal", callback_data=f"back_{message_id}")]
+        ])
+        
+        async def edit(photo):
+            return await self._bot.edit_message_media(
+                chat_id=chat_id,
+                message_id=message_id,
+                media=InputMediaPhoto(
+                    media=photo,
+                    caption=f"📊 Technical Analysis for {symbol} ({timeframe})",
+                    filename=None if isinstance(photo, str) else photo_filename(photo)
+                ),
+                reply_markup=keyboard
+            )
+        
+        if isinstance(media, str):
+            try:
+                return await edit(media)
+            except BadRequest as e:
+                # file_id no longer valid, upload the image again
+                logger.warning(f"Cached chart file_id rejected: {str(e)}")
+                await self.chart_cache.forget_file_id(cache_key)
+                cache_key, media = await self.chart_cache.get_media(symbol, timeframe, levels_key=levels_key)
+                if isinstance(media, str) or not media:
+                    raise
+        
+        # Update existing message with chart
+        message = await edit(media)
+        if hasattr(message, "photo") and message.photo:
+            await self.chart_cache.remember_file_id(cache_key, timeframe, message.photo[-1].file_id)
+        return message
+
     async def handle_button_click(self, callback_query: Dict):
         """Handle button clicks"""
         try:
@@ -153,29 +349,16 @@ class TradingBot:
             logger.info(f"Handling button click: {data}")
 
             if data.startswith("chart_"):
-                _, symbol, timeframe = data.split("_")
+                _, symbol, timeframe, *rest = data.split("_")
+                levels_key = rest[0] if rest else None
                 logger.info(f"Generating chart for {symbol} ({timeframe})")
                 
-                # Generate chart screenshot
-                screenshot = await self.chart_service.generate_chart(symbol, timeframe)
+                # Cached per candle and signal levels: a Telegram file_id, else the image, else a fresh render
+                cache_key, media = await self.chart_cache.get_media(symbol, timeframe, levels_key=levels_key)
                 
-                if screenshot:
-                    logger.info("Screenshot generated, sending to Telegram")
-                    # Send screenshot with Back button
-                    keyboard = InlineKeyboardMarkup([
-                        [InlineKeyboardButton("⬅️ Back to Signal", callback_data=f"back_{message_id}")]
-                    ])
-                    
-                    # Update existing message with chart
-                    await self._bot.edit_message_media(
-                        chat_id=chat_id,
-                        message_id=message_id,
-                        media=InputMediaPhoto(
-                            media=screenshot,
-                            caption=f"📊 Technical Analysis for {symbol} ({timeframe})",
-                        ),
-                        reply_markup=keyboard
-                    )
+                if media:
+                    logger.info("Chart ready, sending to Telegram")
+                    await self._send_chart(chat_id, message_id, symbol, timeframe, cache_key, media, levels_key)
                     logger.info("Screenshot sent successfully")
                 else:
                     logger.error("Failed to generate screenshot")
@@ -184,11 +367,40 @@ class TradingBot:
                         text="❌ Sorry, could not generate chart at this time."
                     )
                     
+            elif data.startswith("sentiment_") or data.startswith("calendar_"):
+                section, instrument = data.split("_", 1)
+                keyboard = InlineKeyboardMarkup([
+                    [InlineKeyboardButton(f"🔄 Update {section.title()}", callback_data=data)],
+                    [InlineKeyboardButton("⬅️ Back to Signal", callback_data=f"back_{message_id}")]
+                ])
+                try:
+                    if section == "sentiment":
+                        # Plain analyzer text going into an HTML message
+                        text = html.escape(await self.sentiment_cache.get(instrument))
+                    else:
+                        text = await self.calendar_cache.get(instrument)
+                except Exception as e:
+                    logger.error(f"Error getting {section}: {str(e)}")
+                    text = f"❌ <b>Error getting {'market sentiment' if section == 'sentiment' else 'economic calendar'}. Please try again.</b>"
+                
+                try:
+                    await self._bot.edit_message_text(
+                        chat_id=chat_id,
+                        message_id=message_id,
+                        text=text,
+                        parse_mode='HTML',
+                        reply_markup=keyboard
+                    )
+                except BadRequest as e:
+                    # "Update" pressed while the cached text hasn't changed
+                    if "not modified" not in str(e).lower():
+                        raise
+                    
             elif data.startswith("back_"):
                 # Restore original signal message
                 keyboard = InlineKeyboardMarkup([
                     [
-                        InlineKeyboardButton("📊 Technical Analysis", callback_data=f"chart_EURUSD_15m"),
+                        InlineKeyboardButton("📊 Technical Analysis", callback_data="chart_EURUSD_15m"),
                         InlineKeyboardButton("🤖 Market Sentiment", callback_data="sentiment_EURUSD")
                     ],
                     [
@@ -0,0 +1,69 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Blocking network clients (supabase, redis): short calls, lots of them
+io_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("IO_EXECUTOR_WORKERS", 32)),
+    thread_name_prefix="io"
+)
+
+# Selenium calls block for seconds; kept apart so they can't starve the I/O pool.
+# WebDriver sessions can't be pickled, so this is a thread pool: the browsers
+# themselves already run as separate processes.
+browser_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BROWSER_EXECUTOR_WORKERS", 4)),
+    thread_name_prefix="browser"
+)
+
+# CPU-bound work (rendering, number crunching); created on first use
+_cpu_executor: Optional[ProcessPoolExecutor] = None
+
+
+def cpu_executor() -> ProcessPoolExecutor:
+    global _cpu_executor
+    if _cpu_executor is None:
+        # Forked workers would inherit the server's listening and client sockets and keep
+        # closed keep-alive connections half-open; spawned workers start clean
+        _cpu_executor = ProcessPoolExecutor(
+            max_workers=int(os.getenv("CPU_EXECUTOR_WORKERS", os.cpu_count() or 1)),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _cpu_executor
+
+
+async def _run(executor: Executor, func: Callable, *args, **kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_io(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking I/O call (e.g. query.execute) off the event loop"""
+    return await _run(io_executor, func, *args, **kwargs)
+
+
+async def run_browser(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking Selenium call off the event loop"""
+    return await _run(browser_executor, func, *args, **kwargs)
+
+
+async def run_cpu(func: Callable, *args, **kwargs) -> Any:
+    """Run CPU-bound work in a worker process; func and args must be picklable"""
+    return await _run(cpu_executor(), func, *args, **kwargs)
+
+
+def shutdown_executors():
+    """Stop all pools; called on application shutdown"""
+    global _cpu_executor
+    io_executor.shutdown(wait=False, cancel_futures=True)
+    browser_executor.shutdown(wait=False, cancel_futures=True)
+    if _cpu_executor is not None:
+        _cpu_executor.shutdown(wait=False, cancel_futures=True)
+        _cpu_executor = None
+    logger.info("Executors shut down")
@@ -0,0 +1,256 @@
+import importlib.util
+import os
+from html.parser import HTMLParser
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+# Elements without an end tag; they never go on the streaming parser's stack
+VOID_ELEMENTS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"
+))
+
+# An open element of the same kind is closed by these start tags (<li>a<li>b), unless one
+# of the listed containers sits in between
+IMPLIED_END = {
+    "li": frozenset(("ul", "ol")),
+    "tr": frozenset(("table", "tbody", "thead", "tfoot")),
+    "td": frozenset(("tr", "table")),
+    "th": frozenset(("tr", "table")),
+    "dt": frozenset(("dl",)),
+    "dd": frozenset(("dl",)),
+    "option": frozenset(("select",))
+}
+
+Row = Dict[str, Optional[str]]
+Step = Tuple[Optional[str], FrozenSet[str]]
+
+
+class Selector:
+    """The CSS subset the scrapers need: descendant chains of tag.class steps, plus @attr.
+
+    ".calendar__impact span@title" is the title attribute of the first span inside the
+    first .calendar__impact; without @attr a field is the element's stripped text.
+    """
+
+    def __init__(self, text: str):
+        chain, _, attr = text.partition("@")
+        self.text = text
+        self.attr = attr or None
+        self.steps: List[Step] = []
+        for part in chain.split():
+            tag, *classes = part.split(".")
+            self.steps.append((tag.lower() or None, frozenset(classes)))
+
+    @staticmethod
+    def step_matches(step: Step, tag: str, classes: FrozenSet[str]) -> bool:
+        return (step[0] is None or step[0] == tag) and step[1] <= classes
+
+    def matches(self, tag: str, classes: FrozenSet[str], ancestors: List[Tuple[str, FrozenSet[str]]]) -> bool:
+        """Whether an element matches, given its ancestors (outermost first)"""
+        if not self.step_matches(self.steps[-1], tag, classes):
+            return False
+        remaining = len(self.steps) - 1
+        for ancestor in reversed(ancestors):
+            if not remaining:
+                break
+            if self.step_matches(self.steps[remaining - 1], *ancestor):
+                remaining -= 1
+        return remaining == 0
+
+    def xpath(self) -> str:
+        """Equivalent XPath, relative to the context node"""
+        parts = []
+        for tag, classes in self.steps:
+            conditions = "".join(
+                f"[contains(concat(' ', normalize-space(@class), ' '), ' {name} ')]" for name in sorted(classes)
+            )
+            parts.append(f"{tag or '*'}{conditions}")
+        return ".//" + "//".join(parts)
+
+
+class RowSpec:
+    """Which elements are rows and which fields to pull out of each one"""
+
+    def __init__(self, row: str, fields: Dict[str, str]):
+        self.row = Selector(row)
+        self.fields = {name: Selector(selector) for name, selector in fields.items()}
+
+
+def _extract_bs4(html: str, spec: RowSpec) -> List[Row]:
+    """Reference backend: a full BeautifulSoup tree and select_one per field"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    rows = []
+    for element in soup.select(spec.row.text):
+        row = {}
+        for name, selector in spec.fields.items():
+            found = element.select_one(selector.text.partition("@")[0])
+            if found is None:
+                row[name] = None
+            elif selector.attr:
+                value = found.get(selector.attr)
+                row[name] = " ".join(value) if isinstance(value, list) else value
+            else:
+                row[name] = found.text.strip()
+        rows.append(row)
+    return rows
+
+
+def _extract_lxml(html: str, spec: RowSpec) -> List[Row]:
+    """libxml2 tree; rows found with one XPath, each row's fields filled in one walk over it"""
+    import lxml.html
+    from lxml import etree
+
+    if isinstance(html, str):
+        # lxml refuses str input that carries an XML encoding declaration
+        html = html.encode("utf-8")
+    document = lxml.html.fromstring(html, parser=lxml.html.HTMLParser(encoding="utf-8"))
+    fields = list(spec.fields.items())
+
+    rows = []
+    for element in etree.XPath(spec.row.xpath())(document):
+        row = dict.fromkeys(spec.fields)
+        missing = len(fields)
+        for found in element.iterdescendants():
+            tag = found.tag
+            if not isinstance(tag, str):
+                # Comments and processing instructions
+                continue
+            classes = frozenset((found.get("class") or "").split())
+            ancestors = None
+            for name, selector in fields:
+                if row[name] is not None:
+                    continue
+                if len(selector.steps) > 1 and ancestors is None:
+                    ancestors = []
+                    for parent in found.iterancestors():
+                        if parent is element:
+                            break
+                        ancestors.append((parent.tag, frozenset((parent.get("class") or "").split())))
+                    ancestors.reverse()
+                if not selector.matches(tag, classes, ancestors or []):
+                    continue
+                row[name] = found.get(selector.attr) if selector.attr else found.text_content().strip()
+                missing -= 1
+            if not missing:
+                break
+        rows.append(row)
+    return rows
+
+
+class _RowStream(HTMLParser):
+    """Single pass over the markup: no tree, only a stack of open tags and the rows found"""
+
+    def __init__(self, spec: RowSpec):
+        super().__init__(convert_charrefs=True)
+        self.spec = spec
+        self.rows: List[Row] = []
+        self._stack: List[Tuple[str, FrozenSet[str]]] = []
+        self._row: Optional[Row] = None
+        self._row_depth = 0
+        self._found: set = set()
+        self._captures: Dict[str, int] = {}
+        self._text: Dict[str, List[str]] = {}
+
+    def handle_starttag(self, tag, attrs):
+        if tag in IMPLIED_END:
+            self._close_sibling(tag)
+        attributes = dict(attrs)
+        classes = frozenset((attributes.get("class") or "").split())
+
+        if self._row is None:
+            if self.spec.row.matches(tag, classes, self._stack):
+                self._row = dict.fromkeys(self.spec.fields)
+                self._found.clear()
+                self._row_depth = len(self._stack)
+        else:
+            # Fields are matched within the row only, first match wins (like select_one)
+            inside = self._stack[self._row_depth + 1:]
+            for name, selector in self.spec.fields.items():
+                if name in self._found or not selector.matches(tag, classes, inside):
+                    continue
+                self._found.add(name)
+                if selector.attr:
+                    self._row[name] = attributes.get(selector.attr)
+                elif tag not in VOID_ELEMENTS:
+                    self._captures[name] = len(self._stack)
+                    self._text[name] = []
+                else:
+                    self._row[name] = ""
+
+        if tag not in VOID_ELEMENTS:
+            self._stack.append((tag, classes))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def _close_sibling(self, tag):
+        boundary = IMPLIED_END[tag]
+        for open_tag, _ in reversed(self._stack):
+            if open_tag == tag:
+                self.handle_endtag(tag)
+                return
+            if open_tag in boundary:
+                return
+
+    def handle_endtag(self, tag):
+        # Tolerate unclosed elements: close everything up to the matching open tag
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == tag:
+                break
+        else:
+            return
+
+        while len(self._stack) > index:
+            self._stack.pop()
+            depth = len(self._stack)
+            for name in [name for name, start in self._captures.items() if start == depth]:
+                del self._captures[name]
+                self._row[name] = "".join(self._text.pop(name)).strip()
+            if self._row is not None and depth == self._row_depth:
+                self.rows.append(self._row)
+                self._row = None
+
+    def handle_data(self, data):
+        for name in self._captures:
+            self._text[name].append(data)
+
+    def finish(self) -> List[Row]:
+        self.close()
+        if self._row is not None:
+            for name in list(self._captures):
+                self._row[name] = "".join(self._text.pop(name)).strip()
+            self.rows.append(self._row)
+            self._row = None
+        return self.rows
+
+
+def _extract_stream(html: str, spec: RowSpec) -> List[Row]:
+    """Event-driven extraction with the stdlib parser; no tree is ever built"""
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+    stream = _RowStream(spec)
+    stream.feed(html)
+    return stream.finish()
+
+
+BACKENDS: Dict[str, Callable[[str, RowSpec], List[Row]]] = {
+    "bs4": _extract_bs4,
+    "lxml": _extract_lxml,
+    "stream": _extract_stream
+}
+
+
+def default_backend() -> str:
+    """HTML_PARSER if set, else lxml when it's installed, else the streaming parser"""
+    backend = os.getenv("HTML_PARSER")
+    if backend:
+        return backend
+    return "lxml" if importlib.util.find_spec("lxml") else "stream"
+
+
+def extract_rows(html: str, spec: RowSpec, backend: str = None) -> List[Row]:
+    """Parse a page once and return every row as {field: text or attribute, None if missing}"""
+    return BACKENDS[backend or default_backend()](html, spec)
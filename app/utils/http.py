@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Any, Deque, Dict
+
+import aiohttp
+from yarl import URL
+
+logger = logging.getLogger(__name__)
+
+# Hosts that get a different connection limit than HTTP_LIMIT_PER_HOST
+HOST_LIMITS = {
+    "api.telegram.org": int(os.getenv("HTTP_LIMIT_TELEGRAM", 50)),
+    "api.perplexity.ai": int(os.getenv("HTTP_LIMIT_PERPLEXITY", 10))
+}
+
+
+class HostMetrics:
+    """Latency and connection reuse for one upstream host"""
+
+    def __init__(self, window: int = 500):
+        self.requests = 0
+        self.errors = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.latencies: Deque[float] = deque(maxlen=window)
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        connections = self.new_connections + self.reused_connections
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1) if latencies else 0.0
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "new_connections": self.new_connections,
+            "reused_connections": self.reused_connections,
+            "reuse_ratio": round(self.reused_connections / connections, 3) if connections else 0.0,
+            "p50_ms": percentile(0.5),
+            "p99_ms": percentile(0.99)
+        }
+
+
+class HttpClients:
+    """Application-wide aiohttp sessions, one per upstream host, kept alive between calls.
+
+    aiohttp only speaks HTTP/1.1; keep-alive connection pooling is what saves the DNS,
+    TCP and TLS setup on every call.
+    """
+
+    def __init__(self, limit_per_host: int = None, keepalive: float = None, timeout: float = None):
+        self.limit_per_host = limit_per_host or int(os.getenv("HTTP_LIMIT_PER_HOST", 20))
+        self.keepalive = keepalive or float(os.getenv("HTTP_KEEPALIVE", 60))
+        self.timeout = aiohttp.ClientTimeout(total=timeout or float(os.getenv("HTTP_TIMEOUT", 30)))
+        self.sessions: Dict[str, aiohttp.ClientSession] = {}
+        self.metrics: Dict[str, HostMetrics] = {}
+
+    def session(self, url: str) -> aiohttp.ClientSession:
+        """The pooled session for the host of url, created on first use"""
+        host = URL(url).host or url
+        session = self.sessions.get(host)
+        if session is None or session.closed:
+            session = self.sessions[host] = self._create(host)
+        return session
+
+    def _create(self, host: str) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=HOST_LIMITS.get(host, self.limit_per_host),
+            keepalive_timeout=self.keepalive,
+            ttl_dns_cache=300
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout,
+            trace_configs=[self._trace_config(self.metrics.setdefault(host, HostMetrics()))]
+        )
+
+    @staticmethod
+    def _trace_config(metrics: HostMetrics) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx: SimpleNamespace, params):
+            ctx.start = time.perf_counter()
+
+        async def on_request_end(session, ctx: SimpleNamespace, params):
+            metrics.requests += 1
+            metrics.latencies.append(time.perf_counter() - ctx.start)
+
+        async def on_request_exception(session, ctx: SimpleNamespace, params):
+            metrics.requests += 1
+            metrics.errors += 1
+
+        async def on_connection_create_end(session, ctx, params):
+            metrics.new_connections += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            metrics.reused_connections += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_end)
+        trace.on_request_exception.append(on_request_exception)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace
+
+    async def start(self, *urls: str):
+        """Open sessions for hosts we know we'll need"""
+        for url in urls:
+            self.session(url)
+        logger.info(f"HTTP client pool ready ({len(self.sessions)} hosts)")
+
+    async def close(self):
+        sessions, self.sessions = list(self.sessions.values()), {}
+        await asyncio.gather(*(s.close() for s in sessions if not s.closed), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {host: metrics.stats() for host, metrics in self.metrics.items()}
+
+
+http_clients = HttpClients()
@@ -8,6 +8,7 @@ from telegram.ext import (
 import os
 import redis
 from supabase import create_client
+from app.utils.executors import run_io
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,7 +22,7 @@ async def init_redis():
             port=int(os.getenv('REDIS_PORT', 6379)),
             decode_responses=True
         )
-        redis_client.ping()
+        await run_io(redis_client.ping)
         logger.info("✅ Redis connection successful")
     except Exception as e:
         logger.error(f"❌ Redis connection failed: {str(e)}")
@@ -40,7 +41,7 @@ async def init_supabase():
         supabase = create_client(url, key)
         
         # Test connection
-        test_response = supabase.table("subscriber_preferences").select("count").execute()
+        test_response = await run_io(supabase.table("subscriber_preferences").select("count").execute)
         logger.info("✅ Supabase connection successful")
             
     except Exception as e:
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """Reports spans where the event loop was blocked longer than a threshold"""
+
+    def __init__(self, threshold_ms: float = None, interval: float = 0.1):
+        self.threshold = (threshold_ms or float(os.getenv("LOOP_LAG_THRESHOLD_MS", 100))) / 1000
+        self.interval = interval
+        self.blocked_spans = 0
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._tick_forever())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"Event loop lag monitor started (threshold {self.threshold * 1000:.0f}ms)")
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _tick_forever(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+
+            # How late the loop woke us up is how long something else held it
+            lag = max(0.0, now - expected)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.threshold:
+                self.blocked_spans += 1
+                logger.warning(f"Event loop was blocked for {lag * 1000:.0f}ms")
+
+    def _watch(self):
+        """Runs in its own thread so it can look at the loop while it is stuck"""
+        reported = None
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled > self.threshold and reported != heartbeat:
+                # Once per span: show what the loop thread is busy with
+                reported = heartbeat
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    stack = "".join(traceback.format_stack(frame, limit=8))
+                    logger.warning(f"Event loop blocked for >{stalled * 1000:.0f}ms in:\n{stack}")
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "blocked_spans": self.blocked_spans,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "last_lag_ms": round(self.last_lag * 1000, 1),
+            "threshold_ms": round(self.threshold * 1000, 1)
+        }
+
+
+loop_monitor = LoopLagMonitor()
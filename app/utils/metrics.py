@@ -0,0 +1,100 @@
+import functools
+import inspect
+import time
+from typing import Any, Callable
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from telegram.request import HTTPXRequest
+
+# Signal pipeline: ingest (parse and validate) -> match -> enrich/send; total is process_signal
+STAGE_SECONDS = Histogram(
+    "signal_stage_seconds", "Latency per signal pipeline stage", ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+FANOUT_SIZE = Histogram(
+    "signal_fanout_subscribers", "Subscribers a signal is delivered to",
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+)
+
+# Hit ratio per family: sum(rate(cache_requests_total{result=~"hit.*"})) / sum(rate(cache_requests_total))
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups per key family", ["family", "result"])
+
+LLM_SECONDS = Histogram(
+    "llm_request_seconds", "LLM call latency per model", ["model"],
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+)
+LLM_TOKENS = Counter("llm_tokens_total", "LLM tokens used per model", ["model", "kind"])
+
+# 429 rate: rate(telegram_requests_total{status="429"}) / rate(telegram_requests_total)
+TELEGRAM_REQUESTS = Counter("telegram_requests_total", "Telegram Bot API calls by method and HTTP status", ["method", "status"])
+
+# Durable outbound queue: throughput is rate(outbox_messages_total{result="sent"})
+OUTBOX_MESSAGES = Counter("outbox_messages_total", "Outbox delivery attempts by outcome", ["result"])
+OUTBOX_LAG = Histogram(
+    "outbox_delivery_lag_seconds", "Time from enqueue to successful delivery",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+)
+OUTBOX_PENDING = Gauge("outbox_pending", "Messages waiting in the outbox (including retries)")
+OUTBOX_DEAD = Gauge("outbox_dead_letters", "Messages in the outbox dead-letter list")
+
+
+def stage(name: str):
+    """Context manager timing one pipeline stage: `with stage("match"): ...`"""
+    return STAGE_SECONDS.labels(name).time()
+
+
+def timed(name: str) -> Callable:
+    """Decorator recording how long a sync or async function takes as pipeline stage `name`"""
+    # Resolve the label once; each call then costs two perf_counter reads and an observe
+    histogram = STAGE_SECONDS.labels(name)
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+
+    return decorator
+
+
+def observe_llm(model: str, seconds: float, usage: Any = None):
+    """Record one LLM call; usage is the OpenAI usage object or the "usage" dict of a raw response"""
+    LLM_SECONDS.labels(model).observe(seconds)
+    if not usage:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        tokens = usage.get(kind) if isinstance(usage, dict) else getattr(usage, kind, None)
+        if tokens:
+            LLM_TOKENS.labels(model, kind.split("_")[0]).inc(tokens)
+
+
+def observe_telegram(method: str, status: int):
+    TELEGRAM_REQUESTS.labels(method, str(status)).inc()
+
+
+class MetricsRequest(HTTPXRequest):
+    """python-telegram-bot transport that counts Bot API calls per method and status"""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        code, payload = await super().do_request(url, method, *args, **kwargs)
+        observe_telegram(url.rsplit("/", 1)[-1], code)
+        return code, payload
+
+
+def render():
+    """Body and content type for the /metrics endpoint"""
+    return generate_latest(), CONTENT_TYPE_LATEST
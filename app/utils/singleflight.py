@@ -0,0 +1,84 @@
+import asyncio
+import inspect
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.utils.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+async def _maybe_await(value):
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+def _retrieve_exception(task: asyncio.Task):
+    # Waiters may all have been cancelled; don't let asyncio warn about the lost error
+    if not task.cancelled():
+        task.exception()
+
+
+class SingleFlight:
+    """Cache front that lets concurrent misses for one key share a single computation"""
+
+    def __init__(self, name: str,
+                 get_cached: Optional[Callable[[str], Any]] = None,
+                 set_cached: Optional[Callable[[str, Any], Any]] = None):
+        self.name = name
+        self.get_cached = get_cached
+        self.set_cached = set_cached
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._hit_counter = CACHE_REQUESTS.labels(name, "hit")
+        self._miss_counter = CACHE_REQUESTS.labels(name, "miss")
+        self._coalesced_counter = CACHE_REQUESTS.labels(name, "coalesced")
+
+    async def get(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for key, computing it at most once at a time"""
+        if self.get_cached:
+            cached = await _maybe_await(self.get_cached(key))
+            if cached is not None:
+                self.hits += 1
+                self._hit_counter.inc()
+                return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            self._miss_counter.inc()
+            task = asyncio.create_task(self._run(key, compute))
+            task.add_done_callback(_retrieve_exception)
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+            self._coalesced_counter.inc()
+            logger.debug(f"{self.name}: joined in-flight computation for {key}")
+
+        # Shield so one caller giving up doesn't cancel the work for everybody else
+        return await asyncio.shield(task)
+
+    async def _run(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await compute()
+            if value is not None and self.set_cached:
+                try:
+                    await _maybe_await(self.set_cached(key, value))
+                except Exception as e:
+                    logger.error(f"{self.name}: error caching {key}: {str(e)}")
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Counters; every coalesced request is an upstream call saved"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+            "calls_saved": self.hits + self.coalesced
+        }
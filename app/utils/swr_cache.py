@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+from app.utils.executors import run_io
+from app.utils.metrics import CACHE_REQUESTS
+from app.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class StaleWhileRevalidateCache:
+    """Redis cache that serves the last value and refreshes it in the background"""
+
+    def __init__(self, redis, prefix: str, loader: Callable[[str], Awaitable[str]],
+                 fresh_ttl: int = 300, stale_ttl: int = 86400):
+        self.redis = redis
+        self.prefix = prefix
+        self.loader = loader
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.flight = SingleFlight(f"{prefix}-refresh")
+        self._last_access: Dict[str, float] = {}
+        self._background = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}:{name}"
+
+    async def get(self, name: str) -> str:
+        """Return the cached value, loading it only if there is nothing to serve"""
+        self._last_access[name] = time.monotonic()
+
+        # Values keep their plain format (other code reads these keys too); a
+        # separate :fresh marker expires first and flags the value as stale
+        pipe = self.redis.pipeline()
+        pipe.get(self._key(name))
+        pipe.exists(f"{self._key(name)}:fresh")
+        value, fresh = await run_io(pipe.execute)
+
+        if value is None:
+            CACHE_REQUESTS.labels(self.prefix, "miss").inc()
+            return await self.refresh(name)
+
+        if not fresh:
+            CACHE_REQUESTS.labels(self.prefix, "hit_stale").inc()
+            self._refresh_in_background(name)
+        else:
+            CACHE_REQUESTS.labels(self.prefix, "hit").inc()
+
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    async def refresh(self, name: str) -> str:
+        """Load a new value and store it; concurrent refreshes share one load"""
+        return await self.flight.get(name, lambda: self._load(name))
+
+    async def _load(self, name: str) -> str:
+        value = await self.loader(name)
+
+        pipe = self.redis.pipeline()
+        pipe.set(self._key(name), value, ex=self.stale_ttl)
+        pipe.set(f"{self._key(name)}:fresh", 1, ex=self.fresh_ttl)
+        await run_io(pipe.execute)
+
+        logger.debug(f"Refreshed {self._key(name)}")
+        return value
+
+    def _refresh_in_background(self, name: str):
+        task = asyncio.create_task(self.refresh(name))
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._background.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Background refresh of {self.prefix} failed: {str(task.exception())}")
+
+    def start_rewarming(self, names: Iterable[str], interval: int = 60, lead_time: int = 90, hot_window: int = 3600):
+        """Periodically refresh recently requested names before their value goes stale"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._rewarm_forever(list(names), interval, lead_time, hot_window))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _rewarm_forever(self, names, interval: int, lead_time: int, hot_window: int):
+        while True:
+            await asyncio.sleep(interval)
+
+            now = time.monotonic()
+            hot = [n for n in names if now - self._last_access.get(n, float("-inf")) < hot_window]
+            if not hot:
+                continue
+
+            try:
+                pipe = self.redis.pipeline()
+                for name in hot:
+                    pipe.ttl(f"{self._key(name)}:fresh")
+                ttls = await run_io(pipe.execute)
+            except Exception as e:
+                logger.error(f"Error checking {self.prefix} freshness: {str(e)}")
+                continue
+
+            # ttl is -2 when the marker is gone, -1 if it has no expiry
+            due = [name for name, ttl in zip(hot, ttls) if ttl != -1 and ttl < lead_time]
+            # Refreshed together so a batching loader can combine them
+            results = await asyncio.gather(*(self.refresh(name) for name in due), return_exceptions=True)
+            for name, result in zip(due, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Error re-warming {self._key(name)}: {str(result)}")
@@ -4,14 +4,16 @@
 # 3. Duidelijkere scheiding tussen signalen en news scraping
 
 import os
-from celery import Celery
+import zlib
+from celery import Celery, chord, group
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from tenacity import retry, wait_exponential, stop_after_attempt
 import requests
+from requests.adapters import HTTPAdapter
 from news_scraper import NewsScraper
-from celery.chain import chain, group
-from subscriber_manager import find_subscribers
+from subscriber_manager import find_subscribers, subscriber_lookup
+from monitoring import VIEW_GENERATION, VIEW_REFRESH_SECONDS, VIEW_ROWS
 import logging
 
 # Flask app initialisatie
@@ -19,7 +21,8 @@ flask_app = Flask(__name__)
 CORS(flask_app)
 
 # Celery app initialisatie
-celery_app = Celery(__name__, broker=os.getenv('RABBITMQ_URL'))
+# Een chord heeft een result backend nodig (bijv. redis://)
+celery_app = Celery(__name__, broker=os.getenv('RABBITMQ_URL'), backend=os.getenv('CELERY_RESULT_BACKEND'))
 celery_app.conf.update(
     task_serializer='json',
     accept_content=['json'],
@@ -28,11 +31,40 @@ celery_app.conf.update(
     enable_utc=True
 )
 
+# Signalen worden per asset over signals.0 .. signals.N-1 verdeeld, subscriber refreshes gaan
+# naar een eigen queue; start workers en beat met bijv.
+# `celery -A main worker -Q signals.0,signals.1,signals.2,signals.3,subscribers` en `celery -A main beat`
+ASSET_QUEUES = int(os.getenv('ASSET_QUEUES', 4))
+SUBSCRIBER_QUEUE = os.getenv('SUBSCRIBER_QUEUE', 'subscribers')
+
+# active_subscribers: volledige refresh op een vaste cadans, en tussendoor zodra subscribers wijzigen
+SUBSCRIBER_REFRESH_INTERVAL = float(os.getenv('SUBSCRIBER_REFRESH_INTERVAL', 300))
+SUBSCRIBER_CHANGE_POLL = float(os.getenv('SUBSCRIBER_CHANGE_POLL', 15))
+
 scraper = NewsScraper()
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+_session = None
+_session_pid = None
+
+def http_session() -> requests.Session:
+    """Keep-alive session for the AI services, one per worker process"""
+    global _session, _session_pid
+    # Na een fork opnieuw aanmaken zodat processen geen sockets delen
+    if _session is None or _session_pid != os.getpid():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=int(os.getenv('HTTP_POOL_SIZE', 10)))
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _session, _session_pid = session, os.getpid()
+    return _session
+
+def queue_for(asset: str) -> str:
+    """Worker queue for an asset; stable across processes, unlike hash()"""
+    return f"signals.{zlib.crc32(asset.upper().encode()) % ASSET_QUEUES}"
+
 def validate_signal(signal):
     required_fields = ['asset', 'action', 'price', 'timeframe']
     return all(field in signal for field in required_fields)
@@ -51,28 +83,58 @@ def handle_signal():
         if not validate_signal(data):
             return jsonify({"error": "Ongeldig signaalformaat"}), 400
             
-        process_signal_task.delay(data)
-        return jsonify({"status": "success", "message": "Signaal in verwerking"})
+        task = process_signal_task.apply_async(args=[data], queue=queue_for(data['asset']))
+        return jsonify({"status": "success", "message": "Signaal in verwerking", "task_id": task.id})
         
     except Exception as e:
         log_error(str(e))
         return jsonify({"error": "Interne serverfout"}), 500
 
+@flask_app.route('/signal/<task_id>')
+def signal_status(task_id):
+    try:
+        task = celery_app.AsyncResult(task_id)
+        if not task.ready():
+            return jsonify({"status": "queued"})
+        if task.failed():
+            return jsonify({"status": "failed"}), 500
+
+        # process_signal_task geeft het id van de chord callback terug
+        delivery = celery_app.AsyncResult(task.result)
+        if not delivery.ready():
+            return jsonify({"status": "processing"})
+        if delivery.failed():
+            return jsonify({"status": "failed"}), 500
+        return jsonify({"status": "done", "delivery": delivery.result})
+
+    except Exception as e:
+        log_error(str(e))
+        return jsonify({"error": "Interne serverfout"}), 500
+
+@flask_app.route('/subscribers/refresh', methods=['POST'])
+def request_subscriber_refresh():
+    # Aan te roepen na een wijziging van voorkeuren, zodat matching niet op de volgende poll wacht
+    task = refresh_active_subscribers.delay(reason='preferences')
+    return jsonify({"status": "success", "task_id": task.id})
+
 @flask_app.route('/health')
 def health_check():
     return jsonify({"status": "ok", "version": "1.0.0"})
 
+def signal_pipeline(signal):
+    """News, signal analysis and subscriber matching in parallel, merged by build_delivery"""
+    queue = queue_for(signal['asset'])
+    header = group(
+        scrape_news.s(signal['asset']).set(queue=queue) | ai_process_news.s().set(queue=queue),
+        ai_process_signal.s(signal).set(queue=queue),
+        match_subscribers.s(signal).set(queue=queue)
+    )
+    return chord(header, build_delivery.s(signal).set(queue=queue))
+
 @celery_app.task(bind=True, max_retries=3)
 def process_signal_task(self, signal):
     try:
-        # Parallelle taken chain
-        chain(
-            scrape_news.s(signal['asset']) | 
-            group(
-                ai_process_news.s() | match_subscribers.s(),
-                ai_process_signal.s(signal)
-            )
-        ).apply_async()
+        return signal_pipeline(signal).apply_async().id
         
     except Exception as e:
         self.retry(exc=e, countdown=60)
@@ -102,7 +164,7 @@ def fetch_signal():
 
 @celery_app.task
 def ai_process_news(news_data):
-    response = requests.post(
+    response = http_session().post(
         os.getenv('AI_NEWS_PROCESSOR_URL'),
         json=news_data,
         timeout=30
@@ -111,7 +173,7 @@ def ai_process_news(news_data):
 
 @celery_app.task
 def ai_process_signal(signal):
-    response = requests.post(
+    response = http_session().post(
         os.getenv('AI_SIGNAL_PROCESSOR_URL'),
         json=signal,
         timeout=30
@@ -119,12 +181,49 @@ def ai_process_signal(signal):
     return response.json()
 
 @celery_app.task
-def match_subscribers(processed_data):
-    subscribers = find_subscribers(processed_data)
+def match_subscribers(signal):
+    return find_subscribers(signal)
+
+@celery_app.task
+def build_delivery(results, signal):
+    """Chord callback: one delivery job from AI news, AI signal and matched subscribers"""
+    news, analysis, subscribers = results
     return {
-        "count": len(subscribers),
-        "details": processed_data
+        "signal": signal,
+        "news": news,
+        "analysis": analysis,
+        "subscribers": subscribers,
+        "count": len(subscribers)
+    }
+
+@celery_app.task
+def refresh_active_subscribers(reason='schedule', force=True):
+    result = subscriber_lookup.refresh_view(reason, force)
+    VIEW_GENERATION.set(result['generation'])
+    if result['refreshed']:
+        VIEW_REFRESH_SECONDS.observe(result['duration_ms'] / 1000)
+        VIEW_ROWS.set(result['row_count'])
+        logger.info(f"active_subscribers generation {result['generation']} ({reason}): "
+                    f"{result['row_count']} rows in {result['duration_ms']} ms")
+    return result
+
+# Geldt ook voor beat en /subscribers/refresh, anders belandt de taak op de default 'celery' queue
+celery_app.conf.task_routes = {
+    refresh_active_subscribers.name: {'queue': SUBSCRIBER_QUEUE}
+}
+
+celery_app.conf.beat_schedule = {
+    'refresh-active-subscribers': {
+        'task': refresh_active_subscribers.name,
+        'schedule': SUBSCRIBER_REFRESH_INTERVAL,
+        'kwargs': {'reason': 'schedule'}
+    },
+    'refresh-active-subscribers-on-change': {
+        'task': refresh_active_subscribers.name,
+        'schedule': SUBSCRIBER_CHANGE_POLL,
+        'kwargs': {'reason': 'change', 'force': False}
     }
+}
 
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 8000))
@@ -1,9 +1,16 @@
-from prometheus_client import start_http_server, Counter, Gauge
+import time
+
+from prometheus_client import start_http_server, Counter, Gauge, Histogram
 
 REQUESTS_TOTAL = Counter('scrape_requests_total', 'Total scrape requests')
 ERRORS_TOTAL = Counter('scrape_errors_total', 'Total scrape errors')
 LATENCY = Gauge('scrape_latency_seconds', 'Scraping latency')
 
+VIEW_REFRESH_SECONDS = Histogram('active_subscribers_refresh_seconds', 'Duration of active_subscribers refreshes',
+                                 buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+VIEW_ROWS = Gauge('active_subscribers_rows', 'Rows in active_subscribers after the last refresh')
+VIEW_GENERATION = Gauge('active_subscribers_generation', 'Current generation of active_subscribers')
+
 def monitor_performance(func):
     def wrapper(*args, **kwargs):
         start_time = time.time()
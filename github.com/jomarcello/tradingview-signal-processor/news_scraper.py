@@ -1,15 +1,41 @@
-from bs4 import BeautifulSoup
+import importlib.util
+import logging
+import re
+from datetime import datetime
+
+from bs4 import BeautifulSoup, SoupStrainer
 import fake_useragent
+import requests
+
+from proxy_manager import ProxyRotator
+
+logger = logging.getLogger(__name__)
+
+# Alleen de artikelen opbouwen, de rest van de pagina wordt overgeslagen
+# (regex, want een gewone string matcht alleen class="news-article" zonder andere classes)
+ARTICLES = SoupStrainer(class_=re.compile(r"(^|\s)news-article(\s|$)"))
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+
+def parse_timestamp(value: str) -> str:
+    value = value.strip()
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        return value
+
 
 class NewsScraper:
     def __init__(self):
         self.user_agent = fake_useragent.UserAgent()
         self.proxy_rotator = ProxyRotator()
+        # Keep-alive verbindingen hergebruiken tussen scrapes
+        self.session = requests.Session()
     
     def scrape_articles(self, asset: str) -> list:
         headers = {'User-Agent': self.user_agent.random}
         try:
-            response = requests.get(
+            response = self.session.get(
                 f'https://www.tradingview.com/news/{asset}/',
                 proxies=self.proxy_rotator.get_proxy(),
                 headers=headers,
@@ -17,11 +43,11 @@ class NewsScraper:
             )
             return self.parse_articles(response.content)
         except Exception as e:
-            log_error(f"Scrape error for {asset}: {str(e)}")
+            logger.error(f"Scrape error for {asset}: {str(e)}")
             return []
 
     def parse_articles(self, html: str) -> list:
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = BeautifulSoup(html, HTML_PARSER, parse_only=ARTICLES)
         articles = []
         
         for article in soup.select('.news-article'):
@@ -1,9 +1,94 @@
 from supabase import create_client
+import logging
 import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# active_subscribers bevat alleen actieve subscribers; zet op 'subscribers' om de tabel te lezen
+SUBSCRIBER_SOURCE = os.getenv("SUBSCRIBER_SOURCE", "active_subscribers")
+# Alleen wat nodig is om een signaal af te leveren
+DELIVERY_COLUMNS = os.getenv("SUBSCRIBER_COLUMNS", "id,chat_id")
+
+
+class SubscriberLookup:
+    """Subscribers per asset/timeframe, filtered in Postgres and cached for a short TTL"""
+
+    def __init__(self, client=None, ttl: float = None):
+        self._client = client
+        self._client_pid = os.getpid() if client else None
+        self.ttl = ttl if ttl is not None else float(os.getenv("SUBSCRIBER_CACHE_TTL", 30))
+        # Hoe vaak we navragen welke generatie van de view er staat
+        self.generation_interval = float(os.getenv("SUBSCRIBER_GENERATION_INTERVAL", 5))
+        self.generation = None
+        self._generation_checked = float("-inf")
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # Eén client per (worker)proces
+        if self._client is None or self._client_pid != os.getpid():
+            self._client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+            self._client_pid = os.getpid()
+        return self._client
+
+    def find(self, asset: str, timeframe: str) -> list:
+        key = (asset, timeframe)
+        now = time.monotonic()
+        generation = self._current_generation(now)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached and cached[0] > now and cached[1] == generation:
+            return cached[2]
+
+        # contains() wordt een @> filter dat de GIN indexen op assets/preferred_timeframes gebruikt
+        rows = (
+            self.client.table(SUBSCRIBER_SOURCE)
+            .select(DELIVERY_COLUMNS)
+            .contains("assets", [asset])
+            .contains("preferred_timeframes", [timeframe])
+            .execute()
+            .data
+        )
+        with self._lock:
+            self._cache[key] = (now + self.ttl, generation, rows)
+        return rows
+
+    def _current_generation(self, now: float):
+        if SUBSCRIBER_SOURCE != "active_subscribers" or now - self._generation_checked < self.generation_interval:
+            return self.generation
+        self._generation_checked = now
+        try:
+            self.observe_generation(self.client.rpc("active_subscribers_generation", {}).execute().data)
+        except Exception as e:
+            logger.error(f"Error reading active_subscribers generation: {str(e)}")
+        return self.generation
+
+    def observe_generation(self, generation):
+        """Drop everything cached from an older generation of the view"""
+        if generation != self.generation:
+            self.invalidate()
+            self.generation = generation
+
+    def refresh_view(self, reason: str = "schedule", force: bool = True) -> dict:
+        """Refresh active_subscribers; with force=False only when subscribers changed since the last refresh"""
+        result = self.client.rpc("refresh_active_subscribers", {"reason": reason, "force": force}).execute().data[0]
+        self.observe_generation(result["generation"])
+        return result
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+
+
+subscriber_lookup = SubscriberLookup()
+
 
 def find_subscribers(signal):
-    supabase = create_client(
-        os.getenv("SUPABASE_URL"),
-        os.getenv("SUPABASE_KEY")
-    )
-    return supabase.table('subscribers').select('*').execute() 
\ No newline at end of file
+    try:
+        return subscriber_lookup.find(signal['asset'], signal['timeframe'])
+    except Exception as e:
+        logger.error(f"Subscriber lookup failed for {signal.get('asset')}: {str(e)}")
+        raise
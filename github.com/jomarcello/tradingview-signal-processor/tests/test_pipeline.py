@@ -0,0 +1,123 @@
+import json
+import os
+import socket
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import redis
+from fakeredis import TcpFakeServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+SIGNAL = {"asset": "EURUSD", "action": "BUY", "price": 1.085, "timeframe": "1h"}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class AIService(BaseHTTPRequestHandler):
+    """Stand-in for the news and signal AI services; counts TCP connections"""
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        AIService.connections += 1
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        body = json.dumps({"path": self.path, "input": payload}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ai_service(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AIService)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setenv("AI_NEWS_PROCESSOR_URL", f"{base}/news")
+    monkeypatch.setenv("AI_SIGNAL_PROCESSOR_URL", f"{base}/signal")
+    AIService.connections = 0
+    yield
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    """Fake redis broker per test; Celery's connection pools are reset afterwards"""
+    port = free_port()
+    server = TcpFakeServer(("127.0.0.1", port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"redis://127.0.0.1:{port}/0"
+    monkeypatch.setattr(main.celery_app.conf, "broker_url", url)
+    yield redis.Redis.from_url(url)
+    main.celery_app.pool.force_close_all()
+    main.celery_app._after_fork()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def eager():
+    main.celery_app.conf.update(task_always_eager=True, task_eager_propagates=True)
+    yield
+    main.celery_app.conf.update(task_always_eager=False, task_eager_propagates=False)
+
+
+def test_chord_merges_results_into_delivery(ai_service, eager, monkeypatch):
+    articles = [{"title": "ECB holds rates", "summary": "", "timestamp": "", "url": "/news/1"}]
+    subscribers = [{"chat_id": "1"}, {"chat_id": "2"}]
+    monkeypatch.setattr(main.scraper, "scrape_articles", lambda asset: articles)
+    monkeypatch.setattr(main, "find_subscribers", lambda signal: subscribers)
+
+    for _ in range(3):
+        job = main.signal_pipeline(SIGNAL).apply_async().get()
+
+    assert job["signal"] == SIGNAL
+    assert job["news"] == {"path": "/news", "input": articles}
+    assert job["analysis"] == {"path": "/signal", "input": SIGNAL}
+    assert job["subscribers"] == subscribers
+    assert job["count"] == 2
+
+    # Zes AI calls over één keep-alive verbinding
+    assert AIService.connections == 1
+
+
+def test_signal_is_routed_to_asset_queue(broker):
+    client = main.flask_app.test_client()
+    for asset in ("EURUSD", "EURUSD", "XAUUSD"):
+        response = client.post("/signal", json={**SIGNAL, "asset": asset})
+        assert response.status_code == 200
+        assert response.get_json()["task_id"]
+
+    queued = {f"signals.{i}": broker.llen(f"signals.{i}") for i in range(main.ASSET_QUEUES)}
+    assert main.queue_for("EURUSD") != main.queue_for("XAUUSD")
+    assert queued[main.queue_for("EURUSD")] == 2
+    assert queued[main.queue_for("XAUUSD")] == 1
+    assert sum(queued.values()) == 3
+
+
+def test_subscriber_refresh_is_routed_to_subscriber_queue(broker):
+    response = main.flask_app.test_client().post("/subscribers/refresh")
+    assert response.status_code == 200
+    # Zoals beat het verstuurt: op naam
+    for entry in main.celery_app.conf.beat_schedule.values():
+        main.celery_app.send_task(entry["task"], kwargs=entry["kwargs"])
+
+    assert broker.llen(main.SUBSCRIBER_QUEUE) == 3
+    assert broker.llen("celery") == 0
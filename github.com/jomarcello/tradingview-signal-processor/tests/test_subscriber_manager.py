@@ -0,0 +1,104 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subscriber_manager import SubscriberLookup  # noqa: E402
+
+
+class Query:
+    """Records the PostgREST builder calls of one query"""
+
+    def __init__(self, calls, rows):
+        self.calls = calls
+        self.rows = rows
+
+    def __getattr__(self, name):
+        def method(*args):
+            self.calls.append((name, *args))
+            return self
+        return method
+
+    def execute(self):
+        self.calls.append(("execute",))
+        return type("Response", (), {"data": self.rows})()
+
+
+class Client:
+    def __init__(self, rows, generation=1):
+        self.rows = rows
+        self.generation = generation
+        self.queries = []
+        self.rpcs = []
+
+    def table(self, name):
+        calls = [("table", name)]
+        self.queries.append(calls)
+        return Query(calls, self.rows)
+
+    def rpc(self, name, params):
+        self.rpcs.append((name, params))
+        if name == "refresh_active_subscribers":
+            self.generation += 1
+            data = [{"generation": self.generation, "refreshed": True, "duration_ms": 12, "row_count": len(self.rows)}]
+        else:
+            data = self.generation
+        return Query([], data)
+
+
+def test_filters_are_pushed_down_and_cached():
+    client = Client([{"id": 1, "chat_id": "42"}])
+    lookup = SubscriberLookup(client=client, ttl=60)
+
+    assert lookup.find("EURUSD", "1h") == [{"id": 1, "chat_id": "42"}]
+    assert lookup.find("EURUSD", "1h") == [{"id": 1, "chat_id": "42"}]
+    assert len(client.queries) == 1
+    assert client.queries[0] == [
+        ("table", "active_subscribers"),
+        ("select", "id,chat_id"),
+        ("contains", "assets", ["EURUSD"]),
+        ("contains", "preferred_timeframes", ["1h"]),
+        ("execute",)
+    ]
+
+    lookup.find("EURUSD", "4h")
+    assert len(client.queries) == 2
+
+    lookup.invalidate()
+    lookup.find("EURUSD", "1h")
+    assert len(client.queries) == 3
+
+
+def test_expired_entries_are_refetched():
+    client = Client([])
+    lookup = SubscriberLookup(client=client, ttl=0)
+    lookup.find("XAUUSD", "1h")
+    lookup.find("XAUUSD", "1h")
+    assert len(client.queries) == 2
+
+
+def test_new_view_generation_invalidates_cache():
+    client = Client([{"id": 1, "chat_id": "42"}])
+    lookup = SubscriberLookup(client=client, ttl=60)
+    lookup.generation_interval = 0
+
+    lookup.find("EURUSD", "1h")
+    lookup.find("EURUSD", "1h")
+    assert lookup.generation == 1
+    assert len(client.queries) == 1
+
+    # Refresh door een andere worker: de volgende generatiecheck ziet het
+    client.generation = 2
+    lookup.find("EURUSD", "1h")
+    assert lookup.generation == 2
+    assert len(client.queries) == 2
+
+    # Refresh via deze lookup invalideert direct
+    lookup.generation_interval = 60
+    result = lookup.refresh_view("preferences")
+    assert result["generation"] == 3
+    assert client.rpcs[-1] == ("refresh_active_subscribers", {"reason": "preferences", "force": True})
+    lookup.find("EURUSD", "1h")
+    assert len(client.queries) == 3
+    lookup.find("EURUSD", "1h")
+    assert len(client.queries) == 3
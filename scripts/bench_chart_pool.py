@@ -0,0 +1,164 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+import functools
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from app.services.chart.browser_pool import BrowserPool, launch_chrome
+
+# Stand-in for TradingView: the chart canvas appears after a simulated data load
+CHART_PAGE = """<!DOCTYPE html>
+<html><body style="margin:0">
+<div class="chart-container" style="width:100vw;height:100vh"></div>
+<script>
+setTimeout(() => {
+    const canvas = document.createElement('canvas');
+    canvas.width = 1920; canvas.height = 1080;
+    const ctx = canvas.getContext('2d');
+    let price = 540;
+    for (let i = 0; i < 200; i++) {
+        const open = price, close = price + (Math.random() - 0.5) * 20;
+        ctx.fillStyle = close > open ? '#26a69a' : '#ef5350';
+        ctx.fillRect(i * 9 + 10, Math.min(open, close), 6, Math.abs(close - open) + 1);
+        price = close;
+    }
+    document.querySelector('.chart-container').appendChild(canvas);
+}, %(load_delay)d);
+</script>
+</body></html>
+"""
+
+
+def serve_page(load_delay_ms: int) -> (HTTPServer, str):
+    """Serve the fake chart page from a temp dir"""
+    directory = tempfile.mkdtemp()
+    with open(os.path.join(directory, "chart.html"), "w") as f:
+        f.write(CHART_PAGE % {"load_delay": load_delay_ms})
+
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=directory)
+    handler.log_message = lambda *args: None
+    server = HTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/chart.html"
+
+
+def browser_rss() -> int:
+    """Total RSS in bytes of all processes started by this one (chromedriver + chromium)"""
+    parents = {}
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                parents[int(pid)] = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+
+    descendants, frontier = set(), {os.getpid()}
+    while frontier:
+        frontier = {pid for pid, ppid in parents.items() if ppid in frontier} - descendants
+        descendants |= frontier
+
+    total = 0
+    for pid in descendants:
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            continue
+    return total
+
+
+class MemorySampler:
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        def sample():
+            while not self._stop.is_set():
+                self.peak = max(self.peak, browser_rss())
+                time.sleep(self.interval)
+        self._thread = threading.Thread(target=sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def per_call_screenshot(url: str, fixed_sleep: float) -> bytes:
+    """What ChartService used to do: launch, load, sleep, screenshot, quit"""
+    driver = launch_chrome()
+    try:
+        driver.get(url)
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, 'div[class*="chart-container"]'))
+        )
+        time.sleep(fixed_sleep)
+        return driver.get_screenshot_as_png()
+    finally:
+        driver.quit()
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+
+def report(name, latencies, peak):
+    print(f"{name:<10} n={len(latencies)} p50={percentile(latencies, 0.5) * 1000:.0f}ms "
+          f"p99={percentile(latencies, 0.99) * 1000:.0f}ms peak browser RSS={peak / 1024 / 1024:.0f}MB")
+
+
+async def run(args):
+    server, url = serve_page(args.load_delay)
+
+    try:
+        # Baseline: one browser per screenshot, one screenshot at a time
+        latencies = []
+        with MemorySampler() as memory:
+            for _ in range(args.baseline_requests):
+                start = time.perf_counter()
+                await asyncio.to_thread(per_call_screenshot, url, args.fixed_sleep)
+                latencies.append(time.perf_counter() - start)
+        report("per-call", latencies, memory.peak)
+
+        pool = BrowserPool(size=args.pool_size, max_uses=args.max_uses)
+        await pool.start()
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def pooled():
+            async with semaphore:
+                start = time.perf_counter()
+                await pool.screenshot(url, ready_selector=".chart-container canvas")
+                return time.perf_counter() - start
+
+        with MemorySampler() as memory:
+            latencies = await asyncio.gather(*(pooled() for _ in range(args.requests)))
+        report("pool", latencies, memory.peak)
+        await pool.close()
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark chart screenshots: per-call Chromium vs warm pool")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--baseline-requests", type=int, default=20)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--max-uses", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--load-delay", type=int, default=300, help="ms before the fake chart canvas appears")
+    parser.add_argument("--fixed-sleep", type=float, default=2.0, help="sleep used by the old per-call path")
+    asyncio.run(run(parser.parse_args()))
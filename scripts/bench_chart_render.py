@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import resource
+import numpy as np
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.chart.renderer import render_candles
+from app.utils.executors import run_cpu, shutdown_executors
+
+
+def random_ohlc(bars: int, seed: int = 0) -> dict:
+    """Random-walk EURUSD-like candles"""
+    rng = np.random.default_rng(seed)
+    close = 1.08 + np.cumsum(rng.normal(0, 0.0008, bars))
+    open_ = np.r_[close[0], close[:-1]]
+    return {
+        "time": 1_700_000_000 + np.arange(bars) * 900,
+        "open": open_,
+        "high": np.maximum(open_, close) + rng.random(bars) * 0.0005,
+        "low": np.minimum(open_, close) - rng.random(bars) * 0.0005,
+        "close": close
+    }
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+
+def report(name, latencies, size):
+    print(f"{name:<12} n={len(latencies)} p50={percentile(latencies, 0.5) * 1000:.1f}ms "
+          f"p99={percentile(latencies, 0.99) * 1000:.1f}ms image={size / 1024:.0f}KB")
+
+
+async def run(args):
+    ohlc = random_ohlc(args.bars)
+    close = ohlc["close"][-1]
+    levels = {"entry": close, "stop_loss": close - 0.003, "take_profit": [close + 0.003, close + 0.006]}
+
+    # Warm-up: first render pays for font loading
+    render_candles(ohlc, "EURUSD · 15m", levels)
+
+    latencies = []
+    for _ in range(args.renders):
+        start = time.perf_counter()
+        image = render_candles(ohlc, "EURUSD · 15m", levels)
+        latencies.append(time.perf_counter() - start)
+    report("in-process", latencies, len(image))
+
+    # The production path: worker process via the CPU executor, including pickling
+    await run_cpu(render_candles, ohlc, "EURUSD · 15m", levels)
+    latencies = []
+    for _ in range(args.renders):
+        start = time.perf_counter()
+        image = await run_cpu(render_candles, ohlc, "EURUSD · 15m", levels)
+        latencies.append(time.perf_counter() - start)
+    report("cpu-executor", latencies, len(image))
+
+    print(f"peak RSS of this process: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f}MB "
+          f"(no browser processes)")
+    shutdown_executors()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the native matplotlib chart renderer")
+    parser.add_argument("--renders", type=int, default=100)
+    parser.add_argument("--bars", type=int, default=150)
+    asyncio.run(run(parser.parse_args()))
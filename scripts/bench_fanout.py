@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+from aiohttp import web
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.telegram.fanout import FanoutEngine, summarize
+
+TOKEN = "123456:BENCHMARK"
+
+
+def fake_telegram_app(latency: float) -> web.Application:
+    """Local stand-in for the Telegram Bot API"""
+    counter = {"messages": 0}
+
+    async def get_me(request):
+        return web.json_response({"ok": True, "result": {
+            "id": 123456, "is_bot": True, "first_name": "Bench", "username": "bench_bot"
+        }})
+
+    async def send_message(request):
+        # PTB posts form data, raw HTTP clients post JSON
+        if request.content_type == "application/json":
+            data = await request.json()
+        else:
+            data = await request.post()
+        await asyncio.sleep(latency)
+        counter["messages"] += 1
+        return web.json_response({"ok": True, "result": {
+            "message_id": counter["messages"],
+            "date": int(time.time()),
+            "chat": {"id": int(data["chat_id"]), "type": "private"},
+            "text": data["text"]
+        }})
+
+    app = web.Application()
+    app.router.add_post(f"/bot{TOKEN}/getMe", get_me)
+    app.router.add_post(f"/bot{TOKEN}/sendMessage", send_message)
+    return app
+
+
+async def run(args):
+    runner = web.AppRunner(fake_telegram_app(args.latency))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.port)
+    await site.start()
+
+    chat_ids = [str(100000 + i) for i in range(args.subscribers)]
+    text = "🔔 *TRADING SIGNAL*\nSymbol: EURUSD\nAction: BUY\nPrice: 1.075"
+
+    bot = Bot(
+        TOKEN,
+        base_url=f"http://127.0.0.1:{args.port}/bot",
+        request=HTTPXRequest(connection_pool_size=args.concurrency, pool_timeout=30.0)
+    )
+    await bot.initialize()
+
+    async def send(chat_id):
+        await bot.send_message(chat_id=chat_id, text=text, parse_mode="Markdown")
+
+    try:
+        # Old behaviour: one await per subscriber
+        sequential = chat_ids[:args.sequential_subscribers]
+        start = time.perf_counter()
+        for chat_id in sequential:
+            await send(chat_id)
+        sequential_time = time.perf_counter() - start
+        projected = sequential_time / len(sequential) * len(chat_ids)
+        print(f"Sequential: {len(sequential)} messages in {sequential_time:.2f}s "
+              f"(projected {projected:.2f}s for {len(chat_ids)})")
+
+        engine = FanoutEngine(
+            concurrency=args.concurrency,
+            global_rate=args.global_rate,
+            per_chat_rate=1.0
+        )
+        start = time.perf_counter()
+        results = await engine.send_all(chat_ids, send)
+        fanout_time = time.perf_counter() - start
+        summary = summarize(results)
+
+        print(f"Fan-out:    {summary['sent']}/{summary['total']} messages in {fanout_time:.2f}s "
+              f"(concurrency={args.concurrency}, global_rate={args.global_rate or 'unlimited'})")
+        print(f"Per-chat latency p50={summary['p50'] * 1000:.1f}ms p99={summary['p99'] * 1000:.1f}ms")
+        print(f"Speedup: {projected / fanout_time:.1f}x")
+
+        if args.global_rate:
+            print(f"Note: at {args.global_rate} msg/s the floor is {len(chat_ids) / args.global_rate:.1f}s")
+    finally:
+        await bot.shutdown()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark signal fan-out against a fake Telegram API")
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--sequential-subscribers", type=int, default=1000,
+                        help="subscribers for the sequential baseline, projected to the full count")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--global-rate", type=float, default=0,
+                        help="messages/s for the global bucket; 0 disables it (the fake has no limit)")
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated API latency in seconds")
+    parser.add_argument("--port", type=int, default=8089)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import hashlib
+import time
+import random
+import argparse
+import resource
+import tracemalloc
+import multiprocessing
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.html_rows import BACKENDS, extract_rows
+from app.services.calendar.store import FOREXFACTORY_ROWS
+from app.services.sentiment.scraper import INVESTING_NEWS
+
+SPECS = {"forexfactory": FOREXFACTORY_ROWS, "investing": INVESTING_NEWS}
+
+# Page furniture around the rows: navigation, inline scripts and styles like the real pages carry
+CHROME = """<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>{title}</title>
+<link rel="stylesheet" href="/assets/site.css"><style>.calendar__row{{height:24px}} .flexBox{{display:flex}}</style>
+<script>window.__CONFIG__ = {{"tz": "UTC", "ads": [1, 2, 3], "html": "<div class='calendar__row'>"}};</script>
+</head><body><header class="header"><nav class="nav">{nav}</nav></header>
+<div class="content"><div class="sidebar">{sidebar}</div>{body}</div>
+<footer class="footer"><ul>{nav}</ul></footer></body></html>"""
+
+
+def nav(rng: random.Random) -> str:
+    return "".join(f'<li class="nav__item"><a href="/section/{i}" class="nav__link">Section {i}</a></li>' for i in range(rng.randint(20, 40)))
+
+
+def forexfactory_page(weeks: int, seed: int = 0) -> str:
+    """A calendar page shaped like forexfactory.com/calendar: one table row per event"""
+    rng = random.Random(seed)
+    rows = []
+    for day in range(weeks * 5):
+        for index in range(rng.randint(8, 25)):
+            impact = rng.choice(["red", "ora", "yel", "gra"])
+            title = {"red": "High", "ora": "Medium", "yel": "Low", "gra": "Non-Economic"}[impact]
+            date = f'<span class="date">{"MonTueWedThuFri"[day % 5 * 3:day % 5 * 3 + 3]}<span>Jan {day + 1}</span></span>' if index == 0 else ""
+            clock = f"{rng.randint(1, 12)}:{rng.choice(['00', '15', '30', '45'])}{rng.choice(['am', 'pm'])}" if rng.random() > 0.3 else ""
+            rows.append(
+                f'<tr class="calendar__row calendar_row calendar__row--grey" data-eventid="{rng.randint(10**5, 10**6)}" data-touchable>'
+                f'<td class="calendar__cell calendar__date">{date}</td>'
+                f'<td class="calendar__cell calendar__time"><div>{clock}</div></td>'
+                f'<td class="calendar__cell calendar__currency">{rng.choice(["USD", "EUR", "GBP", "JPY", "AUD", "CAD", "CHF", "NZD"])}</td>'
+                f'<td class="calendar__cell calendar__impact"><span title="{title} Impact Expected" class="icon icon--ff-impact-{impact}"></span></td>'
+                f'<td class="calendar__cell calendar__event event"><div><span class="calendar__event-title">Event {day}-{index} &amp; m/m</span></div></td>'
+                f'<td class="calendar__cell calendar__detail"><a class="calendar__detail-link" href="#detail"><span class="icon icon--detail"></span></a></td>'
+                f'<td class="calendar__cell calendar__actual"><span></span></td>'
+                f'<td class="calendar__cell calendar__forecast"><span>{rng.uniform(-1, 3):.1f}%</span></td>'
+                f'<td class="calendar__cell calendar__previous"><span class="revised">{rng.uniform(-1, 3):.1f}%</span></td>'
+                f'<td class="calendar__cell calendar__graph"><a href="#graph"><img src="/img/graph.png" alt=""></a></td>'
+                '</tr>'
+            )
+            if rng.random() < 0.05:
+                rows.append('<tr class="calendar__row calendar__row--no-event"><td colspan="10">No events</td></tr>')
+    body = f'<table class="calendar__table"><tbody>{"".join(rows)}</tbody></table>'
+    return CHROME.format(title="Forex Factory", nav=nav(rng), sidebar=nav(rng), body=body)
+
+
+def investing_page(articles: int, seed: int = 0) -> str:
+    """A news listing shaped like investing.com/currencies/<pair>-news"""
+    rng = random.Random(seed)
+    items = []
+    for index in range(articles):
+        items.append(
+            f'<article class="js-article-item articleItem" data-id="{rng.randint(10**6, 10**7)}">'
+            f'<a href="/news/forex-news/article-{index}" class="img"><img src="/img/{index}.jpg" alt="" class="lazy"></a>'
+            f'<div class="textDiv"><a href="/news/forex-news/article-{index}" title="Headline {index}" class="title">'
+            f'EUR/USD {rng.choice(["edges up", "slips", "holds steady"])} ahead of <b>ECB</b> {index}</a>'
+            f'<span class="articleDetails"><span>By Reuters</span><span class="date">&nbsp;-&nbsp;{rng.randint(1, 59)} minutes ago</span></span>'
+            f'<p class="description">{" ".join(rng.choice(["The", "euro", "rose", "against", "the", "dollar", "on", "Tuesday"]) for _ in range(40))}</p>'
+            '</div><div class="clear"></div></article>'
+        )
+        if rng.random() < 0.1:
+            items.append('<div class="articleItem sponsoredArticle"><div class="textDiv">Sponsored</div></div>')
+    body = f'<div class="largeTitle">{"".join(items)}</div>'
+    return CHROME.format(title="Investing.com", nav=nav(rng), sidebar=nav(rng), body=body)
+
+
+def measure(backend: str, page: str, html: str, repeat: int, queue: multiprocessing.Queue):
+    """Runs in a fresh process so peak RSS belongs to this backend alone"""
+    spec = SPECS[page]
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tracemalloc.start()
+    rows = extract_rows(html, spec, backend)
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        extract_rows(html, spec, backend)
+    elapsed = time.perf_counter() - start
+
+    queue.put({
+        "rows": len(rows),
+        "pages_per_s": round(repeat / elapsed, 1),
+        "rows_per_s": round(len(rows) * repeat / elapsed),
+        "ms_per_page": round(elapsed / repeat * 1000, 2),
+        # ru_maxrss is in KiB on Linux; libxml2 allocations only show up here, not in tracemalloc
+        "peak_rss_delta_mb": round((rss_peak - rss_before) / 1024, 2),
+        "python_heap_peak_mb": round(python_peak / 2**20, 2),
+        "checksum": hashlib.sha1(json.dumps(rows, sort_keys=True).encode()).hexdigest()
+    })
+
+
+def main(args):
+    pages = {
+        "forexfactory": forexfactory_page(args.weeks, args.seed),
+        "investing": investing_page(args.articles, args.seed)
+    }
+    # Saved pages replace the generated ones
+    for saved in args.page:
+        name, _, path = saved.partition("=")
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages[name] = f.read()
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for page, html in pages.items():
+        print(f"\n{page}: {len(html) / 1024:.0f} KiB")
+        print(f"{'backend':<8} {'rows':>6} {'rows/s':>10} {'ms/page':>9} {'peak RSS':>10} {'py heap':>9}")
+        results[page] = {"bytes": len(html)}
+        for backend in args.backends:
+            queue = context.Queue()
+            process = context.Process(target=measure, args=(backend, page, html, args.repeat, queue))
+            process.start()
+            result = queue.get()
+            process.join()
+            results[page][backend] = result
+            print(f"{backend:<8} {result['rows']:>6} {result['rows_per_s']:>10} {result['ms_per_page']:>9} "
+                  f"{result['peak_rss_delta_mb']:>8} MB {result['python_heap_peak_mb']:>6} MB")
+
+        # Every backend has to return exactly the same rows
+        checksums = {backend: results[page][backend].pop("checksum") for backend in args.backends}
+        if len(set(checksums.values())) > 1:
+            print(f"!! backends disagree on {page}: {checksums}")
+            results[page]["mismatch"] = True
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"timestamp": int(time.time()), "config": vars(args), "results": results}, f, indent=2)
+        print(f"written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the HTML row extraction backends on calendar and news pages")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--weeks", type=int, default=4, help="calendar weeks on the generated ForexFactory page")
+    parser.add_argument("--articles", type=int, default=60, help="articles on the generated Investing.com page")
+    parser.add_argument("--page", action="append", default=[], metavar="NAME=PATH",
+                        help="use a saved page instead, e.g. forexfactory=calendar.html or investing=news.html")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON result here")
+    main(parser.parse_args())
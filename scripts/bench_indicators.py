@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.indicators.engine import compute_all, IndicatorState
+
+
+def random_candles(rows: int, bars: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, (rows, bars)), axis=1)
+    high = close + rng.random((rows, bars))
+    low = close - rng.random((rows, bars))
+    return high, low, close
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main(args):
+    rows = args.instruments * args.timeframes
+    high, low, close = random_candles(rows, args.bars)
+    print(f"{args.instruments} instruments x {args.timeframes} timeframes x {args.bars} bars = {rows} series")
+
+    # One vectorized pass over every series
+    batch, batch_time = timed(compute_all, high, low, close)
+    print(f"batch, all series at once:   {batch_time * 1000:8.1f}ms")
+
+    # Same engine, one series at a time (what a per-symbol loop would do)
+    sample = min(rows, args.sample)
+    _, loop_time = timed(lambda: [compute_all(high[i], low[i], close[i]) for i in range(sample)])
+    print(f"per-series loop (projected): {loop_time / sample * rows * 1000:8.1f}ms")
+
+    # A new candle arrives: incremental update vs recomputing the history
+    state = IndicatorState.from_history(high[:, :-args.updates], low[:, :-args.updates], close[:, :-args.updates])
+    start = time.perf_counter()
+    for t in range(args.bars - args.updates, args.bars):
+        latest = state.update(high[:, t], low[:, t], close[:, t])
+    update_time = (time.perf_counter() - start) / args.updates
+    print(f"incremental update per bar:  {update_time * 1000:8.3f}ms for all {rows} series")
+    print(f"full recompute per bar:      {batch_time * 1000:8.1f}ms ({batch_time / update_time:.0f}x slower)")
+
+    # Incremental and batch results agree
+    for name, values in latest.items():
+        assert np.allclose(values, batch[name][:, -1], equal_nan=True), name
+    print("incremental values match the batch computation")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized indicator engine")
+    parser.add_argument("--instruments", type=int, default=100)
+    parser.add_argument("--timeframes", type=int, default=3)
+    parser.add_argument("--bars", type=int, default=10_000)
+    parser.add_argument("--updates", type=int, default=100, help="bars replayed through the incremental path")
+    parser.add_argument("--sample", type=int, default=30, help="series timed for the per-series projection")
+    main(parser.parse_args())
@@ -0,0 +1,236 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import itertools
+from datetime import datetime, timedelta, timezone
+from html import escape
+
+from aiohttp import web
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "news_stories.json")
+SOURCES = ["forexfactory", "investing", "tradingview"]
+
+
+def load_stories(path: str) -> list:
+    with open(path) as f:
+        return json.load(f)["stories"]
+
+
+def assign(stories: list) -> dict:
+    """Spread each story's headline variants over the sources, as different sites would word it"""
+    items = {source: [] for source in SOURCES}
+    for number, story in enumerate(stories):
+        for variant, headline in enumerate(story["headlines"]):
+            source = SOURCES[(number + variant) % len(SOURCES)]
+            items[source].append({"story": number, "title": headline, **story})
+    return items
+
+
+def render(source: str, items: list) -> str:
+    """A listing page in the markup each scraper's RowSpec expects"""
+    now = datetime.now(timezone.utc)
+    rows = []
+    for index, item in enumerate(items):
+        title = escape(item["title"])
+        if source == "forexfactory":
+            rows.append(
+                f'<div class="flexposts__item news_item"><a class="title" href="/news/{index}">{title}</a>'
+                f'<span class="time">{item["hours_ago"]} hours ago</span>'
+                f'<span class="impact">{item["impact"].title()} Impact</span></div>'
+            )
+        elif source == "investing":
+            rows.append(
+                f'<article class="js-article-item articleItem"><div class="textDiv">'
+                f'<a href="/news/forex-news/{index}" class="title">{title}</a>'
+                f'<span class="articleDetails"><span>By Reuters</span><span class="date">&nbsp;-&nbsp;{item["hours_ago"]} hours ago</span></span>'
+                f'<p class="description">Markets reacted to the news: {title}.</p></div></article>'
+            )
+        else:
+            published = (now - timedelta(hours=item["hours_ago"])).isoformat()
+            rows.append(
+                f'<article class="card news-article"><a href="/news/{index}-story/"><span class="title">{title}</span></a>'
+                f'<p class="summary">{title}, according to people familiar with the matter.</p>'
+                f'<time class="time">{published}</time></article>'
+            )
+    return f'<!DOCTYPE html><html><body><div class="news">{"".join(rows)}</div></body></html>'
+
+
+def pair_scores(clusters: list, truth: dict) -> dict:
+    """Pairwise precision/recall of the clusters against the fixture's stories"""
+    predicted = {pair for cluster in clusters for pair in itertools.combinations(sorted(cluster), 2)}
+    by_story = {}
+    for title, story in truth.items():
+        by_story.setdefault(story, []).append(title)
+    actual = {pair for titles in by_story.values() for pair in itertools.combinations(sorted(titles), 2)}
+    hits = len(predicted & actual)
+    return {
+        "precision": round(hits / len(predicted), 3) if predicted else 1.0,
+        "recall": round(hits / len(actual), 3) if actual else 1.0,
+        "false_merges": len(predicted - actual)
+    }
+
+
+def dedupe_quality(stories: list, items: dict) -> dict:
+    from app.services.sentiment.aggregator import merge, normalize
+
+    truth = {item["title"]: item["story"] for batch in items.values() for item in batch}
+    batches = [[normalize(item, source) for item in batch] for source, batch in items.items()]
+    count = sum(map(len, batches))
+
+    # Baseline: only identical (case-insensitive) headlines are duplicates
+    exact = {}
+    for item in itertools.chain(*batches):
+        exact.setdefault(item["title"].lower(), []).append(item["title"])
+
+    merged = merge(batches)
+    results = {
+        "stories": len(stories),
+        "items": count,
+        "exact": {"kept": len(exact), **pair_scores(exact.values(), truth)},
+        "minhash": {"kept": len(merged), **pair_scores([[item["title"]] + item["variants"] for item in merged], truth)}
+    }
+    print(f"\ndedupe: {count} headlines, {len(stories)} stories")
+    print(f"{'method':<8} {'kept':>5} {'precision':>10} {'recall':>7} {'false merges':>13}")
+    for method in ("exact", "minhash"):
+        result = results[method]
+        print(f"{method:<8} {result['kept']:>5} {result['precision']:>10} {result['recall']:>7} {result['false_merges']:>13}")
+    print("top 5 after ranking:")
+    for item in merged[:5]:
+        print(f"  {item['score']:5.2f}  {item['impact']:<6} {','.join(item['sources']):<35} {item['title']}")
+    return results
+
+
+async def fetch_latency(items: dict, args) -> dict:
+    """Serve the fixture pages with per-source latency and compare sequential scraping to the aggregator"""
+    latency = {source: float(ms) / 1000 for source, ms in (value.split("=") for value in args.latency)}
+    pages = {source: render(source, batch) for source, batch in items.items()}
+
+    async def handle(request: web.Request):
+        source = request.match_info["source"]
+        await asyncio.sleep(latency.get(source, 0))
+        return web.Response(text=pages[source], content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{source}/{symbol}", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+
+    from app.services.sentiment.aggregator import NewsAggregator
+    from app.services.sentiment.scraper import NewsScraper
+    from app.utils.http import http_clients
+
+    scraper = NewsScraper()
+    sources = {
+        "forexfactory": scraper.scrape_forex_factory,
+        "investing": scraper.scrape_investing_com,
+        "tradingview": scraper.scrape_tradingview
+    }
+    try:
+        start = time.perf_counter()
+        scraped = {name: await source(args.symbol) for name, source in sources.items()}
+        sequential = time.perf_counter() - start
+
+        aggregator = NewsAggregator(sources, timeouts={name: args.timeout for name in sources})
+        start = time.perf_counter()
+        merged = await aggregator.fetch(args.symbol)
+        concurrent = time.perf_counter() - start
+    finally:
+        await http_clients.close()
+        await runner.cleanup()
+
+    print(f"\nfetch: latency {', '.join(f'{s}={latency.get(s, 0) * 1000:g}ms' for s in SOURCES)}, timeout {args.timeout:g}s per source")
+    print(f"sequential scrape  {sequential * 1000:8.1f}ms  {sum(map(len, scraped.values()))} items")
+    print(f"aggregator         {concurrent * 1000:8.1f}ms  {len(merged)} items after dedupe")
+    for name, run in aggregator.last_run.items():
+        print(f"  {name:<13} {run['status']:<8} {run['items']:>3} items {run['seconds'] * 1000:8.1f}ms")
+    return {
+        "sequential_ms": round(sequential * 1000, 1),
+        "aggregator_ms": round(concurrent * 1000, 1),
+        "items": len(merged),
+        "sources": aggregator.last_run
+    }
+
+
+def scaling(stories: list, args) -> dict:
+    """LSH lookups against comparing every headline with every story kept so far"""
+    from app.services.sentiment.aggregator import merge, normalize, shingles, DEDUPE_THRESHOLD
+
+    rng = random.Random(args.seed)
+    words = sorted({word for story in stories for headline in story["headlines"] for word in headline.split()})
+    # Synthetic feed from the fixture vocabulary: new stories, plus repeats of earlier ones with a word swapped
+    titles = []
+    for _ in range(args.scale):
+        if titles and rng.random() < args.repeats:
+            reworded = rng.choice(titles).split()
+            reworded[rng.randrange(len(reworded))] = rng.choice(words)
+            titles.append(" ".join(reworded))
+        else:
+            titles.append(" ".join(rng.sample(words, rng.randint(7, 12))))
+    batch = [normalize({"title": title}, "synthetic") for title in titles]
+
+    start = time.perf_counter()
+    merged = merge([batch])
+    lsh = time.perf_counter() - start
+
+    start = time.perf_counter()
+    kept, comparisons = [], 0
+    for title in titles:
+        current = shingles(title)
+        for other in kept:
+            comparisons += 1
+            if len(current & other) / len(current | other) >= DEDUPE_THRESHOLD:
+                break
+        else:
+            kept.append(current)
+    brute = time.perf_counter() - start
+
+    print(f"\nscale: {args.scale} synthetic headlines")
+    print(f"minhash/lsh   {lsh * 1000:8.1f}ms  {len(merged)} kept")
+    print(f"all-pairs     {brute * 1000:8.1f}ms  {len(kept)} kept, {comparisons} exact comparisons")
+    return {"headlines": args.scale, "lsh_ms": round(lsh * 1000, 1), "lsh_kept": len(merged),
+            "all_pairs_ms": round(brute * 1000, 1), "all_pairs_kept": len(kept)}
+
+
+async def main(args):
+    # Scraper URLs are read at import, point them at the local server first
+    base = f"http://127.0.0.1:{args.port}"
+    os.environ.update({
+        "FOREXFACTORY_NEWS_URL": f"{base}/forexfactory/{{symbol}}",
+        "INVESTING_NEWS_URL": f"{base}/investing/{{symbol}}",
+        "TRADINGVIEW_NEWS_URL": f"{base}/tradingview/{{symbol}}"
+    })
+    stories = load_stories(args.fixture)
+    items = assign(stories)
+
+    results = {
+        "dedupe": dedupe_quality(stories, items),
+        "fetch": await fetch_latency(items, args),
+        "scale": scaling(stories, args)
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"timestamp": int(time.time()), "config": vars(args), "results": results}, f, indent=2)
+        print(f"written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark concurrent news aggregation and headline dedupe on fixture stories")
+    parser.add_argument("--fixture", default=FIXTURE, help="JSON file with labelled stories and their headline variants")
+    parser.add_argument("--latency", nargs="+", default=["forexfactory=300", "investing=800", "tradingview=2500"],
+                        metavar="SOURCE=MS", help="response delay of the local stand-in for each source")
+    parser.add_argument("--timeout", type=float, default=1.5, help="aggregator timeout per source, seconds")
+    parser.add_argument("--scale", type=int, default=3000, help="synthetic headlines for the LSH vs all-pairs run")
+    parser.add_argument("--repeats", type=float, default=0.3, help="share of synthetic headlines that reword an earlier one")
+    parser.add_argument("--symbol", default="EURUSD")
+    parser.add_argument("--port", type=int, default=8773)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON result here")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,483 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+import statistics
+import subprocess
+import multiprocessing
+import tempfile
+from itertools import count
+
+import aiohttp
+from aiohttp import web
+from prometheus_client.parser import text_string_to_metric_families
+
+# Add project root to Python path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from app.bot.constants import MARKETS, TIMEFRAMES
+from app.services.market_data.intervals import INTERVAL_SECONDS
+
+TOKEN = "123456:bench"
+# Any JWT-shaped string passes the supabase client's key check
+SUPABASE_KEY = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJyb2xlIjoiYW5vbiJ9.YmVuY2g"
+STAGES = ("match", "sentiment", "send", "enrich", "total")
+
+
+class FakeTelegram:
+    """Bot API stand-in: answers every method, optionally with 429s"""
+
+    def __init__(self, latency_ms: float, rate_limited: float):
+        self.latency = latency_ms / 1000
+        self.rate_limited = rate_limited
+        self.calls = {}
+        self.message_ids = count(1)
+
+    async def handle(self, request: web.Request):
+        method = request.match_info["method"]
+        self.calls[method] = self.calls.get(method, 0) + 1
+        # python-telegram-bot posts form data, pre-rendered messages are JSON
+        data = await request.json() if request.content_type == "application/json" else await request.post()
+        await asyncio.sleep(self.latency)
+
+        if method.startswith("send") and random.random() < self.rate_limited:
+            self.calls["429"] = self.calls.get("429", 0) + 1
+            return web.json_response({"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                                      "parameters": {"retry_after": 1}}, status=429)
+
+        if method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        elif method in ("sendMessage", "editMessageText", "sendPhoto", "editMessageMedia"):
+            chat_id = int(data.get("chat_id", 0))
+            result = {"message_id": next(self.message_ids), "date": int(time.time()),
+                      "chat": {"id": chat_id, "type": "private"}, "text": data.get("text", "")}
+            if "Photo" in method or "Media" in method:
+                result["photo"] = [{"file_id": f"file{result['message_id']}", "file_unique_id": "u", "width": 1280, "height": 720}]
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    def routes(self, app: web.Application):
+        app.router.add_post("/bot{token}/{method}", self.handle)
+
+
+class FakeLLM:
+    """OpenAI and Perplexity chat completions with a fixed latency"""
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.calls = 0
+
+    async def handle(self, request: web.Request):
+        self.calls += 1
+        payload = await request.json()
+        await asyncio.sleep(self.latency)
+        return web.json_response({
+            "id": "bench", "object": "chat.completion", "created": 0, "model": payload["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "Bullish: momentum and rate expectations support the pair."}}],
+            "usage": {"prompt_tokens": 40, "completion_tokens": 12, "total_tokens": 52}
+        })
+
+    def routes(self, app: web.Application):
+        app.router.add_post("/v1/chat/completions", self.handle)
+        app.router.add_post("/chat/completions", self.handle)
+
+
+class FakePostgREST:
+    """Serves table rows with PostgREST's eq filters, Range header and limit/offset paging"""
+
+    def __init__(self, tables: dict):
+        self.tables = tables
+        self.calls = 0
+
+    async def handle(self, request: web.Request):
+        self.calls += 1
+        rows = self.tables.get(request.match_info["table"], [])
+        for column, condition in request.query.items():
+            if condition.startswith("eq."):
+                rows = [row for row in rows if str(row.get(column)) == condition[3:]]
+
+        start, end = 0, len(rows) - 1
+        if "Range" in request.headers:
+            start, end = (int(part) for part in request.headers["Range"].split("-"))
+        if "offset" in request.query:
+            start = int(request.query["offset"])
+        if "limit" in request.query:
+            end = start + int(request.query["limit"]) - 1
+        page = rows[start:end + 1]
+        return web.json_response(page, headers={"Content-Range": f"{start}-{start + len(page) - 1}/{len(rows)}"})
+
+    def routes(self, app: web.Application):
+        app.router.add_get("/rest/v1/{table}", self.handle)
+
+
+class FakeYahoo:
+    """Chart API with a random walk of 15m bars per symbol"""
+
+    async def handle(self, request: web.Request):
+        step = INTERVAL_SECONDS["15m"]
+        now = int(time.time()) // step * step
+        bars = 600
+        rng = random.Random(request.match_info["symbol"])
+        close, quote = 100.0, {field: [] for field in ("open", "high", "low", "close")}
+        for _ in range(bars):
+            change = rng.gauss(0, 0.3)
+            quote["open"].append(close)
+            quote["high"].append(max(close, close + change) + abs(rng.gauss(0, 0.1)))
+            quote["low"].append(min(close, close + change) - abs(rng.gauss(0, 0.1)))
+            close += change
+            quote["close"].append(close)
+        return web.json_response({"chart": {"result": [{
+            "timestamp": [now - step * (bars - 1 - i) for i in range(bars)],
+            "indicators": {"quote": [quote]}
+        }]}})
+
+    def routes(self, app: web.Application):
+        app.router.add_get("/chart/{symbol}", self.handle)
+
+
+class FakeCalendar:
+    """ForexFactory's weekly calendar export"""
+
+    async def handle(self, request: web.Request):
+        today = time.strftime("%Y-%m-%d", time.gmtime())
+        return web.json_response([
+            {"title": title, "country": currency, "date": f"{today}T{clock}:00+00:00",
+             "impact": impact, "forecast": "0.3%", "previous": "0.2%"}
+            for title, currency, clock, impact in (
+                ("German CPI m/m", "EUR", "08:00", "High"),
+                ("Non-Farm Employment Change", "USD", "12:30", "High"),
+                ("Crude Oil Inventories", "USD", "15:30", "Medium"),
+                ("BOJ Core CPI y/y", "JPY", "05:00", "Low")
+            )
+        ])
+
+    def routes(self, app: web.Application):
+        app.router.add_get("/calendar.json", self.handle)
+
+
+class FakeRedis:
+    """Just enough RESP2 for redis-py: strings, hashes, expiry, pipelines (MULTI/EXEC)"""
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.commands = 0
+
+    def _alive(self, key):
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def execute(self, name: str, args: list):
+        self.commands += 1
+        if name in ("PING",):
+            return "+PONG"
+        if name in ("CLIENT", "SELECT"):
+            return "+OK"
+        if name == "GET":
+            return self.data.get(args[0]) if self._alive(args[0]) else None
+        if name in ("SET", "SETEX"):
+            if name == "SETEX":
+                key, seconds, value = args
+            else:
+                key, value = args[:2]
+                upper = [a.upper() for a in args[2:]]
+                seconds = args[2 + upper.index(b"EX") + 1] if b"EX" in upper else None
+            self.data[key] = value
+            self.expires.pop(key, None)
+            if seconds is not None:
+                self.expires[key] = time.monotonic() + int(seconds)
+            return "+OK"
+        if name == "EXISTS":
+            return sum(1 for key in args if self._alive(key))
+        if name == "TTL":
+            if not self._alive(args[0]):
+                return -2
+            expires = self.expires.get(args[0])
+            return -1 if expires is None else int(expires - time.monotonic())
+        if name == "EXPIRE":
+            if not self._alive(args[0]):
+                return 0
+            self.expires[args[0]] = time.monotonic() + int(args[1])
+            return 1
+        if name == "DEL":
+            return sum(1 for key in args if self._alive(key) and self.data.pop(key, None) is not None)
+        if name == "HSET":
+            fields = self.data.setdefault(args[0], {}) if self._alive(args[0]) else self.data.setdefault(args[0], {})
+            new = sum(1 for field in args[1::2] if field not in fields)
+            fields.update(zip(args[1::2], args[2::2]))
+            return new
+        if name == "HMGET":
+            fields = self.data.get(args[0], {}) if self._alive(args[0]) else {}
+            return [fields.get(field) for field in args[1:]]
+        if name == "HDEL":
+            fields = self.data.get(args[0], {}) if self._alive(args[0]) else {}
+            return sum(1 for field in args[1:] if fields.pop(field, None) is not None)
+        return f"-ERR unknown command '{name}'"
+
+    @classmethod
+    def encode(cls, value) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, str):
+            return f"{value}\r\n".encode()
+        if isinstance(value, int):
+            return f":{value}\r\n".encode()
+        if isinstance(value, bytes):
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        return b"*%d\r\n" % len(value) + b"".join(cls.encode(item) for item in value)
+
+    async def serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        queued = None
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                args = []
+                for _ in range(int(header[1:])):
+                    length = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                name = args[0].decode().upper()
+
+                if name == "MULTI":
+                    queued, reply = [], "+OK"
+                elif name == "EXEC":
+                    reply, queued = [self.execute(n, a) for n, a in queued or []], None
+                elif queued is not None:
+                    queued.append((name, args[1:]))
+                    reply = "+QUEUED"
+                else:
+                    reply = self.execute(name, args[1:])
+                writer.write(self.encode(reply))
+                await writer.drain()
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def subscriptions(keys, per_signal: int, seed: int = 0):
+    """signal_preferences rows: every (market, instrument, timeframe) gets per_signal subscribers"""
+    rng = random.Random(seed)
+    pool = range(10_000_000, 10_000_000 + max(per_signal * 4, 100))
+    rows = []
+    for market, instrument, timeframe in keys:
+        for user_id in rng.sample(pool, per_signal):
+            rows.append({"user_id": user_id, "market": market, "instrument": instrument, "timeframe": timeframe})
+    return rows
+
+
+def serve_app(port: int):
+    """The real FastAPI app, in its own process so the fakes and load generator don't share its loop"""
+    import uvicorn
+    from app.main import app
+    logging.disable(logging.WARNING)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="error", access_log=False)
+
+
+def stage_histograms(text: str) -> dict:
+    """signal_stage_seconds buckets per stage from a /metrics scrape"""
+    stages = {}
+    for family in text_string_to_metric_families(text):
+        if family.name != "signal_stage_seconds":
+            continue
+        for sample in family.samples:
+            if sample.name.endswith("_bucket"):
+                stages.setdefault(sample.labels["stage"], {})[float(sample.labels["le"])] = sample.value
+    return stages
+
+
+def quantile(q: float, buckets: dict) -> float:
+    """Prometheus histogram_quantile over cumulative buckets {le: count}"""
+    bounds = sorted(buckets)
+    total = buckets[bounds[-1]]
+    if not total:
+        return 0.0
+    rank, lower, below = q * total, 0.0, 0.0
+    for bound in bounds:
+        if buckets[bound] >= rank:
+            if bound == float("inf"):
+                return lower
+            return lower + (bound - lower) * (rank - below) / max(buckets[bound] - below, 1e-9)
+        lower, below = bound, buckets[bound]
+    return lower
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+async def replay(base: str, signals, rate: float, concurrency: int):
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=300)) as session:
+        async def post(signal):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                async with session.post(f"{base}/send_test_signal", json=signal) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        tasks = []
+        began = time.perf_counter()
+        for i, signal in enumerate(signals):
+            if rate:
+                delay = began + i / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(post(signal)))
+        await asyncio.gather(*tasks)
+        return latencies, errors, time.perf_counter() - began
+
+
+async def main(args):
+    random.seed(args.seed)
+    keys = [("forex", instrument, timeframe) for instrument in MARKETS["forex"]["instruments"] for timeframe in TIMEFRAMES]
+    keys = keys[:args.keys]
+    rows = subscriptions(keys, args.subscribers, args.seed)
+
+    telegram = FakeTelegram(args.telegram_ms, args.rate_limited)
+    llm = FakeLLM(args.llm_ms)
+    postgrest = FakePostgREST({"signal_preferences": rows})
+    redis_server = FakeRedis()
+
+    fakes = web.Application()
+    for fake in (telegram, llm, postgrest, FakeYahoo(), FakeCalendar()):
+        fake.routes(fakes)
+    runner = web.AppRunner(fakes, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.fake_port).start()
+    redis_listener = await asyncio.start_server(redis_server.serve, "127.0.0.1", args.redis_port)
+
+    fake = f"http://127.0.0.1:{args.fake_port}"
+    bars_dir = tempfile.mkdtemp(prefix="bench-bars-")
+    os.environ.update({
+        "TELEGRAM_BOT_TOKEN": TOKEN,
+        "TELEGRAM_BASE_URL": f"{fake}/bot",
+        "TELEGRAM_GLOBAL_RATE": str(args.telegram_rate),
+        "TELEGRAM_PER_CHAT_RATE": "0",
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{fake}/v1",
+        "PERPLEXITY_API_KEY": "bench",
+        "PERPLEXITY_API_URL": f"{fake}/chat/completions",
+        "SUPABASE_URL": fake,
+        "SUPABASE_KEY": SUPABASE_KEY,
+        "REDIS_HOST": "127.0.0.1",
+        "REDIS_PORT": str(args.redis_port),
+        "REDIS_URL": f"redis://127.0.0.1:{args.redis_port}/0",
+        "YAHOO_CHART_URL": f"{fake}/chart",
+        "BAR_STORE_DIR": bars_dir,
+        "OUTBOX_PATH": os.path.join(bars_dir, "outbox.db"),
+        "CALENDAR_PATH": os.path.join(bars_dir, "calendar.db"),
+        "CALENDAR_FEED_URL": f"{fake}/calendar.json",
+        "CHART_RENDERER": "native",
+    })
+    server = multiprocessing.get_context("fork").Process(target=serve_app, args=(args.app_port,))
+    server.start()
+
+    base = f"http://127.0.0.1:{args.app_port}"
+    try:
+        async with aiohttp.ClientSession() as session:
+            for _ in range(600):
+                try:
+                    async with session.get(f"{base}/health") as response:
+                        if response.status == 200:
+                            break
+                except aiohttp.ClientError:
+                    pass
+                await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("app did not start")
+
+            signals = [{
+                "market": market, "instrument": instrument, "symbol": instrument, "timeframe": timeframe,
+                "action": random.choice(["BUY", "SELL"]), "price": round(random.uniform(1, 2), 5)
+            } for market, instrument, timeframe in (random.choice(keys) for _ in range(args.signals))]
+
+            # Warm-up pass so connection setup and first renders don't count
+            await replay(base, signals[:min(len(signals), len(keys))], 0, args.concurrency)
+            async with session.get(f"{base}/metrics") as response:
+                before = stage_histograms(await response.text())
+            sent_before = telegram.calls.get("sendMessage", 0)
+
+            latencies, errors, elapsed = await replay(base, signals, args.rate, args.concurrency)
+
+            async with session.get(f"{base}/metrics") as response:
+                after = stage_histograms(await response.text())
+    finally:
+        server.terminate()
+        # Spawned CPU workers can keep the server process from exiting; don't wait on them forever
+        server.join(10)
+        if server.is_alive():
+            server.kill()
+            server.join()
+        redis_listener.close()
+        await runner.cleanup()
+
+    messages = telegram.calls.get("sendMessage", 0) - sent_before
+    stages = {}
+    for stage in STAGES:
+        delta = {le: after.get(stage, {}).get(le, 0) - before.get(stage, {}).get(le, 0) for le in after.get(stage, {})}
+        if delta:
+            stages[stage] = {f"p{int(q * 100)}_ms": round(quantile(q, delta) * 1000, 2) for q in (0.5, 0.95, 0.99)}
+            stages[stage]["count"] = int(delta[float("inf")])
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+
+    result = {
+        "commit": commit,
+        "timestamp": int(time.time()),
+        "config": vars(args),
+        "signals": len(signals),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "signals_per_s": round(len(signals) / elapsed, 2),
+        "messages": messages,
+        "messages_per_s": round(messages / elapsed, 1),
+        "request_latency_ms": {f"p{int(q * 100)}": round(percentile(latencies, q) * 1000, 2) for q in (0.5, 0.95, 0.99)},
+        "request_latency_mean_ms": round(statistics.mean(latencies) * 1000, 2),
+        "stages": stages,
+        "upstream_calls": {"telegram": telegram.calls, "llm": llm.calls, "postgrest": postgrest.calls, "redis": redis_server.commands}
+    }
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay synthetic signals through the app against local stand-ins")
+    parser.add_argument("--signals", type=int, default=200)
+    parser.add_argument("--subscribers", type=int, default=100, help="subscribers matched per signal")
+    parser.add_argument("--keys", type=int, default=15, help="distinct instrument/timeframe combinations")
+    parser.add_argument("--rate", type=float, default=0, help="signals per second, 0 sends as fast as --concurrency allows")
+    parser.add_argument("--concurrency", type=int, default=10, help="signals in flight at once")
+    parser.add_argument("--telegram-ms", type=float, default=20, help="fake Bot API latency")
+    parser.add_argument("--telegram-rate", type=float, default=0, help="global send rate limit, 0 disables it")
+    parser.add_argument("--rate-limited", type=float, default=0.0, help="share of sends answered with 429")
+    parser.add_argument("--llm-ms", type=float, default=300, help="fake OpenAI/Perplexity latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON result here (e.g. bench_results/pipeline.json)")
+    parser.add_argument("--app-port", type=int, default=8770)
+    parser.add_argument("--fake-port", type=int, default=8771)
+    parser.add_argument("--redis-port", type=int, default=8772)
+    asyncio.run(main(parser.parse_args()))
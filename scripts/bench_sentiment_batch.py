@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+from aiohttp import web
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PAIRS = ["EURUSD", "GBPUSD", "USDJPY", "AUDUSD", "USDCAD", "NZDUSD", "EURGBP", "USDCHF",
+         "EURJPY", "GBPJPY", "XAUUSD", "BTCUSD"]
+
+
+class MockLLM:
+    """Answers Perplexity and OpenAI chat completions; latency grows with the symbols in the prompt"""
+
+    def __init__(self, base_ms: float, per_symbol_ms: float):
+        self.base = base_ms / 1000
+        self.per_symbol = per_symbol_ms / 1000
+        self.calls = {"perplexity": 0, "openai": 0}
+
+    @staticmethod
+    def _news(symbol):
+        return "\n".join(
+            f"Title: {symbol} headline {i}\nDate: 2024-01-0{i}\nSource: Wire\n"
+            f"Summary: Something moved {symbol}.\nImpact: Mildly bullish for {symbol}."
+            for i in range(1, 4)
+        )
+
+    @staticmethod
+    def _sentiment(symbol):
+        return (f"📈 Market Sentiment:\n• Direction: Bullish\n• Strength: Moderate\n• Key drivers: {symbol} news\n\n"
+                f"🎯 Conclusion:\nBuy dips in {symbol}")
+
+    async def handle(self, request: web.Request):
+        service = "openai" if request.path.startswith("/v1") else "perplexity"
+        self.calls[service] += 1
+        payload = await request.json()
+        prompt = payload["messages"][-1]["content"]
+        symbols = [pair for pair in PAIRS if pair in prompt]
+        await asyncio.sleep(self.base + self.per_symbol * len(symbols))
+
+        body = self._news if service == "perplexity" else self._sentiment
+        if "=== PAIR ===" in prompt:
+            content = "\n\n".join(f"=== {symbol} ===\n{body(symbol)}" for symbol in symbols)
+        else:
+            content = body(symbols[0])
+        return web.json_response({
+            "id": "mock", "object": "chat.completion", "created": 0, "model": payload["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        })
+
+
+async def timed(mock, run):
+    mock.calls = {"perplexity": 0, "openai": 0}
+    start = time.perf_counter()
+    results = await run()
+    return results, time.perf_counter() - start, sum(mock.calls.values())
+
+
+async def main(args):
+    mock = MockLLM(args.base_ms, args.per_symbol_ms)
+    app = web.Application()
+    app.router.add_post("/chat/completions", mock.handle)
+    app.router.add_post("/v1/chat/completions", mock.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+
+    # Point both clients at the mock before the analyzer module reads its config
+    base = f"http://127.0.0.1:{args.port}"
+    os.environ.update({
+        "PERPLEXITY_API_URL": f"{base}/chat/completions", "PERPLEXITY_API_KEY": "mock-key-0000",
+        "OPENAI_BASE_URL": f"{base}/v1", "OPENAI_API_KEY": "mock",
+        "SENTIMENT_BATCH_SIZE": str(args.symbols)
+    })
+    from app.services.sentiment.analyzer import SentimentAnalyzer
+    from app.services.sentiment.aggregator import NewsAggregator
+    analyzer = SentimentAnalyzer()
+    # No scrapers: every symbol goes to the (mock) Perplexity, which is what this measures
+    analyzer.news = NewsAggregator(sources={})
+    symbols = PAIRS[:args.symbols]
+
+    async def sequential():
+        return [await analyzer.analyze(symbol) for symbol in symbols]
+
+    print(f"{len(symbols)} symbols, mock latency {args.base_ms:g}ms + {args.per_symbol_ms:g}ms per symbol in the prompt")
+    runs = [
+        ("per-symbol, sequential", sequential),
+        ("per-symbol, concurrent", lambda: asyncio.gather(*(analyzer.analyze(s) for s in symbols))),
+        ("batched", lambda: asyncio.gather(*(analyzer.analyze_batched(s) for s in symbols))),
+    ]
+    baseline = None
+    for name, run in runs:
+        results, elapsed, calls = await timed(mock, run)
+        assert all(symbol in text for symbol, text in zip(symbols, results)), name
+        baseline = baseline or calls
+        print(f"{name:24} {calls:3d} LLM calls ({baseline - calls:3d} saved)  {elapsed * 1000:8.1f}ms")
+    print(f"analyzer stats: {analyzer.stats()}")
+
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-symbol and batched sentiment against a mock LLM server")
+    parser.add_argument("--symbols", type=int, default=6)
+    parser.add_argument("--base-ms", type=float, default=800, help="fixed latency per LLM call")
+    parser.add_argument("--per-symbol-ms", type=float, default=150, help="extra latency per symbol in the prompt")
+    parser.add_argument("--port", type=int, default=8766)
+    asyncio.run(main(parser.parse_args()))
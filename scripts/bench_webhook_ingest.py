@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import multiprocessing
+import statistics
+from contextlib import asynccontextmanager
+
+import aiohttp
+import uvicorn
+from fastapi import FastAPI, Request, HTTPException
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.telegram.ingest import UpdateQueue, REJECTED
+
+
+def recorded_updates(count: int, redeliveries: float, seed: int = 0):
+    """Telegram-shaped updates; a share of them are sent twice like Telegram does after a timeout"""
+    rng = random.Random(seed)
+    updates = []
+    for update_id in range(1, count + 1):
+        user = {"id": 1000 + update_id % 50, "is_bot": False, "first_name": "Bench"}
+        chat = {"id": user["id"], "type": "private"}
+        if rng.random() < 0.5:
+            body = {"message": {"message_id": update_id, "date": 0, "chat": chat, "from": user, "text": "/menu"}}
+        else:
+            body = {"callback_query": {"id": str(update_id), "from": user, "chat_instance": "1", "data": "analysis_technical",
+                                       "message": {"message_id": update_id, "date": 0, "chat": chat}}}
+        updates.append({"update_id": update_id, **body})
+        if rng.random() < redeliveries:
+            updates.append({"update_id": update_id, **body})
+    return updates
+
+
+def build_app(mode: str, handler_ms: float, queue_size: int, workers: int):
+    async def handle(data):
+        # Stand-in for application.process_update: mostly waiting on Telegram/DB
+        await asyncio.sleep(handler_ms / 1000)
+
+    queue = UpdateQueue(handle, maxsize=queue_size, workers=workers)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await queue.start()
+        yield
+
+    app = FastAPI(lifespan=lifespan)
+
+    @app.post("/webhook")
+    async def webhook(request: Request):
+        data = await request.json()
+        if mode == "inline":
+            await handle(data)
+            return {"status": "ok"}
+        status = queue.submit(data)
+        if status == REJECTED:
+            raise HTTPException(status_code=503, detail="Update queue full")
+        return {"status": status}
+
+    @app.get("/stats")
+    async def stats():
+        await queue.stop(timeout=60)
+        return queue.stats()
+
+    return app
+
+
+def serve(mode: str, args):
+    """Server in its own process so the load generator doesn't share its event loop"""
+    app = build_app(mode, args.handler_ms, args.queue_size, args.workers)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="error", access_log=False)
+
+
+async def wait_for_server(url: str):
+    async with aiohttp.ClientSession() as session:
+        for _ in range(200):
+            try:
+                async with session.post(url, json={}):
+                    return
+            except aiohttp.ClientError:
+                await asyncio.sleep(0.05)
+    raise RuntimeError("server did not start")
+
+
+async def replay(url: str, updates, rate: int, connections: int):
+    latencies, codes = [], {}
+    connector = aiohttp.TCPConnector(limit=connections)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def post(update):
+            start = time.perf_counter()
+            try:
+                async with session.post(url, data=json.dumps(update), headers={"Content-Type": "application/json"}) as resp:
+                    await resp.read()
+                    codes[resp.status] = codes.get(resp.status, 0) + 1
+            except Exception as e:
+                codes[type(e).__name__] = codes.get(type(e).__name__, 0) + 1
+            latencies.append(time.perf_counter() - start)
+
+        # Open-loop pacing: send on schedule whether or not earlier requests finished
+        tasks = []
+        began = time.perf_counter()
+        for i, update in enumerate(updates):
+            delay = began + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(post(update)))
+        sent = time.perf_counter() - began
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - began
+    return latencies, codes, sent, elapsed
+
+
+async def run(mode: str, args, updates):
+    base = f"http://127.0.0.1:{args.port}"
+    server = multiprocessing.Process(target=serve, args=(mode, args), daemon=True)
+    server.start()
+    try:
+        await wait_for_server(base + "/webhook")
+        latencies, codes, sent, elapsed = await replay(base + "/webhook", updates, args.rate, args.connections)
+        async with aiohttp.ClientSession() as session:
+            async with session.get(base + "/stats") as resp:
+                stats = await resp.json()
+    finally:
+        server.terminate()
+        server.join()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"\n[{mode}]")
+    print(f"  sent {len(updates)} updates in {sent:.2f}s ({len(updates) / sent:.0f}/s offered), all answered after {elapsed:.2f}s")
+    print(f"  response p50 {statistics.median(latencies) * 1000:.1f}ms  p99 {p99 * 1000:.1f}ms  max {latencies[-1] * 1000:.1f}ms")
+    print(f"  status codes {codes}")
+    if mode == "queue":
+        print(f"  queue {stats}")
+
+
+async def main(args):
+    updates = recorded_updates(args.updates, args.redeliveries)
+    print(f"{len(updates)} updates ({len(updates) - args.updates} redeliveries) at {args.rate}/s, handler {args.handler_ms:g}ms")
+    for mode in args.modes:
+        await run(mode, args, updates)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded webhook updates against inline and queued handling")
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--redeliveries", type=float, default=0.1, help="share of updates Telegram sends twice")
+    parser.add_argument("--rate", type=int, default=1000, help="updates per second")
+    parser.add_argument("--handler-ms", type=float, default=200)
+    parser.add_argument("--workers", type=int, default=256)
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--connections", type=int, default=100, help="Telegram uses up to 100 (max_connections)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--modes", nargs="+", default=["inline", "queue"], choices=["inline", "queue"])
+    asyncio.run(main(parser.parse_args()))
@@ -6,4 +6,75 @@ CREATE INDEX idx_subscribers_timeframes ON subscribers USING gin(preferred_timef
 CREATE MATERIALIZED VIEW active_subscribers AS
 SELECT * FROM subscribers 
 WHERE status = 'active' 
-AND last_active > NOW() - INTERVAL '30 days'; 
\ No newline at end of file
+AND last_active > NOW() - INTERVAL '30 days'; 
+
+-- De materialized view erft geen indexen van subscribers
+CREATE INDEX idx_active_subscribers_assets ON active_subscribers USING gin(assets);
+CREATE INDEX idx_active_subscribers_timeframes ON active_subscribers USING gin(preferred_timeframes);
+
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY vereist een unieke index
+CREATE UNIQUE INDEX idx_active_subscribers_id ON active_subscribers (id);
+
+-- Elke refresh levert een nieuwe generatie van de view op
+CREATE TABLE active_subscribers_refreshes (
+    generation BIGSERIAL PRIMARY KEY,
+    reason TEXT NOT NULL,
+    started_at TIMESTAMPTZ NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    row_count INTEGER NOT NULL
+);
+
+-- Laatste wijziging aan subscribers die de view raakt
+CREATE TABLE active_subscribers_state (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+INSERT INTO active_subscribers_state DEFAULT VALUES;
+
+CREATE OR REPLACE FUNCTION mark_active_subscribers_changed() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE active_subscribers_state SET changed_at = clock_timestamp();
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER subscribers_preferences_changed
+AFTER INSERT OR DELETE OR UPDATE OF assets, preferred_timeframes, status ON subscribers
+FOR EACH STATEMENT EXECUTE FUNCTION mark_active_subscribers_changed();
+
+-- Ververst de view (met force = false alleen na een wijziging) en logt duur en aantal rijen.
+-- Loopt er al een refresh, dan komt de huidige generatie terug met refreshed = false.
+CREATE OR REPLACE FUNCTION refresh_active_subscribers(reason TEXT DEFAULT 'schedule', force BOOLEAN DEFAULT TRUE)
+RETURNS TABLE (generation BIGINT, refreshed BOOLEAN, duration_ms INTEGER, row_count INTEGER)
+LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+DECLARE
+    started TIMESTAMPTZ := clock_timestamp();
+    last_started TIMESTAMPTZ;
+    rows_now INTEGER;
+    elapsed INTEGER;
+BEGIN
+    SELECT MAX(r.started_at) INTO last_started FROM active_subscribers_refreshes r;
+
+    IF NOT pg_try_advisory_xact_lock(hashtext('refresh_active_subscribers'))
+       OR (NOT force AND last_started IS NOT NULL
+           AND (SELECT s.changed_at FROM active_subscribers_state s) < last_started) THEN
+        RETURN QUERY SELECT COALESCE(MAX(r.generation), 0), FALSE, 0, 0 FROM active_subscribers_refreshes r;
+        RETURN;
+    END IF;
+
+    REFRESH MATERIALIZED VIEW CONCURRENTLY active_subscribers;
+    SELECT COUNT(*) INTO rows_now FROM active_subscribers;
+    elapsed := (EXTRACT(EPOCH FROM clock_timestamp() - started) * 1000)::INTEGER;
+
+    RETURN QUERY
+    INSERT INTO active_subscribers_refreshes (reason, started_at, duration_ms, row_count)
+    VALUES (refresh_active_subscribers.reason, started, elapsed, rows_now)
+    RETURNING active_subscribers_refreshes.generation, TRUE, elapsed, rows_now;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION active_subscribers_generation() RETURNS BIGINT
+LANGUAGE sql STABLE AS $$
+    SELECT COALESCE(MAX(generation), 0) FROM active_subscribers_refreshes;
+$$;
@@ -11,6 +11,7 @@ import requests
 import asyncio
 import httpx
 from telegram.constants import ParseMode
+from app.services.telegram.render import RenderedMessage, render_cache, send_rendered
 
 logger = logging.getLogger(__name__)
 
@@ -47,17 +48,18 @@ class TelegramService:
         
     async def send_signal(self, chat_id: str, signal: Dict[str, Any], sentiment: str = None, chart: str = None, events: list = None):
         try:
-            message = self._format_signal_message(signal, sentiment, events)
+            # Eén keer renderen per signaal, daarna alleen de chat_id invullen
+            rendered = render_cache.get(
+                (signal['symbol'], signal['action'], signal['price'], signal['stopLoss'], signal['takeProfit'],
+                 signal.get('timeframe'), sentiment, tuple(map(str, (events or [])[:3]))),
+                lambda: RenderedMessage(self._format_signal_message(signal, sentiment, events), parse_mode=ParseMode.HTML)
+            )
             
             # Log de verzendpoging
             logger.info(f"Attempting to send message to chat_id: {chat_id}")
-            logger.debug(f"Message content: {message}")
+            logger.debug(f"Message content: {rendered.text}")
             
-            await self.bot.send_message(
-                chat_id=chat_id, 
-                text=message, 
-                parse_mode=ParseMode.HTML
-            )
+            await send_rendered(self.bot, chat_id, rendered)
             
             if chart:
                 await self.bot.send_photo(chat_id=chat_id, photo=chart)
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.telegram.fanout import ChatRateLimiter, FanoutEngine, summarize  # noqa: E402
+
+
+class RetryAfter(Exception):
+    def __init__(self, seconds: float):
+        super().__init__(f"Flood control exceeded. Retry in {seconds} seconds")
+        self.retry_after = seconds
+
+
+class Message:
+    def __init__(self, message_id: int):
+        self.message_id = message_id
+
+
+def engine(**kwargs) -> FanoutEngine:
+    options = {"concurrency": 4, "global_rate": 0, "per_chat_rate": 0}
+    options.update(kwargs)
+    return FanoutEngine(**options)
+
+
+def test_rate_limited_chat_is_retried_after_retry_after():
+    attempts = {}
+
+    async def send(chat_id):
+        attempts[chat_id] = attempts.get(chat_id, 0) + 1
+        if chat_id == 2 and attempts[chat_id] == 1:
+            raise RetryAfter(0.05)
+        return Message(100 + chat_id)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = await engine().send_all([1, 2, 3], send)
+        return results, loop.time() - start
+
+    results, elapsed = asyncio.run(run())
+
+    assert [r["status"] for r in results] == ["sent", "sent", "sent"]
+    assert results[1]["attempts"] == 2
+    assert results[1]["message_id"] == 102
+    assert elapsed >= 0.05
+    assert summarize(results)["retries"] == 1
+
+
+def test_rate_limited_chat_gives_up_after_max_retries():
+    calls = []
+
+    async def send(chat_id):
+        calls.append(chat_id)
+        raise RetryAfter(0.01)
+
+    results = asyncio.run(engine(max_retries=2).send_all([7], send))
+
+    assert calls == [7, 7, 7]
+    assert results[0]["status"] == "rate_limited"
+    assert results[0]["attempts"] == 3
+
+
+def test_other_errors_are_not_retried():
+    calls = []
+
+    async def send(chat_id):
+        calls.append(chat_id)
+        raise RuntimeError("chat not found")
+
+    results = asyncio.run(engine().send_all([7], send))
+
+    assert calls == [7]
+    assert results[0]["status"] == "failed"
+    assert summarize(results)["failed"] == 1
+
+
+def test_chat_limiter_forgets_quiet_chats():
+    limiter = ChatRateLimiter(1000)
+
+    async def run():
+        for chat_id in range(5000):
+            await limiter.acquire(chat_id)
+        await asyncio.sleep(0.01)
+        await limiter.acquire("last")
+
+    asyncio.run(run())
+
+    assert len(limiter._next_slot) < 100
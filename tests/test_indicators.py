@@ -0,0 +1,80 @@
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import technical_analysis  # noqa: E402
+from app.services.indicators.engine import READY_BARS, IndicatorState, compute_all, stack  # noqa: E402
+
+
+def random_walk(bars: int, seed: int):
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.001, bars))
+    spread = np.abs(rng.normal(0, 0.0008, bars))
+    return close + spread, close - spread, close
+
+
+def test_every_indicator_has_a_warmup():
+    high, low, close = random_walk(120, 0)
+    indicators = compute_all(high, low, close)
+
+    assert set(indicators) == set(READY_BARS)
+    for name, bars in READY_BARS.items():
+        assert np.isnan(indicators[name][:bars - 1]).all(), name
+        assert not np.isnan(indicators[name][bars - 1:]).any(), name
+
+
+def test_short_series_next_to_long_one_matches_computing_it_alone():
+    long_series, short_series = random_walk(300, 1), random_walk(30, 2)
+    series = [long_series, short_series]
+    lengths = [len(s[2]) for s in series]
+    batch = compute_all(*(stack([s[field] for s in series], 300) for field in range(3)), lengths=lengths)
+
+    for row, (high, low, close) in enumerate(series):
+        alone = compute_all(high, low, close)
+        for name, values in alone.items():
+            np.testing.assert_allclose(batch[name][row, -len(close):], values, rtol=1e-9, atol=1e-12, err_msg=name)
+            # Nothing in the padding either
+            assert np.isnan(batch[name][row, :-len(close)]).all(), name
+
+    # 30 bars: RSI and ATR are ready, the 50-period averages and MACD signal are not
+    assert not np.isnan(batch["rsi"][1, -1])
+    assert np.isnan(batch["ema_50"][1, -1])
+    assert np.isnan(batch["macd_signal"][1, -1])
+
+
+@pytest.mark.parametrize("seeded", [0, 40, 200])
+def test_incremental_updates_match_batch(seeded):
+    high, low, close = (np.stack(columns) for columns in zip(random_walk(260, 3), random_walk(260, 4)))
+    batch = compute_all(high, low, close)
+
+    state = IndicatorState.from_history(high[:, :seeded], low[:, :seeded], close[:, :seeded])
+    for bar in range(seeded, close.shape[1]):
+        latest = state.update(high[:, bar], low[:, bar], close[:, bar])
+        for name, values in latest.items():
+            np.testing.assert_allclose(values, batch[name][:, bar], rtol=1e-7, atol=1e-9,
+                                       err_msg=f"{name} at bar {bar}")
+
+
+def test_batch_analysis_reports_no_values_for_too_short_history(monkeypatch):
+    candles = {
+        ("EURUSD", "1h"): random_walk(500, 5),
+        ("GBPUSD", "1h"): random_walk(16, 6)
+    }
+
+    async def get_ohlc(symbol, timeframe, bars):
+        high, low, close = candles[(symbol, timeframe)]
+        return {"high": high, "low": low, "close": close}
+
+    monkeypatch.setattr(technical_analysis.bar_store, "get_ohlc", get_ohlc)
+    results = asyncio.run(technical_analysis.analyze_technical_batch(list(candles)))
+
+    assert all(value is not None for value in results[("EURUSD", "1h")]["indicators"].values())
+    short = results[("GBPUSD", "1h")]["indicators"]
+    # 16 bars: RSI, ATR and %K are ready, the 20-bar indicators are not
+    assert short["rsi"] is not None and short["atr"] is not None and short["stoch_k"] is not None
+    assert short["ema_20"] is None and short["sma_20"] is None and short["bb_upper"] is None
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.telegram.outbox import Outbox, signal_id  # noqa: E402
+from app.services.telegram.render import RenderedMessage  # noqa: E402
+
+SIGNAL = {"symbol": "EURUSD", "action": "BUY", "price": 1.1, "stopLoss": 1.09, "takeProfit": 1.12, "interval": "15m"}
+
+
+def opened(tmp_path, **kwargs) -> Outbox:
+    box = Outbox(path=str(tmp_path / "outbox.db"), **kwargs)
+    box._open()
+    return box
+
+
+def row(key: str, chat_id: str, text: str):
+    return (key, chat_id, "sendMessage", RenderedMessage(text).body(chat_id), None)
+
+
+def claimed(box: Outbox, now: float) -> list:
+    return [(chat_id, json.loads(body)["text"]) for _, chat_id, _, body, *_ in box._claim(10, now)]
+
+
+def test_signal_id_ignores_generated_text():
+    first = {**SIGNAL, "sentiment": "Bullish", "verdict": "Strong setup"}
+    again = {**SIGNAL, "sentiment": "Neutral", "verdict": None}
+
+    assert signal_id(first) == signal_id(again)
+    assert signal_id({**SIGNAL, "price": 1.2}) != signal_id(SIGNAL)
+    assert signal_id({**SIGNAL, "id": 17}) == "17"
+
+
+def test_requeued_signal_with_new_text_is_not_sent_twice(tmp_path):
+    box = Outbox(path=str(tmp_path / "outbox.db"))
+    key = signal_id(SIGNAL)
+
+    async def run():
+        await box._call(box._open)
+        first = await box.enqueue_signal(key, [1, 2], RenderedMessage("EURUSD BUY, sentiment: bullish"), photo=b"\xff\xd8\xffchart")
+        # After a crash the sentiment is generated again, and comes out different
+        again = await box.enqueue_signal(key, [1, 2], RenderedMessage("EURUSD BUY, sentiment: neutral"), photo=b"\xff\xd8\xffother")
+        late = await box.enqueue_photo(key, [2], b"\xff\xd8\xffthird")
+        return first, again, late
+
+    assert asyncio.run(run()) == (4, 0, 0)
+
+
+def test_messages_to_one_chat_go_out_in_order(tmp_path):
+    box = opened(tmp_path)
+    box._insert([row("a1", "1", "first"), row("b1", "2", "other chat"), row("a2", "1", "second")], {})
+
+    # Only the head of each chat's queue is due
+    batch = box._claim(10, 1e12)
+    assert [(chat_id, json.loads(body)["text"]) for _, chat_id, _, body, *_ in batch] == [("1", "first"), ("2", "other chat")]
+    assert claimed(box, 1e12) == []
+
+    # A failed send still blocks the messages queued after it
+    box._reschedule(batch[0][0], 1e12 + 60, "timeout", 1)
+    box._mark_sent(batch[1][0], 1e12, 1)
+    assert claimed(box, 1e12) == []
+    assert claimed(box, 1e12 + 60) == [("1", "first")]
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    box = opened(tmp_path, lease=30)
+    box._insert([row("a1", "1", "first"), row("a2", "1", "second")], {})
+
+    now = time.time()
+
+    # Claimed by a process that died before recording the result
+    assert claimed(box, now) == [("1", "first")]
+    assert claimed(box, now + 20) == []
+    assert claimed(box, now + 31) == [("1", "first")]
+
+    assert box._db.execute("SELECT status, lease_until FROM outbox WHERE dedupe_key = 'a1'").fetchone() == ("inflight", now + 61)
+
+
+def test_delivery_keeps_per_chat_order(tmp_path):
+    box = Outbox(path=str(tmp_path / "outbox.db"), workers=8)
+    sent = []
+
+    async def post(method, body, attachment):
+        fields = json.loads(body)
+        # Slow first sends: later messages to the same chat must still wait for them
+        await asyncio.sleep(0.02 if fields["text"].endswith("0") else 0)
+        sent.append((fields["chat_id"], fields["text"]))
+        return {"message_id": len(sent)}
+
+    box._post = post
+
+    async def run():
+        await box.start("http://telegram.invalid")
+        for n in range(3):
+            await box.enqueue_message(f"signal{n}", [1, 2, 3], RenderedMessage(f"message {n}"))
+        for _ in range(200):
+            if len(sent) == 9:
+                break
+            await asyncio.sleep(0.01)
+        await box.stop()
+
+    asyncio.run(run())
+
+    for chat_id in (1, 2, 3):
+        assert [text for chat, text in sent if chat == chat_id] == ["message 0", "message 1", "message 2"]
+    assert box.results["sent"] == 9
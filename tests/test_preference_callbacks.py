@@ -0,0 +1,133 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Clients are created at import; nothing below talks to them
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.e30.test")
+
+import app.main as main  # noqa: E402
+from app.services.subscriber.index import SubscriptionIndex  # noqa: E402
+
+
+class Query:
+    """The bits of the supabase query builder the callbacks use"""
+
+    def __init__(self, table: "Table", op: str = "select", row: dict = None):
+        self.table, self.op, self.row, self.filters = table, op, row, {}
+
+    def select(self, *args):
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def insert(self, row):
+        return Query(self.table, "insert", row)
+
+    def delete(self):
+        return Query(self.table, "delete")
+
+    def execute(self):
+        matches = [
+            row for row in self.table.rows
+            if all(str(row[column]) == str(value) for column, value in self.filters.items())
+        ]
+        if self.op == "insert":
+            row = {**self.row, "id": len(self.table.rows) + 1}
+            self.table.rows.append(row)
+            matches = [row]
+        elif self.op == "delete":
+            self.table.rows = [row for row in self.table.rows if row not in matches]
+        return SimpleNamespace(data=matches)
+
+
+class Table:
+    def __init__(self, rows):
+        self.rows = rows
+
+
+class Supabase:
+    def __init__(self, rows):
+        self.preferences = Table(rows)
+
+    def table(self, name):
+        return Query(self.preferences)
+
+
+class Message:
+    chat_id = 42
+    message_id = 7
+
+    def __init__(self):
+        self.edits = []
+
+    async def edit_text(self, text, reply_markup=None):
+        self.edits.append(text)
+
+
+class TelegramBot:
+    async def answer_callback_query(self, callback_query_id):
+        pass
+
+    async def send_message(self, **kwargs):
+        raise AssertionError(f"callback failed: {kwargs}")
+
+
+SIGNAL = {"market": "forex", "instrument": "EURUSD", "timeframe": "15m"}
+
+
+@pytest.fixture
+def live(monkeypatch):
+    supabase = Supabase([{"id": 1, "user_id": "100", "market": "forex", "instrument": "EURUSD", "timeframe": "15m"}])
+    index = SubscriptionIndex(lambda: [])
+    index.load()
+    # Loaded before the row above, so only the callbacks can make the index agree with it
+    index.add(("forex", "EURUSD", "15m"), 100)
+
+    monkeypatch.setattr(main, "supabase", supabase)
+    monkeypatch.setattr(main, "subscription_index", index)
+    monkeypatch.setattr(main, "telegram_bot", TelegramBot(), raising=False)
+    monkeypatch.setattr("app.services.trading_bot.subscription_index", index)
+    return supabase
+
+
+def click(data: str, user_id: int) -> Message:
+    message = Message()
+    query = SimpleNamespace(id="1", data=data, message=message, from_user=SimpleNamespace(id=user_id))
+    asyncio.run(main.button_callback(SimpleNamespace(callback_query=query), None))
+    return message
+
+
+def matched():
+    return sorted(asyncio.run(main.trading_bot.match_subscribers(SIGNAL)))
+
+
+def test_saved_preference_is_matched_before_resync(live):
+    message = click("timeframe_forex_EURUSD_15m", 200)
+
+    assert "Preference saved" in message.edits[0]
+    assert matched() == [100, 200]
+
+
+def test_deleted_preference_is_not_matched_before_resync(live):
+    message = click("delete_preference_1", 100)
+
+    assert "Deleted preference" in message.edits[0]
+    assert live.preferences.rows == []
+    assert matched() == []
+
+
+def test_preference_of_another_user_is_not_deleted(live):
+    message = click("delete_preference_1", 200)
+
+    assert "not found" in message.edits[0]
+    assert len(live.preferences.rows) == 1
+    assert matched() == [100]
@@ -0,0 +1,80 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.subscriber.index import SubscriptionIndex, preference_key  # noqa: E402
+
+EURUSD = preference_key("forex", "EURUSD", "15m")
+GBPUSD = preference_key("forex", "GBPUSD", "1h")
+
+
+def test_load_builds_index_from_rows():
+    index = SubscriptionIndex(lambda: [(EURUSD, 1), (EURUSD, 2), (GBPUSD, 3), (EURUSD, 1)])
+    index.load()
+
+    assert index.loaded
+    assert list(index.match(EURUSD)) == [1, 2]
+    assert list(index.match(GBPUSD)) == [3]
+    assert list(index.match(preference_key("forex", "USDJPY", "4h"))) == []
+    assert index.size() == 3
+
+
+def test_add_and_remove_are_visible_immediately():
+    index = SubscriptionIndex(lambda: [(EURUSD, 1)])
+    index.load()
+
+    index.add(EURUSD, "2")
+    index.add(EURUSD, 2)
+    assert list(index.match(EURUSD)) == [1, 2]
+
+    index.remove(EURUSD, "1")
+    index.remove(EURUSD, 2)
+    assert list(index.match(EURUSD)) == []
+    assert EURUSD not in index._index
+
+
+def test_changes_during_reload_are_replayed():
+    # The reload reads the database before the callbacks' writes land in it
+    snapshot_read = threading.Event()
+    callbacks_done = threading.Event()
+
+    def loader():
+        rows = [(EURUSD, 1), (EURUSD, 2)]
+        snapshot_read.set()
+        callbacks_done.wait(5)
+        return rows
+
+    index = SubscriptionIndex(lambda: [(EURUSD, 1), (EURUSD, 2)])
+    index.load()
+    index.loader = loader
+
+    reload = threading.Thread(target=index.load)
+    reload.start()
+    assert snapshot_read.wait(5)
+    index.add(GBPUSD, 3)
+    index.remove(EURUSD, 2)
+    callbacks_done.set()
+    reload.join(5)
+
+    assert list(index.match(GBPUSD)) == [3]
+    assert list(index.match(EURUSD)) == [1]
+
+
+def test_failed_reload_keeps_previous_index():
+    index = SubscriptionIndex(lambda: [(EURUSD, 1)])
+    index.load()
+
+    def broken():
+        raise RuntimeError("database unavailable")
+
+    index.loader = broken
+    try:
+        index.load()
+    except RuntimeError:
+        pass
+
+    index.add(EURUSD, 2)
+    assert list(index.match(EURUSD)) == [1, 2]
+    assert index._pending is None
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.e30.test")
+
+from telegram.ext import Application, CommandHandler  # noqa: E402
+
+import app.main as main  # noqa: E402
+from app.services.telegram.ingest import DUPLICATE, INVALID, QUEUED, REJECTED, UpdateQueue  # noqa: E402
+
+
+def command(update_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": text,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "Test"},
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text)}]
+        }
+    }
+
+
+async def drain(queue: UpdateQueue, updates) -> list:
+    await queue.start()
+    statuses = [queue.submit(update) for update in updates]
+    await queue.stop()
+    return statuses
+
+
+def test_failing_handler_is_counted():
+    async def process(data):
+        if data["update_id"] % 2:
+            raise RuntimeError("handler failed")
+
+    queue = UpdateQueue(process, workers=2)
+    statuses = asyncio.run(drain(queue, [{"update_id": i} for i in range(10)]))
+
+    assert statuses == [QUEUED] * 10
+    assert queue.stats()["processed"] == 5
+    assert queue.stats()["failed"] == 5
+
+
+def test_duplicates_invalid_and_full_queue():
+    async def process(data):
+        pass
+
+    queue = UpdateQueue(process, maxsize=2, workers=1)
+    # Not started, so nothing is taken off the queue
+    statuses = [queue.submit(update) for update in ({"update_id": 1}, {"update_id": 1}, {}, {"update_id": 2}, {"update_id": 3})]
+
+    assert statuses == [QUEUED, DUPLICATE, INVALID, QUEUED, REJECTED]
+    assert queue.submit({"update_id": 3}) == REJECTED
+
+
+def test_handler_errors_reach_the_update_queue(monkeypatch):
+    async def boom(update, context):
+        raise RuntimeError("handler failed")
+
+    async def ok(update, context):
+        pass
+
+    async def get_me(self, endpoint, *args, **kwargs):
+        assert endpoint == "getMe"
+        return {"id": 1, "is_bot": True, "first_name": "Test", "username": "test_bot"}
+
+    async def run():
+        application = Application.builder().token("1:test").build()
+        monkeypatch.setattr(type(application.bot), "_post", get_me)
+        await application.initialize()
+        application.add_handler(CommandHandler("boom", boom))
+        application.add_handler(CommandHandler("ok", ok))
+        application.add_error_handler(main.record_handler_error)
+        monkeypatch.setattr(main, "application", application, raising=False)
+        monkeypatch.setattr(main, "telegram_bot", application.bot, raising=False)
+
+        queue = UpdateQueue(main.process_telegram_update, workers=2)
+        await drain(queue, [command(1, "/ok"), command(2, "/boom"), command(3, "/ok")])
+        await application.shutdown()
+        return queue.stats()
+
+    stats = asyncio.run(run())
+
+    assert stats["processed"] == 2
+    assert stats["failed"] == 1
+    assert main.handler_errors == {}
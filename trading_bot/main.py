@@ -1,7 +1,7 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 import logging
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List
 import asyncio
 from supabase import create_client
 
@@ -10,6 +10,10 @@ from trading_bot.services.news_ai_service import NewsAIService
 from trading_bot.services.chart_service import ChartService
 from trading_bot.services.calendar_service import CalendarService
 from trading_bot.services.database import Database
+from trading_bot.services.enrichment import Enrichment, EnrichmentStage
+from app.services.telegram.outbox import outbox
+from app.utils.http import http_clients
+from app.utils import metrics
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -27,34 +31,81 @@ telegram = TelegramService(
 news_ai = NewsAIService(db)
 chart = ChartService()
 calendar = CalendarService(db)
+enrichment_stage = EnrichmentStage()
+late_patches = set()
+
+@app.on_event("startup")
+async def startup_event():
+    """Load subscribers in memory for signal matching"""
+    await db.subscriber_index.start()
+    await http_clients.start("https://api.telegram.org")
+    await outbox.start(telegram.base_url)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await db.subscriber_index.stop()
+    for task in list(late_patches):
+        task.cancel()
+    await outbox.stop()
+    await http_clients.close()
+
+async def patch_late_sections(chat_ids: List[str], signal: Dict[str, Any], key: str, enrichment: Enrichment):
+    """Edit late sections into an already queued signal, or send the late chart"""
+    try:
+        async for name, value in enrichment.late_results():
+            if name == "chart":
+                if value:
+                    await telegram.queue_chart(chat_ids, key, value)
+            else:
+                await telegram.queue_update(
+                    chat_ids, key, signal,
+                    sentiment=enrichment.values.get("sentiment"),
+                    events=enrichment.values.get("calendar")
+                )
+        logger.info(f"Late enrichment for {signal['symbol']}: {enrichment.timings}")
+    except Exception as e:
+        logger.error(f"Error patching late enrichment: {str(e)}")
 
 @app.post("/signal")
+@metrics.timed("total")
 async def process_signal(signal: Dict[str, Any]):
     """Process trading signal"""
     try:
         # 1. Match subscribers
-        subscribers = await db.match_subscribers(signal)
+        with metrics.stage("match"):
+            subscribers = await db.match_subscribers(signal)
+        metrics.FANOUT_SIZE.observe(len(subscribers))
         
-        # 2. Get market analysis
-        sentiment = await news_ai.analyze_sentiment(signal["symbol"])
-        chart_image = await chart.generate_chart(signal["symbol"], signal["interval"])
-        calendar_events = await calendar.get_relevant_events(signal["symbol"])
+        # 2. Enrich concurrently; whatever misses its deadline is patched in later
+        with metrics.stage("enrich"):
+            enrichment = await enrichment_stage.run({
+                "sentiment": lambda: news_ai.analyze_sentiment(signal["symbol"]),
+                "chart": lambda: chart.generate_chart(signal["symbol"], signal["interval"]),
+                "calendar": lambda: calendar.get_relevant_events(signal["symbol"])
+            })
         
-        # 3. Send to subscribers
-        tasks = []
-        for subscriber in subscribers:
-            tasks.append(
-                telegram.send_signal(
-                    chat_id=subscriber["chat_id"],
-                    signal=signal,
-                    sentiment=sentiment,
-                    chart=chart_image,
-                    events=calendar_events
-                )
+        # 3. Queue for all subscribers; the outbox delivers, retries and keeps dead letters
+        chat_ids = [subscriber["chat_id"] for subscriber in subscribers]
+        with metrics.stage("send"):
+            key = await telegram.queue_signal(
+                chat_ids,
+                signal=signal,
+                sentiment=enrichment.values.get("sentiment"),
+                chart=enrichment.values.get("chart"),
+                events=enrichment.values.get("calendar")
             )
         
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        return {"status": "success", "sent_to": len(results)}
+        if enrichment.late and chat_ids:
+            task = asyncio.create_task(patch_late_sections(chat_ids, signal, key, enrichment))
+            late_patches.add(task)
+            task.add_done_callback(late_patches.discard)
+        
+        return {
+            "status": "success",
+            "subscribers": len(subscribers),
+            "late": sorted(enrichment.late),
+            "enrichment": enrichment.timings
+        }
         
     except Exception as e:
         logger.error(f"Error processing signal: {str(e)}")
@@ -64,6 +115,22 @@ async def process_signal(signal: Dict[str, Any]):
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/stats")
+async def stats():
+    """Cache statistics"""
+    return {"sentiment": news_ai.flight.stats(), "http": http_clients.stats(), "outbox": outbox.stats()}
+
+@app.get("/outbox/dead")
+async def dead_letters(limit: int = 50):
+    """Messages the outbox gave up on"""
+    return await outbox.dead_letters(limit)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=port) 
\ No newline at end of file
@@ -3,6 +3,7 @@ import redis
 import logging
 import os
 from typing import Dict, List
+from app.services.subscriber.index import SubscriptionIndex, PAGE_SIZE
 
 logger = logging.getLogger(__name__)
 
@@ -43,12 +44,27 @@ class Database:
         
         self.CACHE_TIMEOUT = 300  # 5 minuten in seconden
         
+        # In-memory (symbol, timeframe) -> chat_id index over the subscribers table
+        self.subscriber_index = SubscriptionIndex(self._load_subscriber_keys)
+        
     async def match_subscribers(self, signal: Dict) -> List[Dict]:
         """Match signal with subscriber preferences"""
         try:
-            logger.info(f"Attempting to connect to Supabase with URL: {self.supabase.supabase_url}")
             logger.info(f"Incoming signal: {signal}")
             
+            if self.subscriber_index.loaded:
+                symbol = signal["symbol"]
+                timeframe = signal.get("timeframe", signal.get("interval"))
+                
+                # Subscribers without a symbol/timeframe filter are stored under "*"
+                chat_ids = set()
+                for key in ((symbol, timeframe), (symbol, "*"), ("*", timeframe), ("*", "*")):
+                    chat_ids.update(self.subscriber_index.match(key))
+                
+                logger.info(f"Matched {len(chat_ids)} subscribers from index")
+                return [{"chat_id": str(chat_id)} for chat_id in chat_ids]
+            
+            logger.info(f"Attempting to connect to Supabase with URL: {self.supabase.supabase_url}")
             response = self.supabase.table("subscribers").select("*").execute()
             logger.info(f"Supabase response: {response}")
             
@@ -66,6 +82,26 @@ class Database:
             logger.error(f"Error matching subscribers: {str(e)}", exc_info=True)
             return []
             
+    def _load_subscriber_keys(self):
+        """Yield (symbol, timeframe) keys for every active subscriber"""
+        start = 0
+        while True:
+            # postgrest 0.11 treats the end of range() as exclusive
+            response = self.supabase.table("subscribers").select(
+                "user_id,is_active,symbols,timeframes"
+            ).range(start, start + PAGE_SIZE).execute()
+            
+            for s in response.data:
+                if not s.get("is_active", False):
+                    continue
+                for symbol in s.get("symbols") or ["*"]:
+                    for timeframe in s.get("timeframes") or ["*"]:
+                        yield (symbol, timeframe), int(s["user_id"])
+            
+            if len(response.data) < PAGE_SIZE:
+                break
+            start += PAGE_SIZE
+            
     async def get_cached_sentiment(self, symbol: str) -> str:
         """Get cached sentiment analysis"""
         return self.redis.get(f"sentiment:{symbol}")
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Tuple
+
+from app.utils.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Seconds an enricher may take before the signal goes out without it (ENRICH_DEADLINE_<NAME>)
+DEFAULT_DEADLINES = {
+    "sentiment": 3.0,
+    "chart": 1.5,
+    "calendar": 1.0
+}
+
+
+class Enrichment:
+    """What the enrichers produced by their deadlines, plus the ones still running"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.values: Dict[str, Any] = {}
+        self.timings: Dict[str, Dict[str, Any]] = {}
+        self.late: Dict[str, asyncio.Task] = {}
+        self._done_at: Dict[str, float] = {}
+
+    def _finish(self, name: str, task: asyncio.Task) -> Tuple[bool, Any]:
+        seconds = self._done_at.get(name, time.perf_counter()) - self.started
+        STAGE_SECONDS.labels(name).observe(seconds)
+        timing = self.timings[name]
+        timing["seconds"] = round(seconds, 3)
+
+        if task.cancelled() or task.exception() is not None:
+            timing["status"] = "failed" if timing["status"] != "late" else "late_failed"
+            if not task.cancelled():
+                logger.error(f"Enricher {name} failed: {str(task.exception())}")
+            return False, None
+
+        if timing["status"] == "pending":
+            timing["status"] = "ok"
+        value = self.values[name] = task.result()
+        return True, value
+
+    async def late_results(self, timeout: float = None) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield (name, value) for late enrichers as they complete; gives up after timeout"""
+        if timeout is None:
+            timeout = float(os.getenv("ENRICH_LATE_TIMEOUT", 120))
+        names = {task: name for name, task in self.late.items()}
+        pending = set(names)
+        deadline = time.monotonic() + timeout
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for task in done:
+                    name = names[task]
+                    ok, value = self._finish(name, task)
+                    if ok:
+                        yield name, value
+        finally:
+            for task in pending:
+                task.cancel()
+                self.timings[names[task]]["status"] = "abandoned"
+            self.late = {}
+
+
+class EnrichmentStage:
+    """Runs independent enrichers concurrently, each against its own deadline"""
+
+    def __init__(self, deadlines: Dict[str, float] = None):
+        self.deadlines = {
+            name: float(os.getenv(f"ENRICH_DEADLINE_{name.upper()}", seconds))
+            for name, seconds in {**DEFAULT_DEADLINES, **(deadlines or {})}.items()
+        }
+
+    async def run(self, enrichers: Dict[str, Callable[[], Awaitable[Any]]]) -> Enrichment:
+        """Start every enricher and wait until each is done or past its deadline.
+
+        Enrichers that miss their deadline keep running; they end up in `Enrichment.late`.
+        """
+        enrichment = Enrichment()
+        tasks = {}
+        for name, enricher in enrichers.items():
+            tasks[name] = asyncio.create_task(enricher())
+            # Timed on completion, not when we get around to looking at it
+            tasks[name].add_done_callback(lambda _, name=name: enrichment._done_at.setdefault(name, time.perf_counter()))
+            enrichment.timings[name] = {"status": "pending", "deadline": self.deadlines.get(name)}
+
+        # Walk the deadlines in order; each wait only covers the time left until the next one
+        for name in sorted(tasks, key=lambda n: self.deadlines.get(n) or float("inf")):
+            task = tasks[name]
+            deadline = self.deadlines.get(name)
+            remaining = None if deadline is None else max(0.0, enrichment.started + deadline - time.perf_counter())
+            await asyncio.wait([task], timeout=remaining)
+
+            if task.done():
+                enrichment._finish(name, task)
+            else:
+                enrichment.timings[name]["status"] = "late"
+                enrichment.late[name] = task
+
+        return enrichment
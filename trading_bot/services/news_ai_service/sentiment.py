@@ -4,6 +4,8 @@ import asyncio
 import logging
 from openai import AsyncOpenAI
 from trading_bot.services.database.db import Database
+from app.utils.singleflight import SingleFlight
+from app.utils.metrics import observe_llm
 
 logger = logging.getLogger(__name__)
 
@@ -17,14 +19,23 @@ class NewsAIService:
         )
         self.last_api_call = 0
         self.min_delay = 3.0  # Verhoogd naar 3 seconden
+        self.flight = SingleFlight(
+            "sentiment",
+            get_cached=db.get_cached_sentiment,
+            set_cached=db.cache_sentiment
+        )
         
     async def analyze_sentiment(self, symbol: str) -> str:
         try:
-            # First check cache
-            cached = await self.db.get_cached_sentiment(symbol)
-            if cached:
-                return cached
-                
+            # Cache first; concurrent misses for one symbol wait on a single call
+            return await self.flight.get(symbol, lambda: self._get_sentiment(symbol))
+            
+        except Exception as e:
+            logger.error(f"Error analyzing sentiment: {str(e)}")
+            return None
+            
+    async def _get_sentiment(self, symbol: str) -> str:
+        try:
             # Rate limiting
             current_time = time.time()
             time_since_last_call = current_time - self.last_api_call
@@ -35,6 +46,7 @@ class NewsAIService:
             
             # Try OpenAI
             try:
+                started = time.perf_counter()
                 completion = await self.openai_client.chat.completions.create(
                     model="gpt-4",
                     messages=[
@@ -44,6 +56,7 @@ class NewsAIService:
                     max_tokens=150,
                     temperature=0.7
                 )
+                observe_llm("gpt-4", time.perf_counter() - started, completion.usage)
                 self.last_api_call = time.time()
                 sentiment = completion.choices[0].message.content
                 
@@ -51,9 +64,6 @@ class NewsAIService:
                 logger.error(f"OpenAI API error: {str(e)}")
                 return None
             
-            # Cache the result
-            if sentiment:
-                await self.db.cache_sentiment(symbol, sentiment)
             return sentiment
             
         except Exception as e:
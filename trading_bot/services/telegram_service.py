@@ -1,11 +1,17 @@
 import aiohttp
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import os
 from trading_bot.services.database import Database
+from app.services.telegram.outbox import outbox, signal_id
+from app.services.telegram.render import JSON_HEADERS, RenderedMessage, photo_filename, render_cache
+from app.utils.http import http_clients
+from app.utils.metrics import observe_telegram
 
 logger = logging.getLogger(__name__)
 
+TELEGRAM_API_URL = "https://api.telegram.org"
+
 class TelegramService:
     def __init__(self, token: str, db: Database):
         self.token = token
@@ -18,55 +24,88 @@ class TelegramService:
             # Convert 'type' to 'action' if needed
             signal['action'] = signal.get('type', signal.get('action', 'UNKNOWN'))
             
-            # Format message
-            message = await self._format_signal_message(signal, sentiment, events)
+            # Rendered once per signal, shared by all subscribers
+            rendered = render_cache.get(
+                (signal['symbol'], signal['action'], signal['price'], signal['stopLoss'], signal['takeProfit'],
+                 sentiment, tuple(map(str, events or ()))),
+                lambda: RenderedMessage(self._format_signal_message(signal, sentiment, events), parse_mode="Markdown")
+            )
             
-            # Send message and chart
-            async with aiohttp.ClientSession() as session:
-                # Send text message
-                await self._send_message(session, chat_id, message)
-                
-                # Send chart if available
-                if chart:
-                    await self._send_photo(session, chat_id, chart)
+            # Send text message
+            await self._api("sendMessage", data=rendered.body(chat_id), headers=JSON_HEADERS)
+            
+            # Send chart if available
+            if chart:
+                await self._send_photo(chat_id, chart)
                     
         except Exception as e:
             logger.error(f"Error sending signal to {chat_id}: {str(e)}")
             raise 
 
-    async def _format_signal_message(self, signal: Dict, sentiment: str, events: list) -> str:
-        """Format signal message with sentiment and events"""
-        return f"""
+    @property
+    def base_url(self) -> str:
+        return f"{TELEGRAM_API_URL}/bot{self.token}"
+
+    async def queue_signal(self, chat_ids: List[str], signal: Dict[str, Any], sentiment: Optional[str],
+                           chart: Optional[bytes], events: Optional[list]) -> str:
+        """Queue the signal message and chart for all subscribers in the durable outbox.
+
+        Sections that aren't available yet (None) are left out; add them later with queue_update.
+        Returns the signal's outbox key.
+        """
+        signal['action'] = signal.get('type', signal.get('action', 'UNKNOWN'))
+        key = signal_id(signal)
+        rendered = RenderedMessage(self._format_signal_message(signal, sentiment, events), parse_mode="Markdown")
+        queued = await outbox.enqueue_signal(key, chat_ids, rendered, photo=chart)
+        logger.info(f"Signal {signal['symbol']} queued for {len(chat_ids)} subscribers ({queued} calls)")
+        return key
+
+    async def queue_update(self, chat_ids: List[str], key: str, signal: Dict[str, Any],
+                           sentiment: Optional[str], events: Optional[list]):
+        """Patch late sections into a signal queued with queue_signal, sent or not"""
+        rendered = RenderedMessage(self._format_signal_message(signal, sentiment, events), parse_mode="Markdown")
+        await outbox.enqueue_edit(key, chat_ids, rendered)
+
+    async def queue_chart(self, chat_ids: List[str], key: str, chart: bytes):
+        """Send a chart that arrived after its signal"""
+        await outbox.enqueue_photo(key, chat_ids, chart)
+
+    def _format_signal_message(self, signal: Dict, sentiment: Optional[str], events: Optional[list]) -> str:
+        """Format signal message with sentiment and events; None leaves a section out"""
+        message = f"""
 🔔 *TRADING SIGNAL*
 Symbol: {signal['symbol']}
 Action: {signal['action']}
 Price: {signal['price']}
 Stop Loss: {signal['stopLoss']}
 Take Profit: {signal['takeProfit']}
-
+"""
+        if sentiment is not None:
+            message += f"""
 📊 *SENTIMENT*
 {sentiment}
-
+"""
+        if events is not None:
+            message += f"""
 📅 *RELEVANT EVENTS*
 {self._format_events(events)}
 """
+        return message
 
-    async def _send_message(self, session, chat_id: str, message: str):
-        """Send message via Telegram"""
-        url = f"https://api.telegram.org/bot{self.token}/sendMessage"
-        await session.post(url, json={
-            "chat_id": chat_id,
-            "text": message,
-            "parse_mode": "Markdown"
-        })
+    async def _api(self, method: str, **kwargs) -> Dict[str, Any]:
+        """Call a Bot API method over the shared connection pool"""
+        url = f"{self.base_url}/{method}"
+        # Reading the body hands the connection back to the pool
+        async with http_clients.session(url).post(url, **kwargs) as response:
+            observe_telegram(method, response.status)
+            return await response.json()
 
-    async def _send_photo(self, session, chat_id: str, photo: bytes):
+    async def _send_photo(self, chat_id: str, photo: bytes):
         """Send photo via Telegram"""
-        url = f"https://api.telegram.org/bot{self.token}/sendPhoto"
         form = aiohttp.FormData()
-        form.add_field("chat_id", chat_id)
-        form.add_field("photo", photo, filename="chart.png")
-        await session.post(url, data=form) 
+        form.add_field("chat_id", str(chat_id))
+        form.add_field("photo", photo, filename=photo_filename(photo))
+        await self._api("sendPhoto", data=form)
 
     def _format_events(self, events: list) -> str:
         """Format calendar events for message"""
@@ -93,14 +132,13 @@ Please answer a few questions to get started.
             ]
         }
         
-        async with aiohttp.ClientSession() as session:
-            await session.post(f"https://api.telegram.org/bot{self.token}/sendMessage", 
-                json={
-                    "chat_id": chat_id,
-                    "text": welcome_message,
-                    "parse_mode": "Markdown",
-                    "reply_markup": keyboard
-                })
+        await self._api("sendMessage",
+            json={
+                "chat_id": chat_id,
+                "text": welcome_message,
+                "parse_mode": "Markdown",
+                "reply_markup": keyboard
+            })
 
     async def handle_telegram_command(self, message: Dict[str, Any]):
         """Handle Telegram commands"""
@@ -146,14 +184,13 @@ Actions:
             ]
         }
         
-        async with aiohttp.ClientSession() as session:
-            await session.post(f"https://api.telegram.org/bot{self.token}/sendMessage",
-                json={
-                    "chat_id": chat_id,
-                    "text": message,
-                    "parse_mode": "Markdown",
-                    "reply_markup": keyboard
-                })
+        await self._api("sendMessage",
+            json={
+                "chat_id": chat_id,
+                "text": message,
+                "parse_mode": "Markdown",
+                "reply_markup": keyboard
+            })
 
     async def handle_callback_query(self, callback_query: Dict[str, Any]):
         """Handle callback queries from inline keyboards"""
@@ -194,11 +231,10 @@ Actions:
                 await self._ask_instrument(chat_id, state['market'])
                 
             # Answer callback query
-            async with aiohttp.ClientSession() as session:
-                await session.post(
-                    f"https://api.telegram.org/bot{self.token}/answerCallbackQuery",
-                    json={"callback_query_id": callback_query['id']}
-                )
+            await self._api(
+                "answerCallbackQuery",
+                json={"callback_query_id": callback_query['id']}
+            )
                 
             return {"status": "callback_handled"}
             
@@ -247,13 +283,12 @@ Actions:
         
         message = f"Great! You selected {market}.\nNow choose your instrument:"
         
-        async with aiohttp.ClientSession() as session:
-            await session.post(f"https://api.telegram.org/bot{self.token}/sendMessage",
-                json={
-                    "chat_id": chat_id,
-                    "text": message,
-                    "reply_markup": keyboard
-                })
+        await self._api("sendMessage",
+            json={
+                "chat_id": chat_id,
+                "text": message,
+                "reply_markup": keyboard
+            })
 
     async def _ask_timeframe(self, chat_id: str, instrument: str):
         """Ask user for preferred timeframe"""
@@ -270,13 +305,12 @@ Actions:
         
         message = f"Excellent! You selected {instrument}.\nLastly, choose your timeframe:"
         
-        async with aiohttp.ClientSession() as session:
-            await session.post(f"https://api.telegram.org/bot{self.token}/sendMessage",
-                json={
-                    "chat_id": chat_id,
-                    "text": message,
-                    "reply_markup": keyboard
-                }) 
+        await self._api("sendMessage",
+            json={
+                "chat_id": chat_id,
+                "text": message,
+                "reply_markup": keyboard
+            }) 
 
     async def _save_preference(self, chat_id: str, timeframe: str):
         """Save user preference"""
@@ -301,10 +335,9 @@ Actions:
             ]
         }
         
-        async with aiohttp.ClientSession() as session:
-            await session.post(f"https://api.telegram.org/bot{self.token}/sendMessage",
-                json={
-                    "chat_id": chat_id,
-                    "text": message,
-                    "reply_markup": keyboard
-                }) 
+        await self._api("sendMessage",
+            json={
+                "chat_id": chat_id,
+                "text": message,
+                "reply_markup": keyboard
+            }) 